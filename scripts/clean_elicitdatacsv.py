@@ -1,16 +1,13 @@
 import os
 import pandas as pd
 import numpy as np
-from utils.config import dir_data, dir_cleancsv
-from utils.cleandata import split_and_clean, make_citations_unique  # import new function
+from utils.config import dir_cleancsv, ensure_dir
+from utils.datasets import RAW_DATASET, load_studies
+from utils.cleandata import split_and_clean_columns, expand_studies, make_citations_unique
 
 # --- Load data ---
-data_path = dir_data / "20251003_Elicitrevised.csv"
-df = pd.read_csv(data_path, sep=";")
-print(f"Loaded {len(df)} records from {data_path.name}")
-
-# --- Normalize column names ---
-df.columns = df.columns.str.strip().str.lower().str.replace(r"[\s\-]+", "_", regex=True)
+df = load_studies()
+print(f"Loaded {len(df)} records from {RAW_DATASET.name}")
 
 # --- Clean and standardize text fields ---
 text_cols = [
@@ -42,10 +39,11 @@ else:
 
 print("Data standardized, cleaned, and citations made unique.")
 
-# --- Apply split-and-clean function ---
-df_artifact = split_and_clean(df, "artifactrej_methods")
-df_steps = split_and_clean(df, "step_keywords")
-df_outcomes = split_and_clean(df, "outcome_keywords_script")
+# --- Split and clean the multi-valued columns in one pass ---
+studies, tables = split_and_clean_columns(df, ["artifactrej_methods", "step_keywords", "outcome_keywords_script"])
+df_artifact = expand_studies(studies, tables["artifactrej_methods"])
+df_steps = expand_studies(studies, tables["step_keywords"])
+df_outcomes = expand_studies(studies, tables["outcome_keywords_script"])
 
 # --- Summary of outputs ---
 print("\nSummary of extracted entries:")
@@ -60,6 +58,7 @@ cleaned_files = {
     "Outcome_Keywords_cleaned.csv": df_outcomes,
 }
 
+ensure_dir(dir_cleancsv)
 for fname, table in cleaned_files.items():
     out_path = os.path.join(dir_cleancsv, fname)
     table.to_csv(out_path, index=False)
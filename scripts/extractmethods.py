@@ -1,4 +1,16 @@
+import argparse
 from utils.methodstext import extract_methods
 from utils.config import dir_researcharticles, dir_methods
 
-extract_methods(input_folder=dir_researcharticles, output_folder=dir_methods)
\ No newline at end of file
+# Guarded, as the worker processes of extract_methods re-import this script
+# under the spawn start method (the default on macOS and Windows)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract methods sections from the research articles.")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-extract every article instead of only new or changed ones.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs).")
+    args = parser.parse_args()
+
+    extract_methods(input_folder=dir_researcharticles, output_folder=dir_methods,
+                    workers=args.workers, incremental=not args.full)
@@ -1,23 +1,22 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from utils.config import dir_data, dir_plots
+from utils.datasets import RAW_DATASET, load_studies
+from utils.renderprofile import figure_dpi, plot_path
 from pathlib import Path
 
 # Load data
-data_path = dir_data / "20251003_Elicitrevised.csv"
-save_path = dir_plots / "fig1_cohort_task.png"
+save_path = plot_path("fig1_cohort_task.png")
 
-df = pd.read_csv(data_path, sep=";")
-print(f"Loaded {len(df)} studies from {data_path.name}\n")
+df = load_studies()
+print(f"Loaded {len(df)} studies from {RAW_DATASET.name}\n")
 
 # Data cleaning
-df.columns = df.columns.str.strip().str.replace(r"[\s\-]+", "_", regex=True)
-df = df.dropna(subset=["Cohort", "Gait_Task"], how="all")
+df = df.dropna(subset=["cohort", "gait_task"], how="all")
 
 pivot = df.pivot_table(
-    index="Cohort",
-    columns="Gait_Task",
-    values="Citation",
+    index="cohort",
+    columns="gait_task",
+    values="citation",
     aggfunc="count",
     fill_value=0
 )
@@ -63,7 +62,7 @@ plt.tight_layout(pad=2.0)
 
 # Save plot
 save_path.parent.mkdir(parents=True, exist_ok=True)
-plt.savefig(save_path, dpi=300, bbox_inches="tight")
+plt.savefig(save_path, dpi=figure_dpi(300), bbox_inches="tight")
 plt.show()
 
 print(f"Plot saved to: {save_path}\n")
@@ -71,15 +70,15 @@ print(f"Plot saved to: {save_path}\n")
 # Descriptive Statistics
 print("Descriptive Statistics\n")
 
-cohort_counts = df["Cohort"].value_counts(dropna=False)
+cohort_counts = df["cohort"].value_counts(dropna=False)
 print("Number of studies per cohort:")
 print(cohort_counts, "\n")
 
-task_counts = df["Gait_Task"].value_counts(dropna=False)
+task_counts = df["gait_task"].value_counts(dropna=False)
 print("Number of studies per gait task:")
 print(task_counts, "\n")
 
-cohort_gait_table = pd.crosstab(df["Cohort"], df["Gait_Task"])
+cohort_gait_table = pd.crosstab(df["cohort"], df["gait_task"])
 print("Cohort vs Gait Task (cross-tabulation):")
 print(cohort_gait_table, "\n")
 
@@ -1,32 +1,24 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from utils.config import dir_data, dir_plots
-from itertools import product
+from utils.datasets import RAW_DATASET, load_studies
+from utils.multivalue import cross_product, crosstab, split_values
+from utils.renderprofile import figure_dpi, plot_path
 
 # Load data
-data_path = dir_data / "20251003_Elicitrevised.csv"
-save_path = dir_plots / "fig2_eeg_gait_heatmap.png"
-df = pd.read_csv(data_path, sep=";")
-print(f"Loaded {len(df)} studies from {data_path.name}\n")
-
-# Clean column names
-df.rename(columns=lambda x: x.strip().replace(" ", "_"), inplace=True)
+save_path = plot_path("fig2_eeg_gait_heatmap.png")
+df = load_studies()
+print(f"Loaded {len(df)} studies from {RAW_DATASET.name}\n")
 
 # Explode multi-value columns using Cartesian product 
-rows = []
-for _, row in df.iterrows():
-    eeg_types = [e.strip() for e in str(row.get("Type_of_EEG_electrodes", "")).split(";") if e.strip()]
-    gait_systems = [g.strip() for g in str(row.get("Gait_measurement_system", "")).split(";") if g.strip()]
-    for eeg, gait in product(eeg_types, gait_systems):
-        rows.append({"Type_of_EEG_electrodes": eeg, "Gait_measurement_system": gait})
-
-df_expanded = pd.DataFrame(rows)
+df_expanded = cross_product(
+    split_values(df["type_of_eeg_electrodes"]),
+    split_values(df["gait_measurement_system"]),
+    names=("Type_of_EEG_electrodes", "Gait_measurement_system")
+)
 
 # Pivot for heatmap
-heat_data = df_expanded.groupby(
-    ["Type_of_EEG_electrodes", "Gait_measurement_system"]
-).size().unstack(fill_value=0)
+heat_data = crosstab(df_expanded, "Type_of_EEG_electrodes", "Gait_measurement_system")
 
 # Plot heatmap
 plt.figure(figsize=(10, 6))
@@ -45,7 +37,7 @@ plt.xlabel("Gait Measurement System", fontsize=12)
 plt.xticks(rotation=30, ha="right", fontsize=10)
 plt.yticks(fontsize=10)
 plt.tight_layout()
-plt.savefig(save_path, dpi=600, bbox_inches="tight")
+plt.savefig(save_path, dpi=figure_dpi(600), bbox_inches="tight")
 plt.show()
 
 # Descriptive statistics
@@ -76,7 +68,7 @@ df_gait_stats = pd.DataFrame({"Count": counts_gait, "Percentage (%)": percent_ga
 print(df_gait_stats, "\n")
 
 print("EEG electrode type vs gait measurement system (cross-tabulation with percentages):")
-cross_tab = df_expanded.groupby(["Type_of_EEG_electrodes", "Gait_measurement_system"]).size().unstack(fill_value=0)
+cross_tab = heat_data
 cross_tab_percent = cross_tab.div(cross_tab.sum(axis=1), axis=0) * 100
 cross_tab_percent = cross_tab_percent.round(1)
 cross_tab_combined = cross_tab.astype(str) + " (" + cross_tab_percent.astype(str) + "%)"
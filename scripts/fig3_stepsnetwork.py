@@ -1,22 +1,21 @@
-import os
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
 from matplotlib.patches import Patch, FancyArrowPatch
 from matplotlib.lines import Line2D
-from collections import Counter, defaultdict
+from collections import defaultdict
 from math import sqrt
-from utils.config import dir_cleancsv, dir_plots
+from utils.datasets import load_cleaned
+from utils.multivalue import split_values
+from utils.stepcounts import count_transitions, count_values
+from utils.vocabulary import STAGE_MAP
+from utils.renderprofile import figure_dpi, plot_path, profile_setting
 
-save_path = dir_plots / "fig3_stepsnetwork.png"
+save_path = plot_path("fig3_stepsnetwork.png")
 
 # Load cleaned CSVs
-steps_df = pd.read_csv(os.path.join(dir_cleancsv, "Step_Keywords_cleaned.csv"))
-outcomes_df = pd.read_csv(os.path.join(dir_cleancsv, "Outcome_Keywords_cleaned.csv"))
-
-# Standardize column names
-steps_df.columns = steps_df.columns.str.strip().str.lower().str.replace(r"[\s\-]+", "_", regex=True)
-outcomes_df.columns = outcomes_df.columns.str.strip().str.lower().str.replace(r"[\s\-]+", "_", regex=True)
+steps_df = load_cleaned("steps")
+outcomes_df = load_cleaned("outcomes")
 
 # Merge keywords by study
 steps_grouped = steps_df.groupby('citation')['step_keywords'].apply(lambda x: ';'.join(x.dropna())).reset_index()
@@ -34,46 +33,27 @@ df = pd.merge(
 
 
 # Preprocessing stages
-stage_map = {
-    "Raw data": ["Raw data"],
-    "Pre ICA - Signal Cleaning": ["Channel removal", "High-pass filter", "Low-pass filter",
-                                  "Bandpass filter", "Notch filter", "Downsample"],
-    "Pre ICA - Data Preprocessing": ["Artifact Rejection", "Bad channel detection", "Re-reference", "Epoching"],
-    "ICA": ["IC decomposition", "IC rejection"],
-    "Post ICA": ["Clustering", "Baseline correction", "Dipole fitting", "Normalization", "Despiking"],
-    "Outcome": ["PSD", "ERD/ERS", "ERSP", "CMC"]
-}
-
-# Count steps and transitions 
-step_counts = Counter()
-transition_counts = Counter()
-
-for _, row in df.iterrows():
-    steps = [s for s in row["step_keywords"].split(";") if s]
-    outcomes = [o for o in row["outcome_keywords"].split(";") if o]
-
-    step_counts.update(steps)
-
-    # Step-to-step transitions
-    for i in range(len(steps)-1):
-        transition_counts[(steps[i], steps[i+1])] += 1
-    # Step-to-outcome transitions
-    if steps and outcomes:
-        last_step = steps[-1]
-        for out in outcomes:
-            transition_counts[(last_step, out)] += 1
+stage_map = STAGE_MAP
+
+# Count steps and transitions (step-to-step, and last step to each outcome)
+steps = split_values(df["step_keywords"], strip=False)
+outcomes = split_values(df["outcome_keywords"], strip=False)
+step_counts = count_values(steps)
+transition_counts = count_transitions(steps, outcomes)
 
 total_studies = len(df)
+total_transitions = transition_counts["count"].sum()
 
 # Print descriptive statistics with percentages 
 print("=== Preprocessing Steps (Count & %) ===")
-for step, count in step_counts.most_common():
+for step, count in step_counts.sort_values(ascending=False, kind="stable").items():
     pct = (count / total_studies) * 100
     print(f"{step}: {count} ({pct:.1f}%)")
 
 print("\n=== Top 20 Step Transitions (Count & %) ===")
-for (src, dst), count in transition_counts.most_common(20):
-    pct = (count / sum(transition_counts.values())) * 100
+top_transitions = transition_counts.sort_values("count", ascending=False, kind="stable").head(20)
+for src, dst, count in top_transitions.itertuples(index=False):
+    pct = (count / total_transitions) * 100
     print(f"{src} -> {dst}: {count} ({pct:.1f}%)")
 
 # Node stage mapping 
@@ -99,7 +79,7 @@ def get_node_positions(G, node_stage):
 # Plotting
 def plot_preprocessing_flow(transition_counts, node_stage_map, title="EEG Preprocessing Flow Across Studies"):
     G = nx.DiGraph()
-    for (src, dst), weight in transition_counts.items():
+    for src, dst, weight in transition_counts.itertuples(index=False):
         G.add_edge(src, dst, weight=weight)
 
     # Node colors
@@ -116,8 +96,9 @@ def plot_preprocessing_flow(transition_counts, node_stage_map, title="EEG Prepro
     node_sizes = [300 + 200 * G.degree(n) for n in G.nodes()]
     pos = get_node_positions(G, node_stage_map)
 
-    fig, ax = plt.subplots(figsize=(30, 16), dpi=600)
-    nx.draw_networkx_nodes(G, pos, node_size=node_sizes, node_color=node_colors, ax=ax)
+    fig, ax = plt.subplots(figsize=(30, 16), dpi=figure_dpi(600))
+    nodes = nx.draw_networkx_nodes(G, pos, node_size=node_sizes, node_color=node_colors, ax=ax)
+    nodes.set_rasterized(profile_setting("rasterize"))
     nx.draw_networkx_labels(G, pos, font_size=20, font_weight="bold", ax=ax)
 
     # Draw edges with weight-based style
@@ -138,6 +119,13 @@ def plot_preprocessing_flow(transition_counts, node_stage_map, title="EEG Prepro
             return "black", 4.5
 
 
+    # Draft profile: straight arrows batched into one quiver per line width instead of
+    # one curved arrow each; A->B and B->A edges are shifted apart so both stay visible.
+    # A single LineCollection would draw the edges without arrowheads, losing the step
+    # order; quiver draws shaft and head in one artist, but takes one shaft width per
+    # call, so the edges are grouped by the seven widths of edge_style
+    batch_edges = profile_setting("batch_artists")
+    draft_arrows = defaultdict(list)
     for u, v in G.edges():
         w = G[u][v]['weight']
         color, width = edge_style(w)
@@ -148,9 +136,20 @@ def plot_preprocessing_flow(transition_counts, node_stage_map, title="EEG Prepro
         node_radius = 0.3
         arrow_start = (start[0] + dx*node_radius/dist, start[1] + dy*node_radius/dist)
         arrow_end = (end[0] - dx*node_radius/dist, end[1] - dy*node_radius/dist)
+        if batch_edges:
+            shift = (-dy/dist*0.08, dx/dist*0.08) if G.has_edge(v, u) else (0, 0)
+            draft_arrows[width].append((arrow_start[0] + shift[0], arrow_start[1] + shift[1],
+                                        arrow_end[0] - arrow_start[0], arrow_end[1] - arrow_start[1], color))
+            continue
         arrow = FancyArrowPatch(posA=arrow_start, posB=arrow_end, connectionstyle="arc3,rad=0.2",
                                 arrowstyle="->", mutation_scale=20, color=color, linewidth=width, alpha=0.8)
         ax.add_patch(arrow)
+    for width, arrows in draft_arrows.items():
+        x, y, u, v, colors = zip(*arrows)
+        # Shaft width in inches, so that it matches the line width in points of the final figure
+        ax.quiver(x, y, u, v, color=colors, angles="xy", scale_units="xy", scale=1, units="inches",
+                  width=width/72, headwidth=3, headlength=4, headaxislength=3.5, alpha=0.8,
+                  rasterized=profile_setting("rasterize"))
 
     # Legends
     node_legend = [Patch(facecolor=c, edgecolor="black", label=stage) for stage, c in color_map.items()]
@@ -170,7 +169,7 @@ def plot_preprocessing_flow(transition_counts, node_stage_map, title="EEG Prepro
     plt.title(title, fontsize=22, weight="bold")
     plt.axis("off")
     plt.tight_layout()
-    plt.savefig(save_path, dpi=600, bbox_inches="tight")
+    plt.savefig(save_path, dpi=figure_dpi(600), bbox_inches="tight")
     plt.show()
 
 # Run plot
@@ -3,13 +3,15 @@ import pandas as pd
 import ast
 import matplotlib.pyplot as plt
 from upsetplot import UpSet, from_indicators
-from itertools import combinations
-from utils.config import dir_data, dir_plots
+from utils.datasets import load_studies
+from utils.multivalue import indicator_matrix
+from utils.stepcounts import count_cooccurrences
+from utils.vocabulary import STAGE_MAP
+from utils.renderprofile import figure_dpi, plot_path
 
 # Load data
-data_path = dir_data / "20251003_Elicitrevised.csv"
-save_path = dir_plots / "fig4_steps_upset.png"
-df = pd.read_csv(data_path, sep=";", engine="python")
+save_path = plot_path("fig4_steps_upset.png")
+df = load_studies()
 
 # Safe parsing of preprocessing steps
 def safe_parse(x):
@@ -25,29 +27,17 @@ def safe_parse(x):
 
 if "step_keywords" in df.columns:
     df["Pipeline_steps"] = df["step_keywords"].apply(safe_parse)
-elif "corrected_keywords_VV" in df.columns:
-    df["Pipeline_steps"] = df["corrected_keywords_VV"].apply(safe_parse)
+elif "corrected_keywords_vv" in df.columns:
+    df["Pipeline_steps"] = df["corrected_keywords_vv"].apply(safe_parse)
 else:
     raise ValueError("No valid step keywords column found in CSV.")
 
 # Extract publication year from citation
-if "Citation" in df.columns:
-    df["Year"] = df["Citation"].astype(str).str.extract(r"(\d{4})").astype(float).astype("Int64")
-
-# Stage mapping and colors
-stage_map = {
-    "Raw data": ["Raw data"],
-    "Pre ICA - Signal Cleaning": [
-        "Channel removal", "High-pass filter", "Low-pass filter",
-        "Bandpass filter", "Notch filter", "Downsample"
-    ],
-    "Pre ICA - Data Preprocessing": [
-        "Artifact Rejection", "Bad channel detection",
-        "Re-reference", "Epoching"
-    ],
-    "ICA": ["IC decomposition", "IC rejection"],
-    "Post ICA": ["Clustering", "Baseline correction", "Dipole fitting", "Normalization", "Despiking"],
-}
+if "citation" in df.columns:
+    df["Year"] = df["citation"].astype(str).str.extract(r"(\d{4})").astype(float).astype("Int64")
+
+# Stage mapping and colors (outcomes are not preprocessing steps)
+stage_map = {stage: steps for stage, steps in STAGE_MAP.items() if stage != "Outcome"}
 
 color_map = {
     "Raw data": "black",
@@ -62,10 +52,9 @@ step_to_color = {s: color_map[stage] for stage, steps in stage_map.items() for s
 
 # All unique steps and boolean indicators
 all_steps = sorted({step for steps in df["Pipeline_steps"] for step in steps})
-for step in all_steps:
-    df[step] = df["Pipeline_steps"].apply(lambda s: step in s)
+step_indicators = indicator_matrix(df["Pipeline_steps"].explode().dropna(), index=df.index, columns=all_steps)
 df = df.sort_values("Year", ascending=True)
-upset_df = df[all_steps].astype(bool)
+upset_df = step_indicators.loc[df.index]
 
 # Descriptive statistics
 step_counts = df["Pipeline_steps"].explode().value_counts()
@@ -79,14 +68,7 @@ for step, count in step_counts.items():
     print(f"{step}: {count} | {pct:.1f}%")
 
 # Pairwise co-occurrence counts
-pair_counts = {}
-for steps in df["Pipeline_steps"]:
-    for combo in combinations(sorted(set(steps)), 2):
-        pair_counts[combo] = pair_counts.get(combo, 0) + 1
-pair_df = pd.DataFrame(
-    [(a, b, c) for (a, b), c in pair_counts.items()],
-    columns=["Step_A", "Step_B", "Co_occurrence"]
-).sort_values("Co_occurrence", ascending=False)
+pair_df = count_cooccurrences(df["Pipeline_steps"].explode().dropna()).sort_values("Co_occurrence", ascending=False)
 
 print("\nTop 10 most frequent co-occurring step pairs:")
 print(pair_df.head(10).to_string(index=False))
@@ -124,7 +106,7 @@ plt.rcParams.update({
 })
 
 # Save plot
-plt.savefig(save_path, dpi=600, bbox_inches="tight")
+plt.savefig(save_path, dpi=figure_dpi(600), bbox_inches="tight")
 plt.show()
 
 print(f"\nHigh-resolution colored UpSet plot saved to:\n{save_path}")
@@ -1,16 +1,23 @@
-import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
+from matplotlib.collections import PolyCollection
 import seaborn as sns
 import colorsys
-from utils.config import dir_cleancsv, dir_plots
+from utils.datasets import load_cleaned
+from utils.multivalue import crosstab, indicator_matrix
+from utils.renderprofile import figure_dpi, plot_path, profile_setting
+
+# Above this many studies, plot a publication year x method heatmap instead of one bar per study
+MAX_BAR_STUDIES = 250
+
+# Publication year in a citation such as "Jacobsen, N.A., et al., 2024 (b)"; the last match is used
+YEAR_PATTERN = r"\b(?:19|20)\d{2}(?!\d)"
 
 # Load data
-data_path = os.path.join(dir_cleancsv, "Artifact_Methods_cleaned.csv")
-save_path = dir_plots / "fig5_artifactrej.png"
-df_artifact = pd.read_csv(data_path)
+save_path = plot_path("fig5_artifactrej.png")
+df_artifact = load_cleaned("artifacts")
 df_artifact["Citation"] = df_artifact["citation"].fillna("Unknown Study").astype(str).str.strip()
 
 # Order studies by year
@@ -18,17 +25,14 @@ if "Year" in df_artifact.columns:
     df_artifact = df_artifact.sort_values("Year")
 studies = df_artifact["Citation"].unique()
 
-# Prepare pivot table 
 methods = df_artifact["artifactrej_methods"].unique()
-pivot = pd.DataFrame(0, index=studies, columns=methods)
-for title, group in df_artifact.groupby("Citation"):
-    for m in group["artifactrej_methods"]:
-        pivot.loc[title, m] = 1
+study_methods = df_artifact.drop_duplicates(["Citation", "artifactrej_methods"])
 
 # Descriptive statistics
 method_counts = df_artifact["artifactrej_methods"].value_counts()
-avg_methods_per_study = pivot.sum(axis=1).mean()
-multi_method_studies = (pivot.sum(axis=1) > 1).sum()
+methods_per_study = study_methods.groupby("Citation", sort=False).size()
+avg_methods_per_study = methods_per_study.mean()
+multi_method_studies = (methods_per_study > 1).sum()
 
 print("Descriptive Statistics")
 print(f"Total studies with artifact rejection analyzed: {len(studies)}")
@@ -56,47 +60,95 @@ for method in methods:
     r_new, g_new, b_new = colorsys.hls_to_rgb(h, l_new, s)
     method_colors[method] = (r_new, g_new, b_new)
 
-# Plot setup
-fig_width = max(18, len(pivot) * 0.25)
-fig_height = 10
-plt.figure(figsize=(fig_width, fig_height), dpi=600)
-
-bottoms = np.zeros(len(pivot))
-for method in pivot.columns:
-    plt.bar(
-        pivot.index,
-        pivot[method],
-        bottom=bottoms,
-        color=method_colors[method],
-        label=method,
-        width=0.8
+sorted_methods = method_counts.sort_values(ascending=False).index.tolist()
+
+if len(studies) > MAX_BAR_STUDIES:
+    # Studies per publication year and method; the size does not depend on the number of studies
+    years = study_methods["Citation"].str.findall(YEAR_PATTERN).str[-1]
+    undated = study_methods.loc[years.isna(), "Citation"].unique()
+    if len(undated):
+        print(f"\n{len(undated)} studies without a publication year in their citation are left out of the heatmap:")
+        print(", ".join(undated[:20]) + (", ..." if len(undated) > 20 else ""))
+    year_counts = crosstab(
+        pd.DataFrame({"Method": study_methods["artifactrej_methods"], "Year": years}), "Method", "Year"
+    ).reindex([m for m in sorted_methods if pd.notna(m)], fill_value=0)
+
+    plt.figure(figsize=(max(12, 0.5 * year_counts.shape[1]), max(6, 0.4 * len(year_counts))), dpi=figure_dpi(600))
+    sns.heatmap(
+        year_counts,
+        annot=year_counts.size <= 600,
+        fmt="d",
+        cmap="OrRd",
+        linewidths=0.5,
+        linecolor="gray",
+        cbar_kws={"label": "Studies"}
+    )
+    plt.xlabel("Publication Year", fontsize=14)
+    plt.ylabel("Artifact Rejection Method", fontsize=14)
+    plt.title(f"Artifact Rejection Methods Across Studies (n = {len(studies)})", fontsize=20, weight="bold", pad=15)
+    plt.xticks(rotation=90, ha="center", fontsize=10)
+    plt.yticks(fontsize=12)
+    plt.tight_layout()
+else:
+    # Study x method indicators and their running totals, the bar bottoms of the stacked bars
+    pivot = indicator_matrix(
+        df_artifact.set_index("Citation")["artifactrej_methods"], index=studies, columns=methods, dtype=np.int64
+    )
+    values = pivot.to_numpy()
+    bottoms = (np.cumsum(values, axis=1) - values).astype(float)
+
+    # Plot setup
+    fig_width = max(18, len(pivot) * 0.25)
+    fig_height = 10
+    plt.figure(figsize=(fig_width, fig_height), dpi=figure_dpi(600))
+
+    if profile_setting("batch_artists"):
+        # Draft profile: only the non-empty bar segments, as one rasterized collection
+        study_pos, method_pos = np.nonzero(values)
+        x, y, h = study_pos - 0.4, bottoms[study_pos, method_pos], values[study_pos, method_pos]
+        boxes = np.stack([np.column_stack([x, y]), np.column_stack([x + 0.8, y]),
+                          np.column_stack([x + 0.8, y + h]), np.column_stack([x, y + h])], axis=1)
+        ax = plt.gca()
+        ax.add_collection(PolyCollection(boxes, facecolors=[method_colors[m] for m in pivot.columns[method_pos]],
+                                         rasterized=profile_setting("rasterize")))
+        ax.set_xlim(-0.5, len(pivot) - 0.5)
+        ax.autoscale_view(scalex=False)
+    else:
+        # Final profile: every segment of the stacked bars as a vector rectangle, drawn
+        # method by method from the cumulative matrix in a single bar call
+        n_studies, n_methods = values.shape
+        plt.bar(
+            np.tile(np.arange(n_studies), n_methods),
+            values.T.ravel(),
+            bottom=bottoms.T.ravel(),
+            color=[method_colors[m] for m in np.repeat(pivot.columns.to_numpy(), n_studies)],
+            width=0.8
+        )
+
+    plt.xlabel("Studies (Citations)", fontsize=14)
+    plt.ylabel("Artifact Rejection Methods Used (n per study)", fontsize=14)
+    plt.title("Artifact Rejection Methods Across Studies", fontsize=20, weight="bold", pad=15)
+    plt.xticks(np.arange(len(pivot)), pivot.index, rotation=90, ha="center", fontsize=8)
+    plt.yticks(fontsize=12)
+    plt.grid(axis="y", linestyle="--", alpha=0.4)
+
+    # Gradient legend based on frequency
+    legend_patches = [
+        Patch(color=method_colors[m], label=f"{m} ({method_counts[m]})") for m in sorted_methods
+    ]
+    plt.legend(
+        handles=legend_patches,
+        bbox_to_anchor=(1.02, 1),
+        loc='upper left',
+        title="Artifact Rejection Methods\n(total count)",
+        fontsize=10,
+        title_fontsize=12,
+        frameon=False
     )
-    bottoms += pivot[method].values
 
-plt.xlabel("Studies (Citations)", fontsize=14)
-plt.ylabel("Artifact Rejection Methods Used (n per study)", fontsize=14)
-plt.title("Artifact Rejection Methods Across Studies", fontsize=20, weight="bold", pad=15)
-plt.xticks(rotation=90, ha="center", fontsize=8)
-plt.yticks(fontsize=12)
-plt.grid(axis="y", linestyle="--", alpha=0.4)
+    plt.tight_layout(rect=[0, 0, 0.85, 0.95])
 
-# Gradient legend based on frequency
-sorted_methods = method_counts.sort_values(ascending=False).index.tolist()
-legend_patches = [
-    Patch(color=method_colors[m], label=f"{m} ({method_counts[m]})") for m in sorted_methods
-]
-plt.legend(
-    handles=legend_patches,
-    bbox_to_anchor=(1.02, 1),
-    loc='upper left',
-    title="Artifact Rejection Methods\n(total count)",
-    fontsize=10,
-    title_fontsize=12,
-    frameon=False
-)
-
-plt.tight_layout(rect=[0, 0, 0.85, 0.95])
-plt.savefig(save_path, dpi=600, bbox_inches="tight")
+plt.savefig(save_path, dpi=figure_dpi(600), bbox_inches="tight")
 plt.show()
 
 print(f"\nPlot saved to: {save_path}")
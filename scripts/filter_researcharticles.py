@@ -1,6 +1,9 @@
 from utils.config import dir_fulltexts, dir_researcharticles
 from utils.article_fetcher import filter_research_articles
 
-# Filter and save research articles
-filter_research_articles(dir_fulltexts,dir_researcharticles)
-print("Research articles saved successfully.")
+# Guarded, as the worker processes of filter_research_articles re-import this
+# script under the spawn start method (the default on macOS and Windows)
+if __name__ == "__main__":
+    # Filter and save research articles
+    filter_research_articles(dir_fulltexts,dir_researcharticles)
+    print("Research articles saved successfully.")
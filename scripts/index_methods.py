@@ -0,0 +1,9 @@
+from utils.config import dir_methods, dir_results
+from utils.article_fetcher import read_txt_files
+from utils.search_index import SEARCH_INDEX_FILE, SearchIndex
+
+# Bring the full-text index up to date with the extracted methods sections
+with SearchIndex(dir_results / SEARCH_INDEX_FILE) as index:
+    report = index.update(read_txt_files(dir_methods))
+    print(f"Search index: {len(report['added'])} added, {len(report['updated'])} updated, "
+          f"{len(report['removed'])} removed, {report['unchanged']} unchanged ({len(index)} documents)")
@@ -0,0 +1,6 @@
+import sys
+from utils.render import main
+
+# Render all manuscript figures headless and in parallel (see utils/render.py)
+if __name__ == "__main__":
+    sys.exit(main())
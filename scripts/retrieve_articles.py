@@ -1,29 +1,80 @@
-from utils.article_fetcher import search_pmc_by_keyword, fetch_full_text_pmc
-from utils.saveas import save_xml
+import argparse
+from itertools import islice
+from utils.article_fetcher import search_pmc_history, iter_pmc_ids, fetch_full_texts_pmc
+from utils.eutils_client import get_client
+from utils.async_fetcher import fetch_history_concurrent, fetch_full_texts_concurrent, rate_limited
+from utils.article_store import open_store
 from utils.log_search import keywords_to_ids
-from utils.config import dir_fulltexts, dir_log_results
+from utils.manifest import DownloadManifest, parse_age
+from utils.config import dir_fulltexts, dir_log_results, dir_results
 
+parser = argparse.ArgumentParser(description="Retrieve full-text articles from PubMed Central.")
+parser.add_argument("--resume", action="store_true",
+                    help="Skip PMC IDs the download manifest already records as done.")
+parser.add_argument("--refresh-older-than", type=parse_age, metavar="AGE",
+                    help="Resume, but fetch again downloads older than AGE (e.g. 7d, 12h); implies --resume.")
+args = parser.parse_args()
 
 keywords = ['Mobile-EEG', 'Gait']
 log_file_path = dir_log_results.joinpath("keyword_overview.txt")
+manifest_path = dir_results / "download_manifest.sqlite"
+batch_size = 100  # Articles per efetch request
+max_in_flight = 4  # Concurrent efetch requests (still capped by the NCBI rate limit)
+resume_chunk_size = 10000  # Pending IDs handed to the fetcher at a time when resuming
 
-# Step 1: Search for PMC IDs using AND logic
-pmc_ids = search_pmc_by_keyword(keywords)
+manifest = DownloadManifest(manifest_path)
+store = open_store(dir_fulltexts)
 
-if pmc_ids:
-    print(f"Found PMC IDs: {pmc_ids}")
-    
-    # Step 2: Fetch full text for each PMC ID and save it as XML
-    for pmc_id in pmc_ids:
-        full_text = fetch_full_text_pmc(pmc_id)
-        if full_text:
-            save_xml(pmc_id, full_text, dir_fulltexts)
-        else:
-            print(f"Could not fetch full text for PMC ID: {pmc_id}")
+def save_article(pmc_id, full_text):
+    try:
+        store.put(pmc_id, full_text)
+    except OSError as e:
+        print(f"Error saving full text for PMC ID {pmc_id}: {e}")
+        manifest.record_failed(pmc_id, str(e))
+        return
+    manifest.record_done(pmc_id, full_text)
+    print(f"Saved full text for PMC ID {pmc_id} to {store}")
+
+# Step 1: Search PMC on the NCBI history server using AND logic
+history = search_pmc_history(keywords)
+
+if history["count"]:
+    # Step 2: Fetch full texts and save each article as XML. A full run reads
+    # straight from the history server; a resumed run streams the IDs from the
+    # history server and fetches the pending ones chunk by chunk.
+    if args.resume or args.refresh_older_than:
+        pending = manifest.pending_ids(iter_pmc_ids(history), refresh_older_than=args.refresh_older_than, store=store)
+        summary = {"fetched": 0, "failed": []}
+        n_pending = 0
+        while True:
+            chunk = list(islice(pending, resume_chunk_size))
+            if not chunk:
+                break
+            n_pending += len(chunk)
+            result = fetch_full_texts_concurrent(chunk, save_article, batch_size=batch_size, max_in_flight=max_in_flight)
+            summary["fetched"] += result["fetched"]
+            summary["failed"] += result["failed"]
+        print(f"Skipped {history['count'] - n_pending} articles already in the manifest; fetched {n_pending}.")
+    else:
+        summary = fetch_history_concurrent(history, save_article, batch_size=batch_size, max_in_flight=max_in_flight)
+
+    # Retry failed articles by ID, in smaller sub-batches, still under the NCBI rate limit
+    with rate_limited():
+        for pmc_id, full_text in fetch_full_texts_pmc(summary["failed"], batch_size=batch_size):
+            if full_text:
+                save_article(pmc_id, full_text)
+            else:
+                manifest.record_failed(pmc_id, "efetch returned no article")
+                print(f"Could not fetch full text for PMC ID: {pmc_id}")
+    print(f"Download manifest: {manifest.summary()}")
     
     # Step 3: Log the search results
-    keywords_to_ids(keywords, pmc_ids, log_file_path)
+    keywords_to_ids(keywords, iter_pmc_ids(history), log_file_path, count=history["count"])
     print("Search results logged successfully.")
 else:
     print("No PMC IDs found for the given keywords.")
 
+manifest.close()
+
+if get_client().cache is not None:
+    print(f"HTTP cache: {get_client().cache.stats()}")
@@ -0,0 +1,6 @@
+import sys
+from utils.pipeline import main
+
+# Run the pipeline stages that are out of date (see utils/pipeline.py)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import argparse
+import time
+from utils.config import dir_results
+from utils.search_index import SEARCH_INDEX_FILE, SearchIndex
+
+parser = argparse.ArgumentParser(
+    description="Search the indexed methods sections (run index_methods.py first).",
+    epilog='Example: search_methods.py \'ASR AND (iclabel OR "independent component")\'',
+)
+parser.add_argument("query", help='Boolean query with AND, OR, NOT, parentheses, "phrases" and prefix* terms.')
+args = parser.parse_args()
+
+with SearchIndex(dir_results / SEARCH_INDEX_FILE) as index:
+    start = time.perf_counter()
+    pmc_ids = index.search(args.query)
+    elapsed = time.perf_counter() - start
+    total = len(index)
+
+for pmc_id in pmc_ids:
+    print(pmc_id)
+print(f"{len(pmc_ids)} of {total} studies match ({elapsed * 1000:.1f} ms)")
@@ -0,0 +1,39 @@
+import os
+import time
+from utils.config import dir_methods, dir_researcharticles, dir_tagged, ensure_dir
+from utils.article_fetcher import read_txt_files
+from utils.article_store import open_store
+from utils.steptagger import tag_corpus
+
+# Guarded, as the worker processes of tag_corpus re-import this script under
+# the spawn start method (the default on macOS and Windows)
+if __name__ == "__main__":
+    # --- Tag the extracted methods sections ---
+    corpus = read_txt_files(dir_methods)
+    print(f"Tagging {len(corpus)} methods sections from {dir_methods}")
+
+    start = time.perf_counter()
+    tables = tag_corpus(corpus, store=open_store(dir_researcharticles))
+    elapsed = time.perf_counter() - start
+    print(f"Tagged in {elapsed:.2f}s ({len(corpus) / elapsed if elapsed else 0:.0f} documents/s)")
+
+    # --- Summary of outputs ---
+    print("\nSummary of tagged entries:")
+    print(f"Artifact rejection entries: {len(tables['artifactrej_methods'])}")
+    print(f"Step keyword entries:       {len(tables['step_keywords'])}")
+    print(f"Outcome keyword entries:    {len(tables['outcome_keywords_script'])}")
+
+    # --- Export in the same layout as clean_elicitdatacsv.py ---
+    tagged_files = {
+        "Artifact_Methods_cleaned.csv": tables["artifactrej_methods"],
+        "Step_Keywords_cleaned.csv": tables["step_keywords"],
+        "Outcome_Keywords_cleaned.csv": tables["outcome_keywords_script"],
+    }
+
+    ensure_dir(dir_tagged)
+    for fname, table in tagged_files.items():
+        out_path = os.path.join(dir_tagged, fname)
+        table.to_csv(out_path, index=False)
+        print(f"Saved → {out_path}")
+
+    print("\nAll tagged CSVs successfully exported.")
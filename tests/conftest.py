@@ -0,0 +1,11 @@
+import pytest
+from utils import config
+
+@pytest.fixture
+def alt_root(tmp_path, monkeypatch):
+    """Points the data, results, logs and plots folders at an empty root outside the checkout."""
+    # set_root exports LITEXTRACT_ROOT; monkeypatch restores it afterwards
+    monkeypatch.setenv(config.ROOT_ENV, str(tmp_path))
+    config.set_root(tmp_path)
+    yield tmp_path.resolve()
+    config.set_root(None)
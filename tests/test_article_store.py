@@ -0,0 +1,91 @@
+import importlib.util
+import pytest
+from utils.article_store import DirectoryStore, ShardedStore, SQLiteStore, open_store
+
+ARTICLES = {
+    "101": b"<article><body><p>First</p></body></article>",
+    "2302": "<article><body><p>Second, with é</p></body></article>".encode("utf-8"),
+    "7": b"<article/>",
+}
+
+def _zstd():
+    if importlib.util.find_spec("zstandard") is None:
+        pytest.skip("zstandard is not installed")
+    return "zstd"
+
+BACKENDS = {
+    "directory": lambda root: DirectoryStore(root),
+    "gzip": lambda root: ShardedStore(root, codec="gzip"),
+    "zstd": lambda root: ShardedStore(root, codec=_zstd()),
+    "sqlite": lambda root: SQLiteStore(root),
+}
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+def _filled(root, backend):
+    store = BACKENDS[backend](root)
+    for pmc_id, data in ARTICLES.items():
+        store.put(pmc_id, data)
+    return store
+
+def test_round_trip(tmp_path, backend):
+    store = BACKENDS[backend](tmp_path / "store")
+    assert store.ids() == [] and len(store) == 0
+
+    for pmc_id, data in ARTICLES.items():
+        store.put(pmc_id, data)
+    store.put("7", "<article>replaced</article>")
+
+    assert store.ids() == sorted(ARTICLES)
+    assert store.get("101") == ARTICLES["101"]
+    assert store.get("2302") == ARTICLES["2302"]
+    assert store.get("7") == b"<article>replaced</article>"
+    with store.open("2302") as file:
+        assert file.read() == ARTICLES["2302"]
+    assert "101" in store and "999" not in store
+    with pytest.raises(KeyError):
+        store.get("999")
+
+    store.delete("101")
+    store.delete("999")
+    assert store.ids() == ["2302", "7"]
+    assert dict(store.items()) == {"2302": ARTICLES["2302"], "7": b"<article>replaced</article>"}
+
+def test_copy_from_every_backend(tmp_path, backend):
+    source = _filled(tmp_path / "source", backend)
+    for target_backend in sorted(BACKENDS):
+        if target_backend == "zstd" and importlib.util.find_spec("zstandard") is None:
+            continue
+        target = BACKENDS[target_backend](tmp_path / f"copy_{target_backend}")
+        for pmc_id in source.ids():
+            target.copy_from(source, pmc_id)
+        assert dict(target.items()) == ARTICLES
+
+    # A copy between stores of the same layout links the file; rewriting the copy leaves the source alone
+    copy = BACKENDS[backend](tmp_path / f"copy_{backend}")
+    copy.put("101", b"<article>changed</article>")
+    assert source.get("101") == ARTICLES["101"]
+
+def test_open_store_detects_backend_from_marker(tmp_path, backend):
+    _filled(tmp_path / "store", backend)
+
+    # The marker wins over the backend asked for; a directory store has loose files instead of a marker
+    store = open_store(tmp_path / "store", backend=None if backend == "directory" else "directory")
+
+    assert store.backend == backend
+    assert dict(store.items()) == ARTICLES
+
+def test_open_store_reads_loose_files_without_marker(tmp_path):
+    (tmp_path / "101.xml").write_bytes(ARTICLES["101"])
+
+    store = open_store(tmp_path)
+
+    assert isinstance(store, DirectoryStore) and store.backend == "directory"
+    assert store.ids() == ["101"]
+
+def test_stores_touch_the_disk_on_first_write_only(tmp_path, backend):
+    store = BACKENDS[backend](tmp_path / "store")
+    assert store.ids() == [] and "101" not in store
+    assert not (tmp_path / "store").exists()
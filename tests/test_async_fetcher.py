@@ -0,0 +1,107 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from utils.article_fetcher import fetch_article_set, fetch_history_page
+from utils.async_fetcher import fetch_history_concurrent, rate_limited
+from utils.eutils_client import EutilsClient
+from utils.http_cache import ResponseCache
+
+RATE = 20  # Requests per second allowed in these tests
+PMC_IDS = [str(1000 + i) for i in range(20)]
+DROPPED = {"1007", "1013"}  # Left out of the efetch responses by the stand-in server
+HISTORY = {"query": "test", "count": len(PMC_IDS), "webenv": "WE1", "query_key": "1"}
+
+def _article(pmc_id):
+    return (f'<article article-type="research-article"><front><article-meta>'
+            f'<article-id pub-id-type="pmc">{pmc_id}</article-id></article-meta></front></article>')
+
+class _EutilsHandler(BaseHTTPRequestHandler):
+    """Answers esearch and efetch requests like NCBI, and records when each request arrived."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append(time.monotonic())
+        start, size = int(params.get("retstart", 0)), int(params.get("retmax", 20))
+        block = params["id"].split(",") if "id" in params else PMC_IDS[start:start + size]
+        if url.path.endswith("/esearch.fcgi"):
+            ids = "".join(f"<Id>{pmc_id}</Id>" for pmc_id in block)
+            body = f"<eSearchResult><Count>{len(PMC_IDS)}</Count><IdList>{ids}</IdList></eSearchResult>"
+        else:
+            articles = "".join(_article(pmc_id) for pmc_id in block if pmc_id not in DROPPED)
+            body = f'<?xml version="1.0"?>\n<pmc-articleset>{articles}</pmc-articleset>'
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EutilsHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _client(server, cache=None):
+    return EutilsClient(base_url=f"http://127.0.0.1:{server.server_port}", api_key=None, max_retries=0,
+                        cache=cache)
+
+def _assert_within_rate(times, rate):
+    # No window of one second may hold more than `rate` requests (with a little slack for the network)
+    times = sorted(times)
+    for first, last in zip(times, times[rate:]):
+        assert last - first >= 0.9
+
+def test_fetch_history_concurrent_stays_within_rate_and_reports_missing_ids(server):
+    saved = {}
+    summary = fetch_history_concurrent(HISTORY, saved.__setitem__, batch_size=3, max_in_flight=4,
+                                       rate=RATE, client=_client(server))
+
+    assert set(saved) == set(PMC_IDS) - DROPPED
+    assert sorted(summary["failed"]) == sorted(DROPPED)
+    assert summary["fetched"] == len(PMC_IDS) - len(DROPPED)
+    # 7 efetch blocks plus one esearch lookup for each of the two incomplete blocks
+    assert len(server.requests) == 9
+    times = sorted(server.requests)
+    assert all(later - earlier >= 0.5 / RATE for earlier, later in zip(times, times[1:]))
+    _assert_within_rate(times, RATE)
+
+def test_rate_limited_spaces_synchronous_requests(server):
+    client = _client(server)
+    with rate_limited(client, rate=RATE):
+        for _ in range(RATE + 5):
+            client.get("esearch", db="pmc", term="#1", WebEnv="WE1", retmax=1)
+    assert client.limiter is None
+    _assert_within_rate(server.requests, RATE)
+
+def test_short_efetch_batches_are_not_cached(server, tmp_path):
+    client = _client(server, cache=ResponseCache(tmp_path))
+    complete, short = ["1001", "1002", "1003"], ["1006", "1007", "1008"]
+
+    for _ in range(2):
+        assert set(fetch_article_set(client, complete)) == set(complete)
+        assert set(fetch_article_set(client, short)) == set(short) - DROPPED
+
+    # The complete batch came from the cache the second time, the short one from the server again
+    assert len(server.requests) == 3
+
+def test_short_history_pages_are_not_cached(server, tmp_path):
+    client = _client(server, cache=ResponseCache(tmp_path))
+
+    for _ in range(2):
+        assert len(fetch_history_page(client, HISTORY, 0, 5)) == 5
+        assert len(fetch_history_page(client, HISTORY, 5, 5)) == 4  # 1007 is dropped
+        # The last page is asked for with retmax clamped to the 2 remaining articles
+        assert len(fetch_history_page(client, HISTORY, 18, 5)) == 2
+
+    assert len(server.requests) == 4
@@ -0,0 +1,143 @@
+import random
+import string
+from itertools import product
+import numpy as np
+import pandas as pd
+from utils.cleandata import expand_studies, make_citations_unique, split_and_clean, split_and_clean_columns
+
+def _loop_make_citations_unique(citations):
+    """The per-row loop make_citations_unique replaced; its suffixes run past (z) into "{", "|", ..."""
+    counts = {}
+    unique_citations = []
+    for c in citations:
+        c_clean = str(c).strip()
+        if c_clean in counts:
+            counts[c_clean] += 1
+            unique_citations.append(f"{c_clean} ({chr(96 + counts[c_clean])})")
+        else:
+            counts[c_clean] = 1
+            unique_citations.append(c_clean)
+    return unique_citations
+
+# Suffixes by occurrence number from 27 on: (aa), (ab), ..., (zz)
+TWO_LETTER_SUFFIXES = ["".join(letters) for letters in product(string.ascii_lowercase, repeat=2)]
+
+def test_suffix_order():
+    result = make_citations_unique(["Smith, J., et al., 2020"] * 60)
+    suffixes = [citation.removeprefix("Smith, J., et al., 2020") for citation in result]
+    assert suffixes[:4] == ["", " (b)", " (c)", " (d)"]
+    assert suffixes[24:29] == [" (y)", " (z)", " (aa)", " (ab)", " (ac)"]
+    assert suffixes[50:54] == [" (ay)", " (az)", " (ba)", " (bb)"]
+    assert len(set(result)) == len(result)
+
+def test_suffixes_beyond_two_letters():
+    result = make_citations_unique(["A"] * 703)
+    assert result[701:] == ["A (zz)", "A (aaa)"]
+    assert len(set(result)) == len(result)
+
+def test_agrees_with_the_loop_up_to_and_beyond_26_duplicates():
+    rng = random.Random(7)
+    for _ in range(200):
+        names = [f"Author{i}, A., et al., {2000 + i}" for i in range(rng.randint(1, 8))]
+        citations = [rng.choice(names) + rng.choice(("", " ", "  ")) for _ in range(rng.randint(0, 120))]
+        expected = _loop_make_citations_unique(citations)
+        result = make_citations_unique(citations)
+        assert len(result) == len(expected)
+        counts = {}
+        for citation, old, new in zip(citations, expected, result):
+            counts[citation.strip()] = counts.get(citation.strip(), 0) + 1
+            # The loop ran out of letters after (z); from there the suffixes continue with (aa)
+            if counts[citation.strip()] <= 26:
+                assert new == old
+            else:
+                assert new == f"{citation.strip()} ({TWO_LETTER_SUFFIXES[counts[citation.strip()] - 27]})"
+        assert len(set(result)) == len(result)
+
+def test_series_keeps_its_index_and_name():
+    citations = pd.Series(["B", "A", "B", " B "], index=[10, 3, 7, 1], name="citation")
+    result = make_citations_unique(citations)
+    assert result.index.tolist() == [10, 3, 7, 1]
+    assert result.name == "citation"
+    assert result.tolist() == ["B", "A", "B (b)", "B (c)"]
+
+def test_return_keys_are_stable_per_citation():
+    unique, keys = make_citations_unique(["B", "A", "B"], return_keys=True)
+    _, again = make_citations_unique(["A", "B (b)"], return_keys=True)
+    assert unique == ["B", "A", "B (b)"]
+    assert len(set(keys)) == 3
+    assert list(again) == [keys[1], keys[2]]
+
+def _baseline_split_and_clean(df, column):
+    """split_and_clean before it was built on split_and_clean_columns."""
+    temp = df[["title", "citation", column]].copy()
+    temp[column] = temp[column].astype(str).str.replace(r"[\[\]'\"]", "", regex=True)
+    exploded = temp[column].str.split(r"[;,]").explode().str.strip()
+    df_out = temp.loc[exploded.index, ["title", "citation"]].copy()
+    df_out[column] = exploded
+    df_out = df_out[df_out[column].notna() & (df_out[column] != "")]
+    df_out.reset_index(drop=True, inplace=True)
+    return df_out
+
+STEPS = ["['ICA', 'Filtering']", "Filtering; ERD/ERS", np.nan, "", "  ,  ;", "['Epoching']", "ICA,ICA, Baseline",
+         "nan", "\"Re-referencing\"", " ; Averaging ; "]
+
+def _studies(rng, n):
+    return pd.DataFrame({
+        "title": [f"Title {i}" for i in range(n)],
+        "citation": [f"Author{i}, 20{i % 30:02d}" for i in range(n)],
+        "steps": [rng.choice(STEPS) for _ in range(n)],
+        "outcomes": [rng.choice(("ERP", "ERP; Power", np.nan, "[]", "Power, , Coherence")) for _ in range(n)],
+    })
+
+def _assert_same(result, expected):
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.astype(object), check_dtype=False)
+
+def test_split_and_clean_columns_matches_the_baseline_across_chunks():
+    rng = random.Random(5)
+    df = _studies(rng, 250)
+    for chunksize in (1, 7, 64, 100_000):
+        studies, tables = split_and_clean_columns(df, ["steps", "outcomes"], chunksize=chunksize)
+        for column in ("steps", "outcomes"):
+            _assert_same(expand_studies(studies, tables[column]), _baseline_split_and_clean(df, column))
+
+def test_split_and_clean_keeps_nan_cells_as_the_nan_string_and_drops_empty_tokens():
+    df = pd.DataFrame({"title": ["A", "B", "C", "D"], "citation": ["a", "b", "c", "d"],
+                       "steps": [np.nan, "", " ;, ", "[' ICA ', '']"]})
+
+    result = split_and_clean(df, "steps")
+
+    assert result["steps"].tolist() == ["nan", "ICA"]
+    assert result["citation"].tolist() == ["a", "d"]
+    _assert_same(result, _baseline_split_and_clean(df, "steps"))
+
+def test_split_and_clean_columns_ignores_duplicate_index_labels():
+    rng = random.Random(9)
+    df = _studies(rng, 40)
+    expected = _baseline_split_and_clean(df, "steps")
+    df.index = [i // 3 for i in range(len(df))]
+
+    studies, tables = split_and_clean_columns(df, ["steps"], chunksize=8)
+
+    # The baseline repeated rows sharing an index label; the study_id is the row position instead
+    _assert_same(expand_studies(studies, tables["steps"]), expected)
+    assert studies.index.tolist() == list(range(len(df)))
+
+def test_split_and_clean_columns_dtypes_and_study_ids():
+    df = pd.DataFrame({"title": ["A", "B", "C"], "citation": ["a", "b", "c"],
+                       "steps": ["ICA; Filtering", "Filtering", "ICA, Epoching"]})
+
+    studies, tables = split_and_clean_columns(df, ["steps"], chunksize=2)
+    table = tables["steps"]
+
+    assert table["study_id"].dtype == np.int32
+    assert isinstance(table["steps"].dtype, pd.CategoricalDtype)
+    assert table["study_id"].tolist() == [0, 0, 1, 2, 2]
+    assert table["steps"].tolist() == ["ICA", "Filtering", "Filtering", "ICA", "Epoching"]
+    assert studies.loc[table["study_id"], "citation"].tolist() == ["a", "a", "b", "c", "c"]
+    # Rows split across the chunk boundary share one set of categories
+    assert sorted(table["steps"].cat.categories) == ["Epoching", "Filtering", "ICA"]
+
+def test_split_and_clean_columns_of_an_empty_table():
+    df = pd.DataFrame({"title": [], "citation": [], "steps": []})
+    studies, tables = split_and_clean_columns(df, ["steps"])
+    assert len(studies) == 0 and len(tables["steps"]) == 0
@@ -0,0 +1,67 @@
+import os
+import pytest
+from utils.article_fetcher import read_txt_files
+from utils.corpus import TextCorpus
+
+FILES = {
+    "methods_1.txt": "  Participants were recorded.\n",
+    "methods_2.txt": "Line one\r\nline two\rline three\n",
+    "methods_3.txt": "Température, °C.",
+    "methods_4.txt": "",
+}
+
+def _read_txt_files(directory):
+    """The dictionary read_txt_files returned before it became a TextCorpus."""
+    txt_files = {}
+    for file in os.listdir(directory):
+        if file.endswith('.txt'):
+            with open(os.path.join(directory, file), 'r', encoding='utf-8') as f:
+                txt_files[file] = f.read().strip()
+    return txt_files
+
+@pytest.fixture
+def folder(tmp_path):
+    for name, text in FILES.items():
+        (tmp_path / name).write_bytes(text.encode("utf-8"))
+    (tmp_path / "notes.md").write_text("not a text file")
+    return tmp_path
+
+def test_corpus_behaves_like_the_old_dictionary(folder):
+    corpus = read_txt_files(folder)
+    expected = _read_txt_files(folder)
+
+    assert isinstance(corpus, TextCorpus)
+    assert dict(corpus) == expected
+    assert sorted(corpus) == sorted(expected) and len(corpus) == len(expected)
+    assert corpus["methods_2.txt"] == "Line one\nline two\nline three"
+    assert "methods_1.txt" in corpus and "notes.md" not in corpus
+    with pytest.raises(KeyError):
+        corpus["missing.txt"]
+    assert corpus.get("missing.txt") is None
+
+def test_corpus_evicts_once_the_cache_budget_is_exceeded(tmp_path):
+    for i in range(4):
+        (tmp_path / f"{i}.txt").write_text("x" * 100)
+    (tmp_path / "big.txt").write_text("y" * 1000)
+    corpus = TextCorpus(tmp_path, max_cached_bytes=250)
+
+    for i in range(4):
+        assert corpus[f"{i}.txt"] == "x" * 100
+    assert list(corpus._cache) == ["2.txt", "3.txt"] and corpus._cached_bytes == 200
+
+    # A hit moves a text to the end, files above the budget are never cached
+    corpus["2.txt"]
+    corpus["0.txt"]
+    assert corpus["big.txt"] == "y" * 1000
+    assert list(corpus._cache) == ["2.txt", "0.txt"] and corpus._cached_bytes == 200
+
+    assert TextCorpus(tmp_path, max_cached_bytes=0)["0.txt"] == "x" * 100
+
+def test_corpus_stream_yields_every_file(folder):
+    corpus = TextCorpus(folder)
+
+    streamed = dict(corpus.stream())
+
+    assert corpus._cache == {}
+    assert streamed == _read_txt_files(folder)
+    assert dict(TextCorpus(folder / "not_extracted_yet").stream()) == {}
@@ -0,0 +1,59 @@
+import os
+import runpy
+import matplotlib
+import matplotlib.pyplot as plt
+import pytest
+from utils.config import dir_proj
+from utils.datasets import CLEANED_TABLES
+from utils.renderprofile import RENDER_PROFILE_ENV
+
+matplotlib.use("Agg", force=True)
+
+FIG5 = dir_proj / "scripts" / "fig5_artifactrej.py"
+
+def _write_artifacts(root, rows):
+    table = root / "data" / "cleancsv" / CLEANED_TABLES["artifacts"]
+    table.parent.mkdir(parents=True)
+    lines = ["title,citation,artifactrej_methods"] + [f'T{i},"{citation}",{method}' for i, (citation, method) in enumerate(rows)]
+    table.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def _run(script):
+    try:
+        return runpy.run_path(os.fspath(script), run_name="__main__")
+    finally:
+        plt.close("all")
+
+def test_fig5_heatmap_leaves_out_undated_studies(alt_root, monkeypatch):
+    monkeypatch.setenv(RENDER_PROFILE_ENV, "draft")
+    rows = [(f"Author{i}, A., et al., {2010 + i % 5}", "ICA" if i % 2 else "Threshold") for i in range(260)]
+    rows += [("Undated, B., et al., in press", "ICA"), ("Undated, C., et al.", "Visual inspection")]
+    _write_artifacts(alt_root, rows)
+
+    result = _run(FIG5)
+
+    assert len(result["studies"]) > result["MAX_BAR_STUDIES"]
+    assert sorted(result["undated"]) == ["Undated, B., et al., in press", "Undated, C., et al."]
+    counts = result["year_counts"]
+    assert list(counts.columns) == [str(year) for year in range(2010, 2015)]
+    assert counts.to_numpy().sum() == 260
+    # Visual inspection is only used by an undated study
+    assert counts.loc["Visual inspection"].sum() == 0
+    assert (alt_root / "plots" / "draft" / "fig5_artifactrej.png").exists()
+
+@pytest.mark.parametrize("profile", ["final", "draft"])
+def test_fig5_stacked_bars_draw_every_method_of_every_study(alt_root, monkeypatch, profile):
+    monkeypatch.setenv(RENDER_PROFILE_ENV, profile)
+    _write_artifacts(alt_root, [("A, 2020", "ICA"), ("A, 2020", "Threshold"), ("B, 2021", "ICA"), ("C, 2022", "Visual")])
+
+    try:
+        # The figure is still open after the script, to inspect what it drew
+        result = runpy.run_path(os.fspath(FIG5), run_name="__main__")
+        ax = plt.gca()
+        assert [label.get_text() for label in ax.get_xticklabels()] == ["A, 2020", "B, 2021", "C, 2022"]
+        if profile == "final":
+            heights = [patch.get_height() for patch in ax.patches]
+            assert len(heights) == result["values"].size and sum(heights) == 4
+        else:
+            assert len(ax.collections[0].get_paths()) == 4
+    finally:
+        plt.close("all")
@@ -0,0 +1,41 @@
+import pandas as pd
+from utils import datasets
+from utils.article_store import SQLiteStore, open_store
+from utils.renderprofile import RENDER_PROFILE_ENV, plot_path
+from utils.search_index import SearchIndex
+
+def test_dataset_paths_follow_the_root(alt_root):
+    assert datasets.RAW_DATASET == alt_root / "data" / datasets.RAW_DATASET_FILE
+    assert datasets.DATASET_CACHE_DIR == alt_root / "results" / "dataset_cache"
+    assert datasets.dataset_path("steps") == alt_root / "data" / "cleancsv" / datasets.CLEANED_TABLES["steps"]
+
+def test_load_studies_reads_and_caches_under_the_root(alt_root):
+    assert not (alt_root / "results").exists()
+    raw = alt_root / "data" / datasets.RAW_DATASET_FILE
+    raw.parent.mkdir(parents=True)
+    raw.write_text("Citation;Gait Task\nSmith, 2020;Walking\n", encoding="utf-8-sig")
+    df = datasets.load_studies()
+    pd.testing.assert_frame_equal(df, pd.DataFrame({"citation": ["Smith, 2020"], "gait_task": ["Walking"]}))
+    assert any((alt_root / "results" / "dataset_cache").iterdir())
+
+def test_plot_path_follows_the_root(alt_root, monkeypatch):
+    assert plot_path("fig1.png", create=False) == alt_root / "plots" / "fig1.png"
+    assert not (alt_root / "plots").exists()
+    monkeypatch.setenv(RENDER_PROFILE_ENV, "draft")
+    assert plot_path("fig1.png") == alt_root / "plots" / "draft" / "fig1.png"
+    assert (alt_root / "plots" / "draft").is_dir()
+
+def test_sqlite_store_is_created_on_first_write(tmp_path):
+    root = tmp_path / "store"
+    store = SQLiteStore(root)
+    assert store.ids() == [] and len(store) == 0 and "1" not in store
+    store.delete("1")
+    assert not root.exists()
+    store.put("1", "<article/>")
+    assert open_store(root).backend == "sqlite"
+    assert open_store(root).get("1") == b"<article/>"
+
+def test_search_index_creates_its_folder(tmp_path):
+    with SearchIndex(tmp_path / "results" / "search_index.sqlite") as index:
+        assert len(index) == 0
+    assert (tmp_path / "results" / "search_index.sqlite").exists()
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from utils.article_store import open_store
+from utils.manifest import STATUS_DONE, STATUS_FAILED, DownloadManifest, parse_age
+
+@pytest.fixture
+def manifest(tmp_path):
+    with DownloadManifest(tmp_path / "results" / "download_manifest.sqlite") as manifest:
+        yield manifest
+
+def _age(manifest, pmc_id, age):
+    """Backdates the fetch time of a recorded ID."""
+    fetched_at = (datetime.now(timezone.utc) - age).isoformat()
+    manifest._conn.execute("UPDATE downloads SET fetched_at = ? WHERE pmc_id = ?", (fetched_at, pmc_id))
+    manifest._conn.commit()
+
+def test_parse_age():
+    assert parse_age("7d") == timedelta(days=7)
+    assert parse_age("12h") == timedelta(hours=12)
+    assert parse_age(" 30M ") == timedelta(minutes=30)
+    assert parse_age("2") == timedelta(days=2)
+    assert parse_age("1.5w") == timedelta(weeks=1.5)
+    for value in ("", "d", "7 days", "-1d", "7x", "1d2h"):
+        with pytest.raises(ValueError):
+            parse_age(value)
+
+def test_record_failed_never_demotes_a_done_row(manifest):
+    manifest.record_done("1", "<article/>")
+    _age(manifest, "1", timedelta(days=3))
+    done_at = manifest._conn.execute("SELECT fetched_at FROM downloads WHERE pmc_id = '1'").fetchone()[0]
+    manifest.record_failed("1", "HTTP 500")
+    manifest.record_failed("2", "HTTP 500")
+
+    rows = {row[0]: row[1:] for row in manifest._conn.execute("SELECT pmc_id, status, fetched_at, error FROM downloads")}
+    assert rows["1"] == (STATUS_DONE, done_at, "HTTP 500")
+    assert rows["2"][0] == STATUS_FAILED
+    assert manifest.summary() == {STATUS_DONE: 1, STATUS_FAILED: 1}
+    # A later success replaces the failure
+    manifest.record_done("2", "<article/>")
+    assert manifest.summary() == {STATUS_DONE: 2}
+
+def test_pending_ids_skip_done_and_keep_failed_and_unknown_ids(manifest):
+    manifest.record_done("1", "<article/>")
+    manifest.record_failed("2", "timeout")
+    manifest.record_done("3", "<article/>")
+    assert list(manifest.pending_ids(iter(["4", "3", "2", "1"]))) == ["4", "2"]
+
+def test_pending_ids_refresh_old_downloads(manifest):
+    for pmc_id in ("1", "2", "3"):
+        manifest.record_done(pmc_id, "<article/>")
+    _age(manifest, "1", timedelta(days=8))
+    _age(manifest, "2", timedelta(days=6))
+    assert list(manifest.pending_ids(["1", "2", "3"], refresh_older_than=parse_age("7d"))) == ["1"]
+    assert list(manifest.pending_ids(["1", "2", "3"], refresh_older_than=parse_age("12h"))) == ["1", "2"]
+    assert list(manifest.pending_ids(["1", "2", "3"])) == []
+
+def test_pending_ids_refetch_done_ids_missing_from_the_store(manifest, tmp_path):
+    store = open_store(tmp_path / "fulltexts")
+    store.put("1", "<article/>")
+    manifest.record_done("1", "<article/>")
+    manifest.record_done("2", "<article/>")
+    assert list(manifest.pending_ids(["1", "2"], store=store)) == ["2"]
+
+def test_a_new_manifest_is_created_on_first_write(tmp_path):
+    path = tmp_path / "results" / "download_manifest.sqlite"
+    with DownloadManifest(path) as manifest:
+        assert list(manifest.pending_ids(["1"])) == ["1"] and manifest.summary() == {}
+        assert not path.parent.exists()
+        manifest.record_failed("1")
+    assert path.exists()
@@ -0,0 +1,154 @@
+import io
+import random
+import string
+from thefuzz import fuzz
+from utils import methodstext
+from utils.methodstext import (
+    METHODS_TITLES, SIMILARITY_THRESHOLD, TitleClassifier, extract_methods, extract_methods_text, extractor_version,
+)
+
+SECTION_TITLES = [
+    "Introduction", "Results", "Discussion", "Conclusion", "Abstract", "Acknowledgements", "References",
+    "Participants", "Data analysis", "Statistical analysis", "EEG recording", "Experimental design",
+    "Materials", "Methods and materials", "Material and methods", "Methodologies", "Meth0ds",
+]
+
+def _plain(title, references=METHODS_TITLES, threshold=SIMILARITY_THRESHOLD):
+    """The unmemoized, unfiltered classifier: fuzz.ratio of the normalized title against every reference."""
+    key = TitleClassifier.normalize(title)
+    return any(fuzz.ratio(key, ref) >= threshold for ref in references)
+
+def _mutate(rng, title):
+    """Applies a few random edits, numbering and case changes to a title."""
+    chars = list(title)
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(chars))
+        edit = rng.choice(("insert", "delete", "replace"))
+        if edit == "insert" or not chars:
+            chars.insert(position, rng.choice(string.ascii_lowercase + " "))
+        elif edit == "delete":
+            del chars[min(position, len(chars) - 1)]
+        else:
+            chars[min(position, len(chars) - 1)] = rng.choice(string.ascii_lowercase)
+    title = "".join(chars)
+    if rng.random() < 0.3:
+        title = rng.choice(("2. ", "2.1 ", "II. ", "A) ", "3: ")) + title
+    if rng.random() < 0.3:
+        title += rng.choice((".", ":", " ", "  ;"))
+    return title.upper() if rng.random() < 0.2 else title.title() if rng.random() < 0.3 else title
+
+def test_title_classifier_matches_plain_fuzzy_matching():
+    rng = random.Random(12)
+    pool = sorted(METHODS_TITLES) + SECTION_TITLES
+    titles = [_mutate(rng, rng.choice(pool)) for _ in range(5000)]
+    # Repeat titles so that decisions also come from the cache, and evict often
+    titles += rng.choices(titles, k=5000)
+    classifier = TitleClassifier(maxsize=64)
+
+    mismatches = [title for title in titles if classifier(title) != _plain(title)]
+
+    assert mismatches == []
+    assert classifier.hits and classifier.misses
+    assert classifier.fuzzy_calls < classifier.misses * len(METHODS_TITLES)
+
+def test_title_classifier_matches_plain_fuzzy_matching_at_other_thresholds():
+    rng = random.Random(3)
+    titles = [_mutate(rng, rng.choice(sorted(METHODS_TITLES))) for _ in range(2000)]
+    for threshold in (50, 70, 90, 100):
+        classifier = TitleClassifier(threshold=threshold)
+        assert [classifier(title) for title in titles] == [_plain(title, threshold=threshold) for title in titles]
+
+ARTICLE = b"""<article><body>
+<sec><title>Introduction</title><p>Intro text.</p>
+  <sec sec-type="methods"><title>Study design</title><p>Nested <italic>methods</italic> under intro.</p></sec>
+</sec>
+<sec><title>2. Materials and <bold>Methods</bold></title>
+  <p>First <italic>inline</italic> paragraph.</p>
+  <sec><title>Methods</title><p>Inner methods.</p></sec>
+  <p>After subsection.</p>
+</sec>
+<sec><title>Results</title><p>Results text.</p></sec>
+</body></article>"""
+
+def _extract(xml):
+    return extract_methods_text(io.BytesIO(xml))
+
+def test_extract_methods_text_emits_nested_methods_sections_once():
+    text, sections, _ = _extract(ARTICLE)
+
+    assert text.count("Inner methods.") == 1
+    assert "Intro text." not in text and "Results text." not in text
+    assert [section["path"] for section in sections] == [
+        ["Introduction", "Study design"],
+        ["2. Materials and Methods"],
+        ["2. Materials and Methods", "Methods"],
+    ]
+
+def test_extract_methods_text_classifies_by_sec_type_and_by_title():
+    by_type = b'<article><sec sec-type="methods"><title>Study design</title><p>A.</p></sec></article>'
+    by_title = b"<article><sec><title>Material and methods</title><p>B.</p></sec></article>"
+    neither = b'<article><sec sec-type="results"><title>Findings</title><p>C.</p></sec></article>'
+
+    assert _extract(by_type)[0] == "A."
+    assert _extract(by_title)[0] == "B."
+    assert _extract(neither) == ("", [], [])
+
+def test_extract_methods_text_finds_methods_subsection_of_other_section():
+    xml = b"<article><sec><title>Experiment 1</title><p>Skip.</p><sec><title>Methods</title><p>Keep.</p></sec></sec></article>"
+
+    text, sections, paragraphs = _extract(xml)
+
+    assert text == "Keep."
+    assert sections == [{"path": ["Experiment 1", "Methods"], "start": 0, "end": 5}]
+    assert paragraphs == [{"section_path": ["Experiment 1", "Methods"], "start": 0, "end": 5}]
+
+def test_extract_methods_text_keeps_text_of_inline_markup():
+    text, _, _ = _extract(ARTICLE)
+
+    # Text nodes are joined by a newline and top-level methods sections by a blank line
+    assert text == ("Nested\nmethods\nunder intro.\n\n"
+                    "First\ninline\nparagraph.\nInner methods.\nAfter subsection.")
+
+def test_extract_methods_text_records_section_and_paragraph_spans():
+    text, sections, paragraphs = _extract(ARTICLE)
+
+    assert [text[s["start"]:s["end"]] for s in sections] == [
+        "Nested\nmethods\nunder intro.",
+        "First\ninline\nparagraph.\nInner methods.\nAfter subsection.",
+        "Inner methods.",
+    ]
+    assert [(p["section_path"][-1], text[p["start"]:p["end"]]) for p in paragraphs] == [
+        ("Study design", "Nested\nmethods\nunder intro."),
+        ("2. Materials and Methods", "First\ninline\nparagraph."),
+        ("Methods", "Inner methods."),
+        ("2. Materials and Methods", "After subsection."),
+    ]
+
+def test_extract_methods_skips_unchanged_articles_and_reruns_on_new_rules(tmp_path, monkeypatch):
+    articles, output = tmp_path / "articles", tmp_path / "methods"
+    articles.mkdir()
+    (articles / "1.xml").write_bytes(b"<article><sec><title>Methods</title><p>One.</p></sec></article>")
+    (articles / "2.xml").write_bytes(b'<article><sec sec-type="methods"><title>Design</title><p>Two.</p></sec></article>')
+    (articles / "3.xml").write_bytes(b"<article><sec><title>Results</title><p>Three.</p></sec></article>")
+
+    report = extract_methods(articles, output, workers=1)
+    assert (report["extracted"], report["no_methods"], report["skipped"]) == (["1", "2"], ["3"], [])
+
+    report = extract_methods(articles, output, workers=1)
+    assert (report["extracted"], report["skipped"]) == ([], ["1", "2", "3"])
+
+    (articles / "2.xml").write_bytes(b'<article><sec sec-type="methods"><p>Two, revised.</p></sec></article>')
+    (articles / "3.xml").unlink()
+    report = extract_methods(articles, output, workers=1)
+    assert (report["extracted"], report["skipped"], report["removed"]) == (["2"], ["1"], ["3"])
+    assert (output / "methods_2.txt").read_text(encoding="utf-8") == "Two, revised."
+
+    # New matching rules change the extractor version: every article is extracted again,
+    # and the output of an article that no longer has methods is dropped
+    version = extractor_version()
+    monkeypatch.setattr(methodstext, "METHODS_TITLES", {"procedure"})
+    assert extractor_version() != version
+    report = extract_methods(articles, output, workers=1)
+    assert (report["extracted"], report["no_methods"], report["skipped"]) == (["2"], ["1"], [])
+    assert not (output / "methods_1.txt").exists()
+    assert (output / "methods_2.txt").exists()
@@ -0,0 +1,117 @@
+from collections import Counter
+from itertools import combinations, product
+import numpy as np
+import pandas as pd
+import pytest
+from utils.multivalue import cross_product, crosstab, indicator_matrix, split_values
+from utils.stepcounts import cooccurrence_matrix, count_cooccurrences, count_transitions, count_values
+
+# Studies with missing values, empty entries, stray separators and whitespace, and a repeated value
+STUDIES = pd.DataFrame({
+    "type_of_eeg_electrodes": ["Wet;Dry", np.nan, "Active wet", "", " Dry ;;Wet", "Dry;Dry", "Wet"],
+    "gait_measurement_system": ["IMU;Force plates", "IMU", np.nan, "Motion capture", "IMU ", ";", "nan"],
+}, index=[4, 9, 2, 7, 0, 5, 1])
+
+# Merged step and outcome sequences as fig3 builds them (missing values already filled with "")
+SEQUENCES = pd.DataFrame({
+    "step_keywords": ["Raw data;High-pass filter;ICA", "Raw data;ICA;ICA", "", "Raw data", ";Raw data;;Epoching;",
+                      "Raw data;High-pass filter;ICA", "nan"],
+    "outcome_keywords": ["PSD;ERSP", "", "PSD", "ERSP", "PSD", "PSD", ""],
+})
+
+def test_cross_product_and_crosstab_match_the_row_loop():
+    rows = []
+    for _, row in STUDIES.iterrows():
+        eeg_types = [e.strip() for e in str(row.get("type_of_eeg_electrodes", "")).split(";") if e.strip()]
+        gait_systems = [g.strip() for g in str(row.get("gait_measurement_system", "")).split(";") if g.strip()]
+        for eeg, gait in product(eeg_types, gait_systems):
+            rows.append({"Type_of_EEG_electrodes": eeg, "Gait_measurement_system": gait})
+    expected = pd.DataFrame(rows)
+
+    pairs = cross_product(split_values(STUDIES["type_of_eeg_electrodes"]),
+                          split_values(STUDIES["gait_measurement_system"]),
+                          names=("Type_of_EEG_electrodes", "Gait_measurement_system"))
+
+    pd.testing.assert_frame_equal(pairs, expected)
+    expected_table = expected.groupby(["Type_of_EEG_electrodes", "Gait_measurement_system"]).size().unstack(fill_value=0)
+    table = crosstab(pairs, "Type_of_EEG_electrodes", "Gait_measurement_system")
+    pd.testing.assert_frame_equal(table, expected_table, check_dtype=False, check_names=False)
+
+def test_crosstab_drops_missing_labels_like_pandas():
+    pairs = pd.DataFrame({"Method": ["ASR", np.nan, "ICA", "ASR", "ICA"], "Year": ["2020", "2021", None, "2021", "2020"]})
+    expected = pd.crosstab(pairs["Method"], pairs["Year"])
+    pd.testing.assert_frame_equal(crosstab(pairs, "Method", "Year"), expected, check_dtype=False)
+
+def test_step_counts_and_transitions_match_the_row_loop():
+    step_counts, transition_counts = Counter(), Counter()
+    for _, row in SEQUENCES.iterrows():
+        steps = [s for s in row["step_keywords"].split(";") if s]
+        outcomes = [o for o in row["outcome_keywords"].split(";") if o]
+        step_counts.update(steps)
+        for i in range(len(steps) - 1):
+            transition_counts[(steps[i], steps[i + 1])] += 1
+        if steps and outcomes:
+            for out in outcomes:
+                transition_counts[(steps[-1], out)] += 1
+
+    steps = split_values(SEQUENCES["step_keywords"], strip=False)
+    outcomes = split_values(SEQUENCES["outcome_keywords"], strip=False)
+    counts = count_values(steps)
+    transitions = count_transitions(steps, outcomes)
+
+    # Same counts, in the same order of first appearance
+    assert list(counts.items()) == list(step_counts.items())
+    assert [((src, dst), count) for src, dst, count in transitions.itertuples(index=False)] == list(transition_counts.items())
+
+def test_count_transitions_without_outcomes_or_steps():
+    steps = split_values(pd.Series(["A;B;A", "", "B;A"]))
+    transitions = count_transitions(steps)
+    assert list(transitions.itertuples(index=False, name=None)) == [("A", "B", 1), ("B", "A", 2)]
+    empty = count_transitions(split_values(pd.Series(["", "A"])), split_values(pd.Series(["", ""])))
+    assert list(empty.columns) == ["source", "target", "count"] and empty.empty
+
+def test_cooccurrences_and_indicators_match_the_row_loops():
+    pipelines = pd.Series([["A", "B", "C"], [], ["C", "A", "A"], ["B"], ["D", "B", "C", "A"], ["C", "B"]],
+                          index=[3, 1, 4, 0, 5, 2])
+    pair_counts = {}
+    for steps in pipelines:
+        for combo in combinations(sorted(set(steps)), 2):
+            pair_counts[combo] = pair_counts.get(combo, 0) + 1
+    all_steps = sorted({step for steps in pipelines for step in steps})
+    expected_indicators = pd.DataFrame({step: pipelines.apply(lambda s: step in s) for step in all_steps})
+
+    exploded = pipelines.explode().dropna()
+    pairs = count_cooccurrences(exploded)
+    indicators = indicator_matrix(exploded, index=pipelines.index, columns=all_steps)
+
+    assert [((a, b), c) for a, b, c in pairs.itertuples(index=False)] == list(pair_counts.items())
+    pd.testing.assert_frame_equal(indicators, expected_indicators, check_names=False)
+    matrix = cooccurrence_matrix(exploded)
+    for (a, b), count in pair_counts.items():
+        assert matrix.loc[a, b] == matrix.loc[b, a] == count
+    assert [matrix.loc[step, step] for step in all_steps] == [int(indicators[step].sum()) for step in all_steps]
+
+def test_indicator_matrix_matches_the_pivot_loop_with_missing_methods():
+    df = pd.DataFrame({
+        "Citation": ["Smith 2020", "Unknown Study", "Smith 2020", "Lee 2019", "Unknown Study", "Lee 2019"],
+        "artifactrej_methods": ["ASR", np.nan, "ICA", "ASR", "ASR", "ASR"],
+    })
+    studies, methods = df["Citation"].unique(), df["artifactrej_methods"].unique()
+    expected = pd.DataFrame(0, index=studies, columns=methods)
+    for title, group in df.groupby("Citation"):
+        for m in group["artifactrej_methods"]:
+            expected.loc[title, m] = 1
+
+    pivot = indicator_matrix(df.set_index("Citation")["artifactrej_methods"], index=studies, columns=methods,
+                             dtype=np.int64)
+
+    pd.testing.assert_frame_equal(pivot, expected, check_names=False)
+
+def test_indicator_matrix_rejects_unknown_studies_and_values():
+    values = pd.Series(["ASR", "ICA"], index=["Smith 2020", "Lee 2019"])
+    with pytest.raises(KeyError):
+        indicator_matrix(values, index=["Smith 2020"])
+    with pytest.raises(KeyError):
+        indicator_matrix(values, columns=["ASR"])
+    # Studies without values get an empty row
+    assert indicator_matrix(values, index=["Lee 2019", "Kim 2021", "Smith 2020"]).sum(axis=1).tolist() == [1, 0, 1]
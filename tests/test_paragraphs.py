@@ -0,0 +1,73 @@
+import json
+from utils.paragraphs import (
+    PARAGRAPHS_FILE, PARAGRAPHS_INDEX, ParagraphWriter, paragraph_index, paragraph_records, read_paragraphs,
+)
+
+TEXTS = {
+    "10": ("Alpha one.\nAlpha two.", [(["Methods"], 0, 10), (["Methods", "EEG"], 11, 21)]),
+    "20": ("Beta, with ü.", [(["Methods"], 0, 13)]),
+    "30": ("Gamma.", [(["Materials and methods"], 0, 6)]),
+}
+
+def _records(pmc_id, text=None):
+    text, spans = (text, [([], 0, len(text))]) if text is not None else TEXTS[pmc_id]
+    return paragraph_records(pmc_id, text, [{"section_path": p, "start": s, "end": e} for p, s, e in spans])
+
+def _write(folder, records, keep_ids=()):
+    with ParagraphWriter(folder, keep_ids=keep_ids) as writer:
+        for pmc_id in sorted(records):
+            writer.write(pmc_id, records[pmc_id])
+
+def _article_bytes(folder, pmc_id):
+    start, end = paragraph_index(folder)[pmc_id]
+    return (folder / PARAGRAPHS_FILE).read_bytes()[start:end]
+
+def test_kept_articles_survive_a_rewrite_byte_for_byte(tmp_path):
+    _write(tmp_path, {pmc_id: _records(pmc_id) for pmc_id in TEXTS})
+    before = {pmc_id: _article_bytes(tmp_path, pmc_id) for pmc_id in TEXTS}
+
+    # 20 is rewritten, 10 and 30 are kept
+    _write(tmp_path, {"20": _records("20", "Beta, revised.")}, keep_ids=["10", "30"])
+
+    assert _article_bytes(tmp_path, "10") == before["10"]
+    assert _article_bytes(tmp_path, "30") == before["30"]
+    assert _article_bytes(tmp_path, "20") != before["20"]
+    assert [r["text"] for r in read_paragraphs(tmp_path, pmc_ids=["20"])] == ["Beta, revised."]
+    # Articles stay in PMC ID order in the file
+    lines = (tmp_path / PARAGRAPHS_FILE).read_bytes().splitlines()
+    assert [json.loads(line)["pmc_id"] for line in lines] == ["10", "10", "20", "30"]
+
+def test_removed_articles_leave_the_file_and_the_index(tmp_path):
+    _write(tmp_path, {pmc_id: _records(pmc_id) for pmc_id in TEXTS})
+
+    _write(tmp_path, {}, keep_ids=["10", "30"])
+
+    assert set(paragraph_index(tmp_path)) == {"10", "30"}
+    assert {r["pmc_id"] for r in read_paragraphs(tmp_path)} == {"10", "30"}
+    assert list(read_paragraphs(tmp_path, pmc_ids=["20"])) == []
+
+def test_read_paragraphs_selects_articles_and_columns(tmp_path):
+    _write(tmp_path, {pmc_id: _records(pmc_id) for pmc_id in TEXTS})
+
+    rows = list(read_paragraphs(tmp_path, pmc_ids=["30", "10", "99"], columns=["pmc_id", "paragraph", "text"]))
+
+    assert rows == [
+        {"pmc_id": "30", "paragraph": 0, "text": "Gamma."},
+        {"pmc_id": "10", "paragraph": 0, "text": "Alpha one."},
+        {"pmc_id": "10", "paragraph": 1, "text": "Alpha two."},
+    ]
+    assert list(read_paragraphs(tmp_path / "missing")) == []
+
+def test_failed_rewrite_keeps_the_previous_file(tmp_path):
+    _write(tmp_path, {pmc_id: _records(pmc_id) for pmc_id in TEXTS})
+    before = (tmp_path / PARAGRAPHS_FILE).read_bytes()
+
+    try:
+        with ParagraphWriter(tmp_path, keep_ids=["10"]) as writer:
+            writer.write("20", _records("20", "Half written."))
+            raise RuntimeError("interrupted")
+    except RuntimeError:
+        pass
+
+    assert (tmp_path / PARAGRAPHS_FILE).read_bytes() == before
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([PARAGRAPHS_FILE, PARAGRAPHS_INDEX])
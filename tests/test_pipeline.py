@@ -0,0 +1,90 @@
+import pytest
+from utils.pipeline import Pipeline, dependencies, levels, stages
+
+COPY = """import sys
+from pathlib import Path
+source, target = map(Path, sys.argv[1:])
+if source.read_text() == "fail":
+    sys.exit(1)
+target.write_text(source.read_text())
+"""
+
+@pytest.fixture
+def table(alt_root):
+    """Three stages copying files: a (src.txt -> a.txt), then b and c (a.txt -> b.txt, c.txt)."""
+    script = alt_root / "copy.py"
+    script.write_text(COPY)
+    (alt_root / "src.txt").write_text("one")
+
+    def copy(source, target, **extra):
+        return {"script": script, "args": [str(alt_root / source), str(alt_root / target)],
+                "inputs": [alt_root / source], "outputs": [alt_root / target], **extra}
+
+    return {"a": copy("src.txt", "a.txt"), "b": copy("a.txt", "b.txt"), "c": copy("a.txt", "c.txt")}
+
+def _statuses(results):
+    return {result["name"]: result["status"] for result in results}
+
+def test_stage_table_and_state_follow_the_root(alt_root):
+    assert stages()["extract"]["outputs"] == [alt_root / "results" / "methods"]
+    assert stages()["clean"]["inputs"][0].parent == alt_root / "data"
+    assert Pipeline().state_path == alt_root / "results" / "pipeline_state.json"
+
+def test_levels_order_stages_after_their_upstream_stages(table):
+    graph = dependencies(table=table)
+
+    assert graph == {"a": [], "b": ["a"], "c": ["a"]}
+    assert levels(graph) == [["a"], ["b", "c"]]
+    assert dependencies(["b"], table) == {"a": [], "b": ["a"]}
+    # The figures read the studies export or the cleaned tables written by clean
+    assert levels(dependencies(table=stages())) == [
+        ["retrieve", "clean", "fig1", "fig2", "fig4"], ["filter", "fig3", "fig5"], ["extract"], ["index", "tag"]]
+
+def test_levels_detect_cycles():
+    with pytest.raises(ValueError, match="Cycle between stages: x, y"):
+        levels({"w": [], "x": ["y"], "y": ["x", "w"]})
+
+def test_unknown_stage(table):
+    with pytest.raises(ValueError, match="Unknown stage 'd'"):
+        dependencies(["b", "d"], table)
+
+def test_status_reasons(table, alt_root):
+    pipeline = Pipeline(table=table)
+    assert pipeline.status("a") == "missing outputs"
+
+    assert _statuses(pipeline.run(report=lambda line: None)) == {"a": "ran", "b": "ran", "c": "ran"}
+    assert (alt_root / "c.txt").read_text() == "one"
+    # The hashes are kept between runs
+    pipeline = Pipeline(table=table)
+    assert [pipeline.status(name) for name in table] == ["up to date"] * 3
+
+    (alt_root / "src.txt").write_text("two!")
+    (alt_root / "b.txt").write_text("edited")
+    (alt_root / "c.txt").unlink()
+    assert [pipeline.status(name) for name in table] == ["inputs changed", "outputs changed", "missing outputs"]
+
+    pipeline.stamps.clear()
+    (alt_root / "c.txt").write_text("one")
+    assert pipeline.status("c") == "never run"
+
+def test_downstream_stages_are_skipped_when_upstream_outputs_are_unchanged(table):
+    table["a"]["always"] = True
+    pipeline = Pipeline(table=table)
+    pipeline.run(report=lambda line: None)
+
+    # The plan cannot know that a will write the same a.txt again
+    assert [(name, reason) for _, name, reason in pipeline.plan()] == [
+        ("a", "always runs"), ("b", "upstream stage may change its inputs"), ("c", "upstream stage may change its inputs")]
+    assert _statuses(pipeline.run(report=lambda line: None)) == {"a": "ran", "b": "skipped", "c": "skipped"}
+    assert _statuses(pipeline.run(["b"], force=True, report=lambda line: None)) == {"a": "ran", "b": "ran"}
+
+def test_stages_downstream_of_a_failure_are_blocked(table, alt_root):
+    pipeline = Pipeline(table=table)
+    (alt_root / "src.txt").write_text("fail")
+
+    results = pipeline.run(report=lambda line: None)
+
+    assert _statuses(results) == {"a": "failed", "b": "blocked", "c": "blocked"}
+    assert results[1]["reason"] == "upstream stage failed"
+    assert "a" not in pipeline.stamps
+    assert (alt_root / "logs" / "pipeline_a.log").exists()
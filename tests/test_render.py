@@ -0,0 +1,34 @@
+import sys
+from utils.config import dir_proj
+from utils.render import _render, input_digest, render_stamps_file, script_inputs
+
+def test_script_inputs_follow_indirect_imports(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text("import os\nfrom utils.methodstext import extract_methods\n"
+                      "from utils import (vocabulary,\n    multivalue as mv)\n", encoding="utf-8")
+    names = [path.name for path in script_inputs(script)]
+    assert names[0] == "script.py"
+    # methodstext imports article_store and paragraphs, which import config
+    assert set(names[1:]) == {"methodstext.py", "article_store.py", "paragraphs.py", "config.py",
+                              "vocabulary.py", "multivalue.py"}
+
+def test_script_inputs_of_a_figure_include_the_modules_of_its_helpers():
+    names = {path.name for path in script_inputs(dir_proj / "scripts" / "fig3_stepsnetwork.py")}
+    assert {"stepcounts.py", "multivalue.py", "datasets.py", "config.py"} <= names
+
+def test_input_digest_with_the_data_outside_the_checkout(alt_root):
+    assert render_stamps_file() == alt_root / "results" / "render_stamps.json"
+    digest = input_digest("fig3")
+    table = alt_root / "data" / "cleancsv" / "Step_Keywords_cleaned.csv"
+    table.parent.mkdir(parents=True)
+    table.write_text("title,citation,step_keywords\nA,B,Raw data\n", encoding="utf-8")
+    assert input_digest("fig3") != digest
+
+def test_matplotlib_import_failure_is_recorded_as_the_figure_failure(alt_root, monkeypatch):
+    monkeypatch.setitem(sys.modules, "matplotlib", None)
+
+    result = _render("fig1")
+
+    assert result["name"] == "fig1"
+    assert result["error"].startswith("ModuleNotFoundError")
+    assert result["log"].startswith(str(alt_root))
@@ -0,0 +1,93 @@
+import os
+import random
+import pytest
+from utils.corpus import TextCorpus
+from utils.search_index import (SearchIndex, _decode_positions, _decode_varints, _encode_positions,
+                                _encode_varints, tokenize)
+
+DOCUMENTS = {
+    "1": "Data were high-pass filtered at 1 Hz. Independent component analysis (ICA) was run with AMICA.",
+    "2": "Artifacts were removed with ASR. Components were labelled with ICLabel.",
+    "3": "We applied ASR and removed eye artifacts using independent component analysis.",
+    "4": "A notch filter removed line noise; the data were epoched and baseline corrected.",
+}
+
+def _write(folder, pmc_id, text):
+    path = folder / f"methods_{pmc_id}.txt"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+@pytest.fixture
+def corpus(tmp_path):
+    folder = tmp_path / "methods"
+    folder.mkdir()
+    for pmc_id, text in DOCUMENTS.items():
+        _write(folder, pmc_id, text)
+    return TextCorpus(folder)
+
+@pytest.fixture
+def index(tmp_path, corpus):
+    with SearchIndex(tmp_path / "index" / "search_index.sqlite") as index:
+        index.update(corpus)
+        yield index
+
+def test_varints_round_trip():
+    rng = random.Random(0)
+    values = [0, 1, 127, 128, 255, 16383, 16384, 2 ** 32, 2 ** 63] + [rng.randrange(2 ** 40) for _ in range(1000)]
+    assert _decode_varints(_encode_varints(values)) == values
+
+def test_positions_round_trip():
+    positions = [(position, offset) for position, offset in
+                 zip(range(0, 3000, 7), range(0, 30000, 70))]
+    blob = _encode_positions(positions)
+    assert _decode_positions(blob) == positions
+    assert len(blob) < 2 * len(positions) + 4
+    assert _decode_positions(_encode_positions([])) == []
+
+def test_postings_give_the_offsets_of_every_occurrence(index):
+    postings = index.postings("ASR")
+    assert set(postings) == {"2", "3"}
+    for pmc_id, offsets in postings.items():
+        assert [DOCUMENTS[pmc_id][offset:offset + 3] for offset in offsets] == ["ASR"]
+    text = DOCUMENTS["1"]
+    assert index.postings("high-pass") == {"1": [text.index("high-pass")]}
+
+def test_boolean_queries(index):
+    assert index.search("asr") == ["2", "3"]
+    assert index.search("ASR AND iclabel") == ["2"]
+    assert index.search("ASR iclabel") == ["2"]
+    assert index.search("iclabel OR notch") == ["2", "4"]
+    assert index.search("ica NOT amica") == []
+    assert index.search("NOT asr") == ["1", "4"]
+    assert index.search('ASR AND (iclabel OR "independent component")') == ["2", "3"]
+    assert index.search("epoch* OR filter*") == ["1", "4"]
+
+def test_phrase_queries(index):
+    assert index.search('"independent component analysis"') == ["1", "3"]
+    assert index.search('"component analysis independent"') == []
+    assert index.search('"line noise"') == ["4"]
+    assert index.search('"noise line"') == []
+
+def test_invalid_queries_raise(index):
+    for query in ("", "(asr", "asr OR", "asr )"):
+        with pytest.raises(ValueError):
+            index.search(query)
+
+def test_update_reindexes_changed_and_deleted_documents(index, corpus):
+    folder = corpus.directory
+    path = _write(folder, "2", "Bad channels were interpolated; no ICA was run.")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10 ** 9))
+    (folder / "methods_4.txt").unlink()
+    _write(folder, "5", "Gait events were detected with force plates and ASR was applied.")
+    corpus.refresh()
+
+    report = index.update(corpus)
+
+    assert report == {"added": ["5"], "updated": ["2"], "removed": ["4"], "unchanged": 2}
+    assert len(index) == 4
+    assert index.search("asr") == ["3", "5"]
+    assert index.search("iclabel") == []
+    assert index.search("interpolated AND ica") == ["2"]
+    assert index.search('"line noise" OR notch') == []
+    assert set(index.postings("ica")) == {"1", "2"}
+    assert index.update(corpus) == {"added": [], "updated": [], "removed": [], "unchanged": 4}
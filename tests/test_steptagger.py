@@ -0,0 +1,23 @@
+from utils.steptagger import StepTagger, tag_corpus
+
+def test_overlapping_synonyms_are_all_reported():
+    tagger = StepTagger()
+    tags = tagger("We removed bad channels. Bad channel removal followed.")
+    assert tags["artifactrej_methods"] == ["Bad channel removal"]
+    # "bad channel" starts inside "removed bad channels", "channel removal" inside "bad channel removal"
+    assert tags["step_keywords"] == ["Bad channel detection", "Channel removal"]
+
+def test_acronyms_match_whole_case_sensitive_words():
+    tags = StepTagger()("Data were decomposed with ICA and cleaned with ASR; ICAs were labelled. Pica, asr.")
+    assert tags["step_keywords"] == ["IC decomposition"]
+    assert tags["artifactrej_methods"] == ["ASR"]
+
+def test_tag_corpus_does_not_depend_on_the_number_of_workers():
+    corpus = {f"methods_{i}.txt": text for i, text in enumerate(
+        ["Data were high-pass filtered and epoched.", "ICA was run; components were rejected with ICLabel.",
+         "We removed bad channels before re-referencing to the common average.", ""] * 10)}
+    serial = tag_corpus(corpus, workers=1)
+    parallel = tag_corpus(corpus, workers=2, chunksize=4)
+    for column, table in serial.items():
+        assert table.equals(parallel[column])
+    assert len(serial["step_keywords"]) > len(corpus)
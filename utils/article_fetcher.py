@@ -2,6 +2,22 @@ import os
 import requests
 import xml.etree.ElementTree as ET
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from utils.eutils_client import get_client
+from utils.article_store import as_store
+from utils.config import ensure_dir
+from utils.corpus import TextCorpus
+
+# IDs requested per esearch page when paging through the history server
+ESEARCH_PAGE_SIZE = 10000
+
+# NCBI asks for HTTP POST once an ID list grows beyond ~200 UIDs
+EFETCH_POST_THRESHOLD = 200
+
+# Per-article boundaries and PMC IDs inside an efetch <pmc-articleset> response
+_ARTICLE_PATTERN = re.compile(r"<article[\s>].*?</article>", re.DOTALL)
+_PMCID_PATTERN = re.compile(r'<article-id pub-id-type="pmc(?:id|aid)?">\s*(?:PMC)?(\d+)\s*</article-id>')
 
 # --- MeSH and Query Optimization Functions ---
 def get_mesh_terms(keyword):
@@ -21,8 +37,7 @@ def get_mesh_terms(keyword):
     """
     """Retrieve relevant MeSH terms for a keyword"""
     try:
-        search_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?db=mesh&term={keyword}&retmode=xml"
-        search_response = requests.get(search_url, timeout=10)
+        search_response = get_client().get("esearch", db="mesh", term=keyword, retmode="xml")
         search_root = ET.fromstring(search_response.content)
         
         query_translation = search_root.find('.//QueryTranslation')
@@ -54,6 +69,11 @@ def build_enhanced_query(keywords):
 def search_pmc_by_keyword(keywords):
     """
     Search PMC with MeSH-optimized queries using LLM-enhanced terms.
+
+    The query is run on the NCBI history server and all matching IDs are paged
+    in, so results are no longer capped at 10,000 IDs. Use search_pmc_history
+    and iter_pmc_ids to stream the IDs instead of holding them in a list.
+
     Args:
         keywords (str): The keywords to search for in PMC.
     Returns:
@@ -65,20 +85,8 @@ def search_pmc_by_keyword(keywords):
     """
     """Search PMC with MeSH-optimized queries using LLM-enhanced terms"""
     try:
-        # Build enhanced query
-        query = build_enhanced_query(keywords)
-        encoded_query = requests.utils.quote(query)
-        url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?db=pmc&term={encoded_query}&retmode=xml&retmax=10000"
-
-        response = requests.get(url)
-        response.raise_for_status()
-
-        # Parse XML properly
-        root = ET.fromstring(response.content)
-        pmc_ids = [id_tag.text for id_tag in root.findall('.//IdList/Id')]
-        
-        print(f"Total articles found: {len(pmc_ids)}")
-        return pmc_ids
+        history = search_pmc_history(keywords)
+        return list(iter_pmc_ids(history))
 
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
@@ -89,6 +97,152 @@ def search_pmc_by_keyword(keywords):
     
     return []
 
+# --- History Server Functions ---
+def search_pmc_history(keywords):
+    """
+    Runs the MeSH-optimized PMC search on the NCBI history server.
+
+    Only the result count and the WebEnv/query_key handle are returned; the IDs
+    stay on the server and are paged in by iter_pmc_ids or fetched directly by
+    fetch_full_texts_from_history.
+
+    Args:
+        keywords (list): The keywords to search for in PMC.
+
+    Returns:
+        dict: {"query": search term, "count": number of hits, "webenv": WebEnv,
+        "query_key": query key}.
+
+    Raises:
+        requests.exceptions.RequestException: If there is an error with the HTTP request.
+        xml.etree.ElementTree.ParseError: If there is an error parsing the XML response.
+    """
+    query = build_enhanced_query(keywords)
+    response = get_client().get("esearch", db="pmc", term=query, usehistory="y", retmax=0, retmode="xml")
+    root = ET.fromstring(response.content)
+    history = {
+        "query": query,
+        "count": int(root.findtext("Count", default="0")),
+        "webenv": root.findtext("WebEnv"),
+        "query_key": root.findtext("QueryKey"),
+    }
+    print(f"Total articles found: {history['count']}")
+    return history
+
+def fetch_history_ids(client, history, retstart, retmax):
+    """
+    Fetches one page of PMC IDs from a history server result set.
+
+    Args:
+        client (EutilsClient): The client used for the request.
+        history (dict): Result of search_pmc_history.
+        retstart (int): Index of the first ID to return.
+        retmax (int): Maximum number of IDs to return.
+
+    Returns:
+        list: The PMC IDs on this page.
+    """
+    response = client.get(
+        "esearch", db="pmc", term=f"#{history['query_key']}", WebEnv=history["webenv"],
+        usehistory="y", retstart=retstart, retmax=retmax, retmode="xml",
+    )
+    root = ET.fromstring(response.content)
+    return [id_tag.text for id_tag in root.findall('.//IdList/Id')]
+
+def iter_pmc_ids(history, page_size=ESEARCH_PAGE_SIZE):
+    """
+    Yields the PMC IDs of a history server result set page by page.
+
+    Args:
+        history (dict): Result of search_pmc_history.
+        page_size (int): Number of IDs requested per esearch call.
+
+    Yields:
+        str: PMC IDs in search result order.
+    """
+    client = get_client()
+    for retstart in range(0, history["count"], page_size):
+        yield from fetch_history_ids(client, history, retstart, page_size)
+
+def fetch_history_page(client, history, retstart, retmax):
+    """
+    Fetches one block of full texts straight from a history server result set.
+
+    Args:
+        client (EutilsClient): The client used for the request.
+        history (dict): Result of search_pmc_history.
+        retstart (int): Index of the first article to return.
+        retmax (int): Maximum number of articles to return.
+
+    Returns:
+        dict: A dictionary with PMC IDs as keys and per-article XML strings as values.
+    """
+    # The last block asks for exactly the remaining articles, so that a complete
+    # response can be told apart from one that left articles out
+    retmax = max(0, min(retmax, history["count"] - retstart))
+    response = client.get(
+        "efetch", db="pmc", WebEnv=history["webenv"], query_key=history["query_key"],
+        retstart=retstart, retmax=retmax, retmode="xml",
+    )
+    return split_article_set(response.text)
+
+def missing_history_ids(client, history, retstart, retmax, articles):
+    """
+    Lists the IDs of a history block that are missing from an efetch response.
+
+    The IDs are only looked up (with esearch) when the response holds fewer
+    articles than the block should contain.
+
+    Args:
+        client (EutilsClient): The client used for the lookup.
+        history (dict): Result of search_pmc_history.
+        retstart (int): Index of the first article of the block.
+        retmax (int): Size of the block.
+        articles (dict): Articles returned for the block, by PMC ID.
+
+    Returns:
+        list: PMC IDs of the block without a returned article.
+    """
+    expected = max(0, min(retmax, history["count"] - retstart))
+    if len(articles) >= expected:
+        return []
+    returned = {_normalize_pmc_id(pmc_id) for pmc_id in articles}
+    return [pmc_id for pmc_id in fetch_history_ids(client, history, retstart, retmax)
+            if _normalize_pmc_id(pmc_id) not in returned]
+
+def fetch_full_texts_from_history(history, batch_size=100, max_retries=3):
+    """
+    Fetches full texts for a history server result set in blocks of `batch_size`.
+
+    Articles are requested by WebEnv/query_key, so the ID list is never sent back
+    to NCBI. If a block fails, or the response leaves articles out, the missing
+    IDs are looked up and retried through the ID-based batched efetch.
+
+    Args:
+        history (dict): Result of search_pmc_history.
+        batch_size (int): Number of articles requested per efetch call.
+        max_retries (int): Number of times a failed sub-batch is retried.
+
+    Yields:
+        tuple: (pmc_id, full_text) where full_text is the article XML, or None
+        if the article could not be fetched.
+    """
+    client = get_client()
+    for retstart in range(0, history["count"], batch_size):
+        try:
+            articles = fetch_history_page(client, history, retstart, batch_size)
+        except requests.exceptions.RequestException as e:
+            print(f"History block starting at {retstart} failed: {e}")
+            articles = {}
+        yield from articles.items()
+        try:
+            missing = missing_history_ids(client, history, retstart, batch_size, articles)
+        except (requests.exceptions.RequestException, ET.ParseError) as e:
+            print(f"Could not list the IDs of the history block starting at {retstart}: {e}")
+            continue
+        if missing:
+            yield from _fetch_with_retry(missing, max_retries)
+
 # --- Existing Full-Text Function (unchanged) ---
 def fetch_full_text_pmc(pmc_id):
     """
@@ -99,59 +253,201 @@ def fetch_full_text_pmc(pmc_id):
 
     Returns:
         str: The full text of the article in XML format if the request is successful.
-        None: If the request fails (i.e., the status code is not 200).
+        None: If the request still fails after the client's retries.
+    """
+    try:
+        response = get_client().get("efetch", db="pmc", id=pmc_id, retmode="xml")
+    except requests.exceptions.RequestException as e:
+        print(f"Full-text request error for PMC ID {pmc_id}: {e}")
+        return None
+    return response.text
+
+# --- Batched Full-Text Functions ---
+def split_article_set(xml_text):
+    """
+    Splits an efetch <pmc-articleset> response into one XML document per article.
+
+    Each article is wrapped in the original XML declaration and <pmc-articleset>
+    element, so the saved files look exactly like a single-ID efetch response.
+
+    Args:
+        xml_text (str): The efetch response containing one or more <article> elements.
+
+    Returns:
+        dict: A dictionary with PMC IDs (without the 'PMC' prefix) as keys and
+        per-article XML strings as values.
+    """
+    first_article = _ARTICLE_PATTERN.search(xml_text)
+    if first_article is None:
+        return {}
+
+    header = xml_text[:first_article.start()]
+    articles = {}
+    for match in _ARTICLE_PATTERN.finditer(xml_text):
+        article = match.group(0)
+        id_match = _PMCID_PATTERN.search(article)
+        if id_match is not None:
+            articles[id_match.group(1)] = f"{header}{article}\n</pmc-articleset>\n"
+    return articles
+
+def _normalize_pmc_id(pmc_id):
+    """Strips an optional 'PMC' prefix so IDs match the efetch <article-id> values."""
+    pmc_id = str(pmc_id).strip()
+    return pmc_id[3:] if pmc_id.upper().startswith("PMC") else pmc_id
+
+def fetch_full_texts_pmc_batch(pmc_ids):
+    """
+    Fetches the full texts of several PMC articles with a single efetch request.
+
+    The IDs are sent comma-joined; blocks larger than EFETCH_POST_THRESHOLD are
+    sent as a POST request, as recommended by NCBI.
+
+    Args:
+        pmc_ids (list): PMC IDs to fetch in one request.
+
+    Returns:
+        dict: A dictionary with PMC IDs as keys and per-article XML strings as values.
+
+    Raises:
+        requests.exceptions.RequestException: If the HTTP request fails.
     """
-    url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?db=pmc&id={pmc_id}&retmode=xml"
-    response = requests.get(url)
-    return response.text if response.status_code == 200 else None
+    return fetch_article_set(get_client(), pmc_ids)
+
+def fetch_article_set(client, pmc_ids):
+    """
+    Sends one efetch request for a block of PMC IDs through the given client.
+
+    Args:
+        client (EutilsClient): The client used for the request.
+        pmc_ids (list): PMC IDs to fetch.
+
+    Returns:
+        dict: A dictionary with PMC IDs as keys and per-article XML strings as values.
+    """
+    method = "POST" if len(pmc_ids) > EFETCH_POST_THRESHOLD else "GET"
+    params = {"db": "pmc", "id": ",".join(_normalize_pmc_id(pmc_id) for pmc_id in pmc_ids), "retmode": "xml"}
+    response = client.request("efetch", params, method=method)
+    return split_article_set(response.text)
+
+def _fetch_with_retry(pmc_ids, retries_left):
+    """Fetches one block of IDs and retries only the IDs missing from the response."""
+    try:
+        articles = fetch_full_texts_pmc_batch(pmc_ids)
+    except requests.exceptions.RequestException as e:
+        print(f"Batch of {len(pmc_ids)} IDs failed: {e}")
+        articles = {}
+
+    missing = []
+    for pmc_id in pmc_ids:
+        full_text = articles.get(_normalize_pmc_id(pmc_id))
+        if full_text is None:
+            missing.append(pmc_id)
+        else:
+            yield pmc_id, full_text
+
+    if not missing:
+        return
+    if retries_left <= 0:
+        for pmc_id in missing:
+            yield pmc_id, None
+        return
+
+    # Retry the failed IDs in two halves so one bad ID cannot sink the whole block
+    half = (len(missing) + 1) // 2
+    for sub_batch in (missing[:half], missing[half:]):
+        if sub_batch:
+            yield from _fetch_with_retry(sub_batch, retries_left - 1)
+
+def fetch_full_texts_pmc(pmc_ids, batch_size=100, max_retries=3):
+    """
+    Fetches full texts from PMC in blocks of `batch_size` IDs per efetch request.
+
+    Blocks that fail, or IDs missing from a response, are retried in smaller
+    sub-batches up to `max_retries` times; successfully fetched IDs are never
+    requested again.
+
+    Args:
+        pmc_ids (list): PMC IDs to fetch.
+        batch_size (int): Number of IDs sent per efetch request.
+        max_retries (int): Number of times a failed sub-batch is retried.
+
+    Yields:
+        tuple: (pmc_id, full_text) where full_text is the article XML, or None
+        if the article could not be fetched.
+    """
+    pmc_ids = list(pmc_ids)
+    for start in range(0, len(pmc_ids), batch_size):
+        yield from _fetch_with_retry(pmc_ids[start:start + batch_size], max_retries)
 
 def is_research_article(file_path):
     """
     Check if an XML file is a research article based on its content.
+
+    The file is pull-parsed and parsing stops at the first <article> start tag,
+    so only the first few kilobytes of an article are ever read.
     
     Args:
-        file_path (Path): Path to the XML file.
+        file_path (Path or file object): Path to the XML file, or an open binary
+            file such as the one returned by an article store's open().
     
     Returns:
         bool: True if the file is a research article, False otherwise.
     """
     try:
-        # Parse the XML file
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        # Find the article element and check its type
-        article_element = root.find('.//article')
-        if article_element is not None:
-            article_type = article_element.attrib.get('article-type')
-            if article_type == 'research-article':
-                return True
+        # Stream start tags until the article element shows up and check its type
+        for _, element in ET.iterparse(file_path, events=("start",)):
+            if element.tag.rsplit("}", 1)[-1] == "article":
+                return element.attrib.get('article-type') == 'research-article'
 
     except ET.ParseError as e:
         # Handle XML parsing errors
-        print(f"Error parsing file {file_path}: {e}")
+        print(f"Error parsing file {getattr(file_path, 'name', file_path)}: {e}")
     except Exception as e:
         # Handle any other unexpected errors
-        print(f"Unexpected error with file {file_path}: {e}")
+        print(f"Unexpected error with file {getattr(file_path, 'name', file_path)}: {e}")
     
     return False
 
-def filter_research_articles(source_folder, destination_folder):
+def _check_article(store, pmc_id):
+    """Classifies one stored article; runs in a worker process."""
+    with store.open(pmc_id) as xml_file:
+        return pmc_id, is_research_article(xml_file)
+
+def filter_research_articles(source_folder, destination_folder, workers=None, chunksize=64):
     """
     Filter XML files to identify and save research articles to a separate folder.
+
+    Articles are classified across a process pool. Research articles are
+    hard-linked (or reflinked) into the destination when both stores use the
+    same on-disk format, and copied otherwise.
     
     Args:
-        source_folder (Path): Folder containing XML files.
-        destination_folder (Path): Folder to save research articles.
+        source_folder (Path or article store): Store (or folder) containing the full texts.
+        destination_folder (Path or article store): Store (or folder) to save research articles to.
+        workers (int): Number of worker processes; defaults to the number of CPUs.
+            Use 1 to classify in the current process.
+        chunksize (int): Number of articles handed to a worker at a time.
     """
-    # Iterate through all XML files in the source folder
-    for xml_file in source_folder.glob("*.xml"):
-        if is_research_article(xml_file):
-            # Copy the file to the research articles folder
-            destination_path = destination_folder / xml_file.name
-            with open(xml_file, "r", encoding="utf-8") as src, open(destination_path, "w", encoding="utf-8") as dst:
-                dst.write(src.read())
-            print(f"Saved research article: {xml_file.name}")
+    source = as_store(source_folder)
+    destination = as_store(destination_folder)
+    pmc_ids = source.ids()
+    workers = workers or os.cpu_count() or 1
+    check = partial(_check_article, source)
+
+    if workers == 1 or len(pmc_ids) <= chunksize:
+        results = map(check, pmc_ids)
+        _save_research_articles(results, source, destination)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(check, pmc_ids, chunksize=chunksize)
+            _save_research_articles(results, source, destination)
+
+def _save_research_articles(results, source, destination):
+    """Links or copies every article classified as research article into the destination."""
+    for pmc_id, research in results:
+        if research:
+            destination.copy_from(source, pmc_id)
+            print(f"Saved research article: {pmc_id}")
 
 
 def extract_methods(input_folder, output_folder):
@@ -169,6 +465,7 @@ def extract_methods(input_folder, output_folder):
     if not input_folder.exists():
         print(f"Input folder '{input_folder}' does not exist.")
         return
+    ensure_dir(output_folder)
 
     # Iterate through XML files in the folder
     for file_path in input_folder.glob("*.xml"):
@@ -215,15 +512,13 @@ def read_txt_files(directory):
     """
     Reads all .txt files from a specified directory.
 
+    Files are read lazily: the returned corpus lists the directory on first use
+    and memory-maps a file only when its content is accessed.
+
     Args:
         directory (str): Path to the directory containing .txt files.
 
     Returns:
-        dict: A dictionary with filenames as keys and file content as values.
-    """
-    txt_files = {}
-    for file in os.listdir(directory):
-        if file.endswith('.txt'):
-            with open(os.path.join(directory, file), 'r', encoding='utf-8') as f:
-                txt_files[file] = f.read().strip()
-    return txt_files
\ No newline at end of file
+        TextCorpus: A mapping with filenames as keys and file content as values.
+    """
+    return TextCorpus(directory)
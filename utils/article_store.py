@@ -0,0 +1,391 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from utils.config import ensure_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Backend used for new stores unless one is given explicitly:
+# "directory" (loose .xml files), "gzip" or "zstd" (sharded compressed blobs), "sqlite"
+ARTICLE_STORE_BACKEND = os.environ.get("ARTICLE_STORE", "directory")
+
+# ioctl request for a copy-on-write clone on Linux (btrfs, XFS)
+_FICLONE = 0x40049409
+
+# Marker file recording the backend of a store directory
+_MARKER = "store.json"
+
+class DirectoryStore:
+    """
+    Article store keeping one uncompressed <pmc_id>.xml file per article.
+
+    This is the original layout of results/fulltexts and results/researcharticles.
+    Opening a store does not touch the disk; its directory is created on the
+    first write.
+
+    Args:
+        root (Path): Directory holding the XML files.
+    """
+
+    backend = "directory"
+    # Contents of the store.json marker written with the first article (None = no marker)
+    marker = None
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._prepared = set()
+
+    def _prepare(self, path):
+        """Creates the folder of a file about to be written, and the marker of the store with the first one."""
+        if path.parent not in self._prepared:
+            ensure_dir(path.parent)
+            if self.marker is not None:
+                _write_marker(self.root, self.marker)
+            self._prepared.add(path.parent)
+
+    def path(self, pmc_id):
+        """Returns the file path of an article."""
+        return self.root / f"{pmc_id}.xml"
+
+    def put(self, pmc_id, data):
+        """
+        Stores the XML of an article, replacing any previous version.
+
+        Args:
+            pmc_id (str): The PMC ID.
+            data (str or bytes): The article XML.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        path = self.path(pmc_id)
+        self._prepare(path)
+        _write_atomic(path, data)
+
+    def get(self, pmc_id):
+        """Returns the XML of an article as bytes; raises KeyError if it is missing."""
+        try:
+            return self.path(pmc_id).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(pmc_id) from None
+
+    def open(self, pmc_id):
+        """Opens an article as a binary file object, e.g. for ElementTree.parse."""
+        try:
+            return open(self.path(pmc_id), "rb")
+        except FileNotFoundError:
+            raise KeyError(pmc_id) from None
+
+    def delete(self, pmc_id):
+        """Removes an article if it is present."""
+        self.path(pmc_id).unlink(missing_ok=True)
+
+    def stat(self, pmc_id):
+        """
+        Returns the size and modification time of an article's file.
+
+        Callers can compare them with earlier values to tell whether an article
+        may have changed without reading it.
+
+        Returns:
+            list: [size in bytes, mtime in nanoseconds], or None if the store
+            cannot tell (see SQLiteStore.stat).
+
+        Raises:
+            KeyError: If the article is missing.
+        """
+        try:
+            stat = self.path(pmc_id).stat()
+        except FileNotFoundError:
+            raise KeyError(pmc_id) from None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def ids(self):
+        """Returns the PMC IDs in the store, sorted."""
+        if not self.root.is_dir():
+            return []
+        with os.scandir(self.root) as entries:
+            return sorted(entry.name[:-4] for entry in entries if entry.name.endswith(".xml"))
+
+    def __contains__(self, pmc_id):
+        return self.path(pmc_id).exists()
+
+    def __len__(self):
+        return len(self.ids())
+
+    def items(self):
+        """Streams (pmc_id, xml bytes) pairs in ID order."""
+        for pmc_id in self.ids():
+            yield pmc_id, self.get(pmc_id)
+
+    def copy_from(self, other, pmc_id):
+        """
+        Copies one article from another store into this one.
+
+        If both stores keep files in the same format, the file is hard-linked
+        (or reflinked, or copied by the kernel) instead of being read and rewritten.
+        """
+        if type(other) is type(self) and getattr(other, "suffix", None) == getattr(self, "suffix", None):
+            destination = self.path(pmc_id)
+            self._prepare(destination)
+            _link_or_copy(other.path(pmc_id), destination)
+        else:
+            self.put(pmc_id, other.get(pmc_id))
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self.root}')"
+
+class ShardedStore(DirectoryStore):
+    """
+    Article store keeping compressed blobs in a sharded directory layout.
+
+    Articles are written as <root>/<last two digits>/<pmc_id>.xml.gz (or .xml.zst),
+    which keeps directories small and cuts disk use several-fold.
+
+    Args:
+        root (Path): Root directory of the store.
+        codec (str): "gzip", or "zstd" (requires the optional zstandard package).
+        level (int): Compression level; defaults to 6 for gzip and 3 for zstd.
+    """
+
+    def __init__(self, root, codec="gzip", level=None):
+        super().__init__(root)
+        if codec not in ("gzip", "zstd"):
+            raise ValueError(f"Unknown codec '{codec}'; expected 'gzip' or 'zstd'")
+        if codec == "zstd":
+            _require_zstandard()
+        self.codec = codec
+        self.backend = codec
+        self.level = level if level is not None else (6 if codec == "gzip" else 3)
+        self.suffix = ".xml.gz" if codec == "gzip" else ".xml.zst"
+        self.marker = {"backend": codec, "level": self.level}
+
+    def path(self, pmc_id):
+        pmc_id = str(pmc_id)
+        return self.root / pmc_id[-2:].zfill(2) / f"{pmc_id}{self.suffix}"
+
+    def put(self, pmc_id, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        path = self.path(pmc_id)
+        self._prepare(path)
+        _write_atomic(path, self._compress(data))
+
+    def get(self, pmc_id):
+        try:
+            return self._decompress(self.path(pmc_id).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(pmc_id) from None
+
+    def open(self, pmc_id):
+        path = self.path(pmc_id)
+        if not path.exists():
+            raise KeyError(pmc_id)
+        if self.codec == "gzip":
+            return gzip.open(path, "rb")
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+    def ids(self):
+        ids = []
+        if not self.root.is_dir():
+            return ids
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if shard.is_dir():
+                    with os.scandir(shard.path) as entries:
+                        ids.extend(e.name[:-len(self.suffix)] for e in entries if e.name.endswith(self.suffix))
+        return sorted(ids)
+
+    def _compress(self, data):
+        if self.codec == "gzip":
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        import zstandard
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def _decompress(self, data):
+        if self.codec == "gzip":
+            return gzip.decompress(data)
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+
+class SQLiteStore:
+    """
+    Article store keeping all articles as zlib-compressed blobs in one SQLite file.
+
+    Lookups by PMC ID go through the primary key index, and a whole corpus is a
+    single file instead of tens of thousands of inodes. The folder, marker and
+    SQLite file are created with the first put; reads on a store that does not
+    exist yet find no articles.
+
+    Args:
+        root (Path): Directory holding the articles.sqlite file.
+        level (int): zlib compression level.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, root, level=6):
+        self.root = Path(root)
+        self.level = level
+        self.db_path = self.root / "articles.sqlite"
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _db(self, create=True):
+        """Returns this process's connection; None if the store does not exist yet and not `create`."""
+        # Connections cannot be shared with worker processes; open one per process
+        if self._conn is None or self._pid != os.getpid():
+            if not create and not self.db_path.exists():
+                return None
+            # The folder and marker are only created with the first write
+            ensure_dir(self.root)
+            _write_marker(self.root, {"backend": "sqlite", "level": self.level})
+            self._conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS articles (pmc_id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def _execute(self, query, params=(), write=False):
+        """Runs a statement on this process's connection and returns all rows (none on a store not written yet)."""
+        with self._lock:
+            conn = self._db(create=write)
+            if conn is None:
+                return []
+            rows = conn.execute(query, params).fetchall()
+            conn.commit()
+            return rows
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_conn=None, _pid=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def put(self, pmc_id, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._execute(
+            "INSERT OR REPLACE INTO articles (pmc_id, data) VALUES (?, ?)",
+            (str(pmc_id), zlib.compress(data, self.level)), write=True,
+        )
+
+    def get(self, pmc_id):
+        rows = self._execute("SELECT data FROM articles WHERE pmc_id = ?", (str(pmc_id),))
+        if not rows:
+            raise KeyError(pmc_id)
+        return zlib.decompress(rows[0][0])
+
+    def open(self, pmc_id):
+        return io.BytesIO(self.get(pmc_id))
+
+    def delete(self, pmc_id):
+        self._execute("DELETE FROM articles WHERE pmc_id = ?", (str(pmc_id),))
+
+    def stat(self, pmc_id):
+        """Returns None: rows carry no modification time, so callers have to compare contents."""
+        return None
+
+    def ids(self):
+        return [row[0] for row in self._execute("SELECT pmc_id FROM articles ORDER BY pmc_id")]
+
+    def __contains__(self, pmc_id):
+        return bool(self._execute("SELECT 1 FROM articles WHERE pmc_id = ?", (str(pmc_id),)))
+
+    def __len__(self):
+        rows = self._execute("SELECT COUNT(*) FROM articles")
+        return rows[0][0] if rows else 0
+
+    def items(self):
+        for pmc_id in self.ids():
+            yield pmc_id, self.get(pmc_id)
+
+    def copy_from(self, other, pmc_id):
+        self.put(pmc_id, other.get(pmc_id))
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self.root}')"
+
+def _write_atomic(path, data):
+    """Writes a file via a temporary file, so hard links to the old version are never modified."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def _link_or_copy(source, destination):
+    """Hard-links `source` to `destination`, falling back to a reflink or a kernel-side copy."""
+    tmp_path = destination.with_name(f".{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        # Different file system or links not permitted: try a copy-on-write clone first
+        with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            except (OSError, AttributeError):
+                shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, destination)
+
+def _require_zstandard():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        raise ImportError("The 'zstd' article store needs the zstandard package: pip install zstandard") from None
+
+def _write_marker(root, info):
+    marker = root / _MARKER
+    if not marker.exists():
+        marker.write_text(json.dumps(info))
+
+def open_store(root, backend=None):
+    """
+    Opens the article store in `root`; a new store is created on its first write.
+
+    An existing store keeps the backend recorded in its store.json marker; a
+    directory without a marker is a plain DirectoryStore unless `backend` says
+    otherwise. New stores use `backend`, or the ARTICLE_STORE environment
+    variable ("directory", "gzip", "zstd" or "sqlite").
+
+    Args:
+        root (Path): Store directory, e.g. utils.config.dir_fulltexts.
+        backend (str): Backend for a new store.
+
+    Returns:
+        DirectoryStore, ShardedStore or SQLiteStore: The opened store.
+    """
+    root = Path(root)
+    marker = root / _MARKER
+    if marker.exists():
+        info = json.loads(marker.read_text())
+        backend, level = info["backend"], info.get("level")
+    else:
+        has_loose_files = root.exists() and any(root.glob("*.xml"))
+        backend = backend or ("directory" if has_loose_files else ARTICLE_STORE_BACKEND)
+        level = None
+
+    if backend == "directory":
+        return DirectoryStore(root)
+    if backend in ("gzip", "zstd"):
+        return ShardedStore(root, codec=backend, level=level)
+    if backend == "sqlite":
+        return SQLiteStore(root) if level is None else SQLiteStore(root, level=level)
+    raise ValueError(f"Unknown article store backend '{backend}'")
+
+def as_store(location):
+    """Returns `location` unchanged if it is already a store, otherwise opens the store there."""
+    if hasattr(location, "put") and hasattr(location, "open"):
+        return location
+    return open_store(location)
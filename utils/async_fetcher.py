@@ -0,0 +1,266 @@
+import asyncio
+import contextlib
+import threading
+import time
+import xml.etree.ElementTree as ET
+import requests
+from utils.article_fetcher import (
+    fetch_article_set,
+    fetch_history_page,
+    missing_history_ids,
+    _normalize_pmc_id,
+)
+from utils.eutils_client import get_client
+
+# NCBI E-utilities limits: 3 requests/s without an API key, 10 requests/s with one
+NCBI_RATE_NO_KEY = 3
+NCBI_RATE_WITH_KEY = 10
+
+class TokenBucket:
+    """
+    Asyncio token bucket that spaces requests to at most `rate` per second.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum number of tokens that can be saved up for a burst.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces blocking calls to at most `rate` per second.
+
+    Install it as an EutilsClient limiter for synchronous fetching. The first
+    call already waits one interval, so requests made right after another
+    rate-limited run stay within the limit too.
+
+    Args:
+        rate (float): Calls allowed per second.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = time.monotonic() + self.interval
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                time.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+def ncbi_rate_limit(api_key=None):
+    """Returns the NCBI request rate (requests per second) allowed for the given API key."""
+    return NCBI_RATE_WITH_KEY if api_key else NCBI_RATE_NO_KEY
+
+def _fetch_id_block(client, pmc_ids):
+    """Fetches one block of PMC IDs; failed IDs are returned with a None full text."""
+    try:
+        articles = fetch_article_set(client, pmc_ids)
+    except requests.exceptions.RequestException as e:
+        print(f"Batch of {len(pmc_ids)} IDs failed: {e}")
+        articles = {}
+    return [(pmc_id, articles.get(_normalize_pmc_id(pmc_id))) for pmc_id in pmc_ids]
+
+def _fetch_history_block(client, history, retstart, retmax):
+    """Fetches one history server block; IDs of a failed block or left out of the response are returned as failed."""
+    try:
+        articles = fetch_history_page(client, history, retstart, retmax)
+    except requests.exceptions.RequestException as e:
+        print(f"History block starting at {retstart} failed: {e}")
+        articles = {}
+    try:
+        missing = missing_history_ids(client, history, retstart, retmax, articles)
+    except (requests.exceptions.RequestException, ET.ParseError) as e:
+        print(f"Could not list the IDs of the history block starting at {retstart}: {e}")
+        missing = []
+    return list(articles.items()) + [(pmc_id, None) for pmc_id in missing]
+
+async def _run_fetch_jobs(jobs, fetch_job, writer, max_in_flight, queue_size, rate, client):
+    """
+    Runs blocking fetch jobs concurrently under the NCBI rate limit.
+
+    Each job is passed to fetch_job(client, job) in a worker thread, which returns
+    a list of (pmc_id, full_text) pairs. For the duration of the run, the client's
+    limiter takes a token from the bucket before every HTTP attempt, so retries
+    and fallback lookups made inside a job are rate limited too. Fetched articles
+    pass through a bounded queue to the writer, so fetching pauses whenever the
+    writer falls behind.
+    """
+    bucket = TokenBucket(rate or ncbi_rate_limit(client.api_key))
+    loop = asyncio.get_running_loop()
+    job_queue = asyncio.Queue()
+    for job in jobs:
+        job_queue.put_nowait(job)
+    result_queue = asyncio.Queue(maxsize=queue_size)
+    summary = {"fetched": 0, "failed": []}
+
+    async def fetch_worker():
+        while True:
+            try:
+                job = job_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            for item in await asyncio.to_thread(fetch_job, client, job):
+                await result_queue.put(item)
+
+    async def write_worker():
+        while True:
+            item = await result_queue.get()
+            if item is None:
+                return
+            pmc_id, full_text = item
+            if full_text is None:
+                summary["failed"].append(pmc_id)
+                continue
+            try:
+                await asyncio.to_thread(writer, pmc_id, full_text)
+                summary["fetched"] += 1
+            except Exception as e:
+                print(f"Error writing full text for PMC ID {pmc_id}: {e}")
+                summary["failed"].append(pmc_id)
+
+    def limiter():
+        # Called from the worker threads; waits for a token on the event loop
+        asyncio.run_coroutine_threadsafe(bucket.acquire(), loop).result()
+
+    previous_limiter, client.limiter = client.limiter, limiter
+    try:
+        writer_task = asyncio.create_task(write_worker())
+        await asyncio.gather(*(fetch_worker() for _ in range(min(max_in_flight, len(jobs)))))
+        await result_queue.put(None)
+        await writer_task
+    finally:
+        client.limiter = previous_limiter
+    return summary
+
+async def fetch_full_texts_async(pmc_ids, writer, batch_size=1, max_in_flight=4, queue_size=100,
+                                 rate=None, client=None):
+    """
+    Fetches full texts from PMC concurrently and hands each article to `writer`.
+
+    Requests are spaced by a token bucket following the NCBI rate limit, at most
+    `max_in_flight` requests run at once, and fetched articles pass through a
+    bounded queue, so fetching pauses whenever the writer falls behind.
+
+    Args:
+        pmc_ids (list): PMC IDs to fetch.
+        writer (callable): Called as writer(pmc_id, full_text) for every fetched
+            article. It runs in a worker thread, so it may block on disk I/O.
+        batch_size (int): Number of IDs sent per efetch request.
+        max_in_flight (int): Maximum number of concurrent HTTP requests.
+        queue_size (int): Maximum number of fetched articles waiting for the writer.
+        rate (float): Overrides the requests per second derived from the client's API key.
+        client (EutilsClient): Client used for the requests; defaults to the shared
+            client. Pass one with a local base_url to test against a stand-in server.
+
+    Returns:
+        dict: {"fetched": number of articles written, "failed": list of PMC IDs
+        that could not be fetched}.
+    """
+    client = client or get_client()
+    pmc_ids = list(pmc_ids)
+    blocks = [pmc_ids[start:start + batch_size] for start in range(0, len(pmc_ids), batch_size)]
+    return await _run_fetch_jobs(blocks, _fetch_id_block, writer, max_in_flight, queue_size, rate, client)
+
+async def fetch_history_async(history, writer, batch_size=100, max_in_flight=4, queue_size=100,
+                              rate=None, client=None):
+    """
+    Fetches the full texts of a history server result set concurrently.
+
+    Works like fetch_full_texts_async, but each request asks efetch for a
+    retstart/retmax block of the WebEnv/query_key result set, so the ID list is
+    never sent back to NCBI.
+
+    Args:
+        history (dict): Result of utils.article_fetcher.search_pmc_history.
+        writer (callable): Called as writer(pmc_id, full_text) for every fetched article.
+        batch_size (int): Number of articles requested per efetch call.
+        max_in_flight (int): Maximum number of concurrent HTTP requests.
+        queue_size (int): Maximum number of fetched articles waiting for the writer.
+        rate (float): Overrides the requests per second derived from the client's API key.
+        client (EutilsClient): Client used for the requests; defaults to the shared client.
+
+    Returns:
+        dict: {"fetched": number of articles written, "failed": list of PMC IDs
+        that could not be fetched}.
+    """
+    client = client or get_client()
+    blocks = [(retstart, batch_size) for retstart in range(0, history["count"], batch_size)]
+
+    def fetch_block(client, block):
+        return _fetch_history_block(client, history, *block)
+
+    return await _run_fetch_jobs(blocks, fetch_block, writer, max_in_flight, queue_size, rate, client)
+
+@contextlib.contextmanager
+def rate_limited(client=None, rate=None):
+    """
+    Holds the synchronous requests of a client to the NCBI rate limit.
+
+    Use it around sequential fetching outside the async fetcher, e.g. the
+    retry pass of retrieve_articles.py; the previous limiter is restored on exit.
+
+    Args:
+        client (EutilsClient): Client to limit; defaults to the shared client.
+        rate (float): Overrides the requests per second derived from the client's API key.
+
+    Yields:
+        EutilsClient: The limited client.
+    """
+    client = client or get_client()
+    previous_limiter = client.limiter
+    client.limiter = RateLimiter(rate or ncbi_rate_limit(client.api_key))
+    try:
+        yield client
+    finally:
+        client.limiter = previous_limiter
+
+def fetch_full_texts_concurrent(pmc_ids, writer, **kwargs):
+    """
+    Synchronous wrapper around fetch_full_texts_async for use in scripts.
+
+    Args:
+        pmc_ids (list): PMC IDs to fetch.
+        writer (callable): Called as writer(pmc_id, full_text) for every fetched article.
+        **kwargs: Passed on to fetch_full_texts_async.
+
+    Returns:
+        dict: {"fetched": number of articles written, "failed": list of PMC IDs
+        that could not be fetched}.
+    """
+    return asyncio.run(fetch_full_texts_async(pmc_ids, writer, **kwargs))
+
+def fetch_history_concurrent(history, writer, **kwargs):
+    """
+    Synchronous wrapper around fetch_history_async for use in scripts.
+
+    Args:
+        history (dict): Result of utils.article_fetcher.search_pmc_history.
+        writer (callable): Called as writer(pmc_id, full_text) for every fetched article.
+        **kwargs: Passed on to fetch_history_async.
+
+    Returns:
+        dict: {"fetched": number of articles written, "failed": list of PMC IDs
+        that could not be fetched}.
+    """
+    return asyncio.run(fetch_history_async(history, writer, **kwargs))
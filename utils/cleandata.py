@@ -1,50 +1,167 @@
+import hashlib
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
+# Metadata identifying a study in the cleaned tables
+STUDY_COLUMNS = ["title", "citation"]
 
-def split_and_clean(df: pd.DataFrame, column: str) -> pd.DataFrame:
+def split_and_clean_columns(df: pd.DataFrame, columns, chunksize: int = 100_000):
     """
-    Splits multi-valued entries in `column` into separate rows,
-    preserving study metadata. Only splits on semicolon or comma.
-    Slashes within terms (e.g., ERD/ERS) are preserved.
+    Splits the multi-valued entries of several columns into long tables in one pass.
+
+    Values are cleaned and split exactly as in split_and_clean, but instead of
+    repeating the title and citation strings for every value, each long table
+    refers to its study by an integer study_id (the row position in `df`) and
+    stores the values as a categorical. Rows are processed in chunks of
+    `chunksize`, so only one chunk of exploded strings is in memory at a time.
+
+    Args:
+        df (pd.DataFrame): Table with title, citation and the multi-valued columns.
+        columns (list): Columns to split.
+        chunksize (int): Number of input rows processed at a time.
+
+    Returns:
+        tuple: (studies, tables) where studies holds the title and citation per
+        study_id, and tables maps each column to a DataFrame with the columns
+        study_id (int32) and the column's values (category), in input order.
     """
-    required_cols = ["title", "citation", column]
+    required_cols = STUDY_COLUMNS + list(columns)
     missing_cols = [c for c in required_cols if c not in df.columns]
     if missing_cols:
         raise KeyError(f"Missing columns in dataframe: {missing_cols}")
 
-    temp = df[required_cols].copy()
+    studies = df[STUDY_COLUMNS].reset_index(drop=True)
+    studies.index.name = "study_id"
+
+    parts = {column: ([], []) for column in columns}
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        positions = np.arange(start, start + len(chunk), dtype=np.int32)
+        for column in columns:
+            ids, values = _explode_chunk(chunk[column], positions)
+            parts[column][0].append(ids)
+            parts[column][1].append(values)
+
+    tables = {}
+    for column, (ids, values) in parts.items():
+        tables[column] = pd.DataFrame({
+            "study_id": np.concatenate(ids) if ids else np.array([], dtype=np.int32),
+            column: union_categoricals(values) if values else pd.Categorical([]),
+        })
+    return studies, tables
 
-    # Clean list-like strings
-    temp[column] = temp[column].astype(str).str.replace(r"[\[\]'\"]", "", regex=True)
+def _explode_chunk(series, positions):
+    """
+    Cleans, splits and explodes one chunk of a column.
+
+    Each distinct entry is cleaned and split only once; the rows are then
+    expanded with integer arithmetic, which matters because the same few
+    step lists repeat across many studies.
+    """
+    row_codes, uniques = pd.factorize(series.astype(str).to_numpy())
+    # Clean list-like strings, split only on ; or , and drop empty values
+    tokens = pd.Series(uniques).str.replace(r"[\[\]'\"]", "", regex=True).str.split(r"[;,]").explode().str.strip()
+    tokens = tokens[tokens.notna() & (tokens != "")]
+    token_codes, categories = pd.factorize(tokens.to_numpy())
 
-    # Split only on ; or , and explode to multiple rows
-    exploded = temp[column].str.split(r"[;,]").explode().str.strip()
-    
-    # Keep metadata aligned by repeating original rows
-    df_out = temp.loc[exploded.index, ["title", "citation"]].copy()
-    df_out[column] = exploded
+    # Tokens are grouped by the entry they came from; find each entry's slice
+    owners = tokens.index.to_numpy(dtype=np.intp)
+    counts = np.bincount(owners, minlength=len(uniques))
+    starts = np.cumsum(counts) - counts
 
-    # Drop empty entries
-    df_out = df_out[df_out[column].notna() & (df_out[column] != "")]
-    df_out.reset_index(drop=True, inplace=True)
-    
+    row_counts = counts[row_codes]
+    total = int(row_counts.sum())
+    row_starts = np.repeat(starts[row_codes], row_counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+    codes = token_codes[row_starts + offsets]
+    values = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+    return np.repeat(positions, row_counts), values
+
+def expand_studies(studies: pd.DataFrame, table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins the study metadata back onto a long table from split_and_clean_columns.
+
+    Args:
+        studies (pd.DataFrame): Title and citation per study_id.
+        table (pd.DataFrame): Long table with study_id and one value column.
+
+    Returns:
+        pd.DataFrame: Columns title, citation and the value column (as strings).
+    """
+    column = table.columns[1]
+    df_out = studies.take(table["study_id"].to_numpy()).reset_index(drop=True)
+    df_out[column] = table[column].astype(object).to_numpy()
     return df_out
 
-def make_citations_unique(citations):
+def split_and_clean(df: pd.DataFrame, column: str) -> pd.DataFrame:
     """
-    Takes a list/Series of citation strings and appends (a), (b), etc. 
-    to duplicates so they are unique.
+    Splits multi-valued entries in `column` into separate rows,
+    preserving study metadata. Only splits on semicolon or comma.
+    Slashes within terms (e.g., ERD/ERS) are preserved.
+
+    To split several columns, or to keep compact study IDs instead of repeated
+    metadata, use split_and_clean_columns.
     """
-    counts = {}
-    unique_citations = []
+    studies, tables = split_and_clean_columns(df, [column])
+    return expand_studies(studies, tables[column])
+
+def _letter_suffix(n):
+    """Bijective base-26 letters: 1 -> "a", 26 -> "z", 27 -> "aa", 28 -> "ab", ..."""
+    letters = ""
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        letters = chr(97 + remainder) + letters
+    return letters
+
+def study_keys(citations):
+    """
+    Derives a stable 64-bit integer key from each citation string.
+
+    The key depends only on the citation text, so tables built separately
+    from the same cleaned citations can be joined on it.
+
+    Args:
+        citations (iterable): Unique citation strings.
+
+    Returns:
+        np.ndarray: int64 key per citation.
+    """
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(str(c).encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+         for c in citations],
+        dtype=np.int64,
+    )
+
+def make_citations_unique(citations, return_keys=False):
+    """
+    Takes a list/Series of citation strings and appends (b), (c), etc.
+    to repeated citations so they are unique; the first occurrence is kept as is.
+    After (z), suffixes continue with (aa), (ab), ...
+
+    Args:
+        citations (list or pd.Series): Citation strings.
+        return_keys (bool): Also return a stable integer study key per citation (see study_keys).
+
+    Returns:
+        list or pd.Series: Unique citations (a Series with the same index if a Series was given),
+        or a (citations, keys) tuple if return_keys is True.
+    """
+    series = citations if isinstance(citations, pd.Series) else pd.Series(list(citations), dtype=object)
+    stripped = series.astype(str).str.strip()
+    occurrence = stripped.groupby(stripped, sort=False).cumcount().to_numpy() + 1
+
+    unique_citations = stripped.to_numpy(dtype=object, copy=True)
+    repeated = np.flatnonzero(occurrence > 1)
+    if len(repeated):
+        # Build each suffix once and look it up by occurrence number
+        suffixes = np.array([""] + [f" ({_letter_suffix(n)})" for n in range(1, occurrence.max() + 1)], dtype=object)
+        unique_citations[repeated] = unique_citations[repeated] + suffixes[occurrence[repeated]]
 
-    for c in citations:
-        c_clean = str(c).strip()
-        if c_clean in counts:
-            counts[c_clean] += 1
-            suffix = chr(96 + counts[c_clean])  # 97='a'
-            unique_citations.append(f"{c_clean} ({suffix})")
-        else:
-            counts[c_clean] = 1
-            unique_citations.append(c_clean)
-    return unique_citations
+    if isinstance(citations, pd.Series):
+        result = pd.Series(unique_citations, index=citations.index, name=citations.name)
+    else:
+        result = unique_citations.tolist()
+    if return_keys:
+        return result, study_keys(unique_citations)
+    return result
@@ -5,19 +5,74 @@ def define_dir(root, *names):
     """Creates a directory and ensures it exists."""
     path = root
     for name in names:
-        path = path / name 
+        path = path / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def ensure_dir(path):
+    """Creates a directory if it does not exist yet and returns it."""
+    path = Path(path)
     path.mkdir(parents=True, exist_ok=True)
     return path
 
 # Get the root directory of the repository (parent of 'utils')
 dir_proj = Path(__file__).resolve().parents[1]
 
-# Define the paths for 'logs' and 'results' directories
-dir_log_results = define_dir(dir_proj, "logs")  # Logs directory path
-dir_results = define_dir(dir_proj, "results")  # Results directory path
-dir_fulltexts = define_dir(dir_results, "fulltexts")  # Full-text articles directory path
-dir_researcharticles = define_dir(dir_results, "researcharticles")  # Research articles directory path
-dir_methods = define_dir(dir_results, "methods")  # Methods sections directory path
-dir_data = define_dir(dir_proj, "data") # Data directory path
-dir_cleancsv = define_dir(dir_data, "cleancsv") # Processed data directory
-dir_plots = define_dir(dir_proj, "plots")  # Directory for plots
\ No newline at end of file
+# Environment variable pointing the data, results, logs and plots folders at another root
+ROOT_ENV = "LITEXTRACT_ROOT"
+
+# Folders relative to the root, by name. Nothing is created on import: code
+# writing into a folder creates it first (ensure_dir), so importing this
+# module has no filesystem side effects.
+_DIRS = {
+    "dir_log_results": ("logs",),  # Logs directory path
+    "dir_results": ("results",),  # Results directory path
+    "dir_fulltexts": ("results", "fulltexts"),  # Full-text articles directory path
+    "dir_researcharticles": ("results", "researcharticles"),  # Research articles directory path
+    "dir_methods": ("results", "methods"),  # Methods sections directory path
+    "dir_tagged": ("results", "tagged"),  # Rule-based step tags directory path
+    "dir_data": ("data",),  # Data directory path
+    "dir_cleancsv": ("data", "cleancsv"),  # Processed data directory
+    "dir_plots": ("plots",),  # Directory for plots
+}
+
+_root = None
+
+def set_root(root):
+    """
+    Points the data, results, logs and plots folders at another root, e.g. an isolated tree for a test.
+
+    The root is also exported as LITEXTRACT_ROOT, so subprocesses and worker
+    processes use the same tree. The folders are resolved whenever they are
+    read through this module (config.dir_results, not a name imported with
+    "from utils.config import ..."), so the utils modules follow the new root
+    without being imported again.
+
+    Args:
+        root (Path): The new root, or None for the repository (or LITEXTRACT_ROOT).
+    """
+    global _root
+    _root = None if root is None else Path(root).resolve()
+    if _root is not None:
+        os.environ[ROOT_ENV] = os.fspath(_root)
+
+def get_root():
+    """
+    Returns the root of the data, results, logs and plots folders.
+
+    Returns:
+        Path: The root from set_root(), else LITEXTRACT_ROOT, else the repository.
+    """
+    if _root is not None:
+        return _root
+    env_root = os.environ.get(ROOT_ENV)
+    return Path(env_root).resolve() if env_root else dir_proj
+
+def __getattr__(name):
+    # Folder paths are resolved on access against the current root, without creating them
+    if name in _DIRS:
+        return get_root().joinpath(*_DIRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_DIRS))
@@ -0,0 +1,108 @@
+import mmap
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+
+class TextCorpus(Mapping):
+    """
+    Lazy read-only mapping of the .txt files in a directory, e.g. the extracted methods.
+
+    Behaves like the dictionary read_txt_files used to return (file name ->
+    stripped file content), but nothing is read up front: file names are listed
+    with os.scandir on first use, and a file is memory-mapped and decoded only
+    when its text is accessed. Recently accessed texts are kept in a bounded
+    LRU cache. Use stream() to process files while the directory is still
+    being listed.
+
+    Args:
+        directory (Path): Directory containing the .txt files.
+        max_cached_bytes (int): Maximum total file size of the cached texts; 0 disables caching.
+    """
+
+    def __init__(self, directory, max_cached_bytes=64 * 1024 ** 2):
+        self.directory = Path(directory)
+        self.max_cached_bytes = max_cached_bytes
+        self._sizes = None
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+
+    def _scan(self):
+        """Yields (file name, size) of every .txt file, in directory order."""
+        if not self.directory.is_dir():  # Nothing extracted yet
+            return
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".txt") and entry.is_file():
+                    yield entry.name, entry.stat().st_size
+
+    @property
+    def sizes(self):
+        """File sizes in bytes by file name, listed once and sorted by name."""
+        if self._sizes is None:
+            self._sizes = dict(sorted(self._scan()))
+        return self._sizes
+
+    def refresh(self):
+        """Lists the directory again and drops the cached texts."""
+        self._sizes = None
+        self._cache.clear()
+        self._cached_bytes = 0
+
+    def __getitem__(self, name):
+        text = self._cache.get(name)
+        if text is not None:
+            self._cache.move_to_end(name)
+            return text
+        if name not in self.sizes:
+            raise KeyError(name)
+        text = self._read(name)
+        self._remember(name, text, self.sizes[name])
+        return text
+
+    def __iter__(self):
+        return iter(self.sizes)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __contains__(self, name):
+        return name in self.sizes
+
+    def path(self, name):
+        """Returns the file path of a document."""
+        return self.directory / name
+
+    def stream(self):
+        """
+        Yields (file name, text) pairs in directory order, reading one file at a time.
+
+        The first pair is available as soon as the first file is found, and
+        streamed texts bypass the cache, so memory use stays flat however large
+        the corpus is.
+        """
+        for name, _ in self._scan():
+            yield name, self._read(name)
+
+    def _read(self, name):
+        with open(self.directory / name, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:  # Empty files cannot be mapped
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, "utf-8")
+        if "\r" in text:
+            # Translate newlines like a file opened in text mode
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text.strip()
+
+    def _remember(self, name, text, size):
+        if size > self.max_cached_bytes:
+            return
+        self._cache[name] = text
+        self._cached_bytes += size
+        while self._cached_bytes > self.max_cached_bytes:
+            evicted, _ = self._cache.popitem(last=False)
+            self._cached_bytes -= self.sizes.get(evicted, 0)
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self.directory}')"
@@ -0,0 +1,176 @@
+import hashlib
+import importlib.util
+import json
+import os
+import pandas as pd
+from utils import config
+from utils.config import ensure_dir
+
+# Reviewed Elicit export with one row per study, in the data folder
+RAW_DATASET_FILE = "20251003_Elicitrevised.csv"
+
+# Long tables written by clean_elicitdatacsv.py, by short name
+CLEANED_TABLES = {
+    "artifacts": "Artifact_Methods_cleaned.csv",
+    "steps": "Step_Keywords_cleaned.csv",
+    "outcomes": "Outcome_Keywords_cleaned.csv",
+}
+
+# Bump whenever parsing or normalization changes, to invalidate cached tables
+DATASET_CACHE_VERSION = 1
+
+# Tables already loaded in this process, by source path; forked workers inherit them
+_LOADED = {}
+
+# Text columns with at most this share of distinct values are cached as categoricals
+CATEGORICAL_MAX_UNIQUE_SHARE = 0.5
+
+def raw_dataset():
+    """Returns the path of the reviewed Elicit export under the current root."""
+    return config.dir_data / RAW_DATASET_FILE
+
+def dataset_cache_dir():
+    """Returns the folder caching the parsed tables, next to the other results under the current root."""
+    return config.dir_results / "dataset_cache"
+
+def dataset_path(name):
+    """
+    Returns the file of a dataset under the current root.
+
+    Args:
+        name (str): "studies" for the reviewed Elicit export, a short name of
+            CLEANED_TABLES, or a CSV file name in the cleaned data folder.
+
+    Returns:
+        Path: The CSV file.
+    """
+    if name == "studies":
+        return raw_dataset()
+    return config.dir_cleancsv / CLEANED_TABLES.get(name, name)
+
+# Paths resolved on access against the current root, like the folders of utils.config
+_LAZY_PATHS = {"RAW_DATASET": raw_dataset, "DATASET_CACHE_DIR": dataset_cache_dir}
+
+def __getattr__(name):
+    if name in _LAZY_PATHS:
+        return _LAZY_PATHS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_PATHS))
+
+def normalize_columns(columns):
+    """Normalizes column names to lowercase snake_case ("Gait Task" -> "gait_task")."""
+    return pd.Index(columns).str.strip().str.lower().str.replace(r"[\s\-]+", "_", regex=True)
+
+def _parse_raw(path):
+    df = pd.read_csv(path, sep=";", encoding="utf-8-sig")
+    df.columns = normalize_columns(df.columns)
+    return df
+
+def _parse_cleaned(path):
+    df = pd.read_csv(path)
+    df.columns = normalize_columns(df.columns)
+    return df
+
+def _to_categoricals(df):
+    """Converts repetitive text columns to categoricals for a compact, typed cache."""
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype == object and df[column].nunique() <= CATEGORICAL_MAX_UNIQUE_SHARE * len(df):
+            df[column] = df[column].astype("category")
+    return df
+
+def _from_categoricals(df):
+    """Turns categoricals back into object columns, as pd.read_csv would return them."""
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return df
+
+def _cache_format():
+    """Parquet when a Parquet engine is installed, otherwise pickle (both keep dtypes)."""
+    if importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet"):
+        return "parquet"
+    return "pickle"
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_cached(source, parse):
+    """
+    Returns the parsed table of `source`, from the cache while the source is unchanged.
+
+    The cache is valid while the source's size and mtime match; if only the
+    mtime changed (e.g. after a checkout), the SHA-256 of the content decides.
+    Tables are also kept in memory, and every call returns a fresh copy.
+    """
+    source = os.fspath(source)
+    stat = os.stat(source)
+    loaded = _LOADED.get(source)
+    if loaded is not None and loaded[0] == (stat.st_size, stat.st_mtime_ns):
+        return loaded[1].copy()
+    fmt = _cache_format()
+    cache_dir = ensure_dir(dataset_cache_dir())
+    stem = f"{os.path.basename(source)}.{hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]}"
+    data_path = cache_dir / f"{stem}.{fmt}"
+    meta_path = cache_dir / f"{stem}.json"
+
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    new_meta = {"version": DATASET_CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sha256": meta.get("sha256")}
+    valid = data_path.exists() and meta.get("version") == DATASET_CACHE_VERSION
+    if not valid or (meta.get("size"), meta.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+        new_meta["sha256"] = _file_hash(source)
+        valid = valid and meta.get("sha256") == new_meta["sha256"]
+    if valid:
+        df = pd.read_parquet(data_path) if fmt == "parquet" else pd.read_pickle(data_path)
+    else:
+        df = _to_categoricals(parse(source))
+        tmp_path = data_path.with_name(f".{data_path.name}.{os.getpid()}.tmp")
+        if fmt == "parquet":
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, data_path)
+    if new_meta != meta:
+        meta_path.write_text(json.dumps(new_meta))
+    _LOADED[source] = ((stat.st_size, stat.st_mtime_ns), df)
+    return df.copy()
+
+def load_studies(path=None, categorical=False):
+    """
+    Loads the reviewed Elicit export, one row per study.
+
+    Column names are normalized to lowercase snake_case (e.g. "citation",
+    "gait_task", "type_of_eeg_electrodes", "step_keywords").
+
+    Args:
+        path (Path): The semicolon-separated export; defaults to RAW_DATASET under the current root.
+        categorical (bool): Keep repetitive text columns as categoricals instead
+            of plain object columns.
+
+    Returns:
+        pd.DataFrame: The parsed table.
+    """
+    df = _load_cached(raw_dataset() if path is None else path, _parse_raw)
+    return df if categorical else _from_categoricals(df)
+
+def load_cleaned(name, categorical=False):
+    """
+    Loads one of the long tables written by clean_elicitdatacsv.py.
+
+    Args:
+        name (str): "artifacts", "steps" or "outcomes" (see CLEANED_TABLES), or a CSV file name.
+        categorical (bool): Keep repetitive text columns as categoricals.
+
+    Returns:
+        pd.DataFrame: Columns title, citation and the value column.
+    """
+    df = _load_cached(dataset_path(name), _parse_cleaned)
+    return df if categorical else _from_categoricals(df)
@@ -0,0 +1,197 @@
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from utils import config
+from utils.http_cache import ResponseCache, is_error_body, is_incomplete
+
+# Base URL of the NCBI E-utilities
+EUTILS_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+
+# Optional NCBI API key; raises the allowed request rate from 3 to 10 per second
+NCBI_API_KEY = os.environ.get("NCBI_API_KEY")
+
+# Environment variable overriding the response cache folder of the shared client; "off" disables it
+EUTILS_CACHE_ENV = "EUTILS_CACHE_DIR"
+
+# With EUTILS_OFFLINE=1 the shared client answers from the cache only
+EUTILS_OFFLINE = os.environ.get("EUTILS_OFFLINE") == "1"
+
+# (connect, read) timeouts in seconds per E-utility endpoint
+ENDPOINT_TIMEOUTS = {
+    "esearch": (5, 30),
+    "efetch": (5, 120),
+    "default": (5, 60),
+}
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CacheMiss(requests.exceptions.RequestException):
+    """Raised by an offline client when a response is not in the cache."""
+
+class EutilsClient:
+    """
+    Shared HTTP client for the NCBI E-utilities.
+
+    Keeps connections alive in a pooled requests.Session, retries rate-limited
+    and transient failures with exponential backoff and full jitter, honours
+    Retry-After headers and applies per-endpoint timeouts. With a ResponseCache,
+    successful responses are stored on disk and served from there while fresh;
+    bodies carrying an NCBI error or an empty result set, and efetch batches
+    missing some of the requested articles, are not stored.
+    A limiter, if set, is called before every HTTP attempt (retries included),
+    so that a caller can hold all traffic to a rate limit.
+
+    Args:
+        base_url (str): E-utilities base URL (point it at a local server for testing).
+        api_key (str): NCBI API key added to every request, if given.
+        max_retries (int): Number of retries after the first attempt.
+        backoff_factor (float): Base delay in seconds; attempt n waits up to factor * 2**n.
+        max_backoff (float): Upper bound for a single delay in seconds.
+        pool_size (int): Maximum number of kept-alive connections per host.
+        timeouts (dict): Overrides for ENDPOINT_TIMEOUTS.
+        cache (ResponseCache): Optional on-disk response cache.
+        limiter (callable): Called without arguments before every HTTP attempt;
+            it blocks until the request may be sent. Cache hits do not call it.
+    """
+
+    def __init__(self, base_url=EUTILS_BASE_URL, api_key=NCBI_API_KEY, max_retries=5,
+                 backoff_factor=0.5, max_backoff=60, pool_size=10, timeouts=None, cache=None,
+                 limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeouts = {**ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.cache = cache
+        self.limiter = limiter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, endpoint, params, method="GET"):
+        """
+        Sends a request to an E-utility and retries it on transient failures.
+
+        Args:
+            endpoint (str): E-utility name, e.g. "esearch" or "efetch".
+            params (dict): Query parameters (sent as form data for POST).
+            method (str): "GET" or "POST".
+
+        Returns:
+            requests.Response: The successful response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request still fails after
+            all retries, or fails with a status code that is not retried.
+            CacheMiss: If the cache is offline and has no entry for the request.
+        """
+        url = f"{self.base_url}/{endpoint}.fcgi"
+        params = dict(params)
+        if self.cache is not None:
+            content = self.cache.get(endpoint, params)
+            if content is not None:
+                return _cached_response(url, content)
+            if self.cache.offline:
+                raise CacheMiss(f"No cached {endpoint} response for {params}")
+        if self.api_key:
+            params.setdefault("api_key", self.api_key)
+        timeout = self.timeouts.get(endpoint, self.timeouts["default"])
+        payload = {"data": params} if method == "POST" else {"params": params}
+
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **payload)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"{endpoint} request failed ({e}); retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    if (self.cache is not None and not is_error_body(endpoint, params, response.content)
+                            and not is_incomplete(endpoint, params, response.content)):
+                        self.cache.put(endpoint, params, response.content)
+                    return response
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                print(f"{endpoint} returned HTTP {response.status_code}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def get(self, endpoint, **params):
+        """Sends a GET request to an E-utility (see request)."""
+        return self.request(endpoint, params, method="GET")
+
+    def post(self, endpoint, **params):
+        """Sends a POST request to an E-utility (see request)."""
+        return self.request(endpoint, params, method="POST")
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+def _cached_response(url, content):
+    """Wraps a cached body in a requests.Response so callers cannot tell the difference."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = "utf-8"
+    response._content = content
+    return response
+
+def _retry_after(response):
+    """Returns the Retry-After delay in seconds, or None if the header is missing or invalid."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+_client = None
+
+def get_client():
+    """
+    Returns the shared EutilsClient, creating it with default settings on first use.
+
+    The default client caches responses in the folder named by EUTILS_CACHE_DIR,
+    or results/http_cache under the current root, and runs from the cache only
+    when EUTILS_OFFLINE is set.
+    """
+    global _client
+    if _client is None:
+        cache = None
+        cache_dir = os.environ.get(EUTILS_CACHE_ENV) or config.dir_results / "http_cache"
+        if os.fspath(cache_dir).lower() != "off":
+            cache = ResponseCache(cache_dir, offline=EUTILS_OFFLINE)
+        _client = EutilsClient(cache=cache)
+    return _client
+
+def configure_client(**kwargs):
+    """
+    Replaces the shared EutilsClient with one built from the given settings.
+
+    Args:
+        **kwargs: Passed on to EutilsClient.
+
+    Returns:
+        EutilsClient: The new shared client.
+    """
+    global _client
+    _client = EutilsClient(**kwargs)
+    return _client
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from utils.config import ensure_dir
+
+# Time-to-live in seconds per kind of E-utilities request (None = never expires, 0 = not cached)
+DEFAULT_TTLS = {
+    "mesh": 30 * 24 * 3600,  # MeSH translations rarely change
+    "esearch": 3600,  # Search results and history server handles go stale quickly
+    "efetch": None,  # Article XML for a given ID is effectively immutable
+    "efetch_batch": None,  # So is a complete block of IDs, keyed by the sorted ID list
+    # History blocks (WebEnv) are only requested again while the search that
+    # created the WebEnv is cached; NCBI drops a WebEnv after about 8 hours
+    "efetch_history": 8 * 3600,
+    "default": 24 * 3600,
+}
+
+# Parameters that do not change the response and are left out of the cache key
+_IGNORED_PARAMS = {"api_key", "tool", "email"}
+
+def request_kind(endpoint, params):
+    """Classifies a request into one of the DEFAULT_TTLS kinds."""
+    if endpoint == "esearch" and params.get("db") == "mesh":
+        return "mesh"
+    if endpoint == "efetch" and "WebEnv" in params:
+        return "efetch_history"
+    if endpoint == "efetch" and "," in str(params.get("id", "")):
+        return "efetch_batch"
+    return endpoint if endpoint in DEFAULT_TTLS else "default"
+
+def is_error_body(endpoint, params, content):
+    """
+    Tells whether a successful (HTTP 200) response carries no usable result.
+
+    NCBI reports many errors, such as an expired WebEnv or an unknown ID, with
+    status 200. Such bodies, and empty result sets, must not be cached.
+
+    Args:
+        endpoint (str): E-utility name.
+        params (dict): Request parameters.
+        content (bytes): The response body.
+
+    Returns:
+        bool: True for an empty body, an NCBI error message or an empty result set.
+    """
+    if not content.strip():
+        return True
+    if b"<ERROR>" in content:
+        return True
+    if endpoint == "esearch" and b"<Count>0</Count>" in content:
+        return True
+    if endpoint == "efetch" and params.get("db") == "pmc" and b"<article" not in content:
+        return True
+    return False
+
+# Start tags of the articles in a pmc efetch response (not <article-id>, <article-meta>, ...)
+_ARTICLE_TAG = re.compile(rb"<article[\s>]")
+
+def is_incomplete(endpoint, params, content):
+    """
+    Tells whether a pmc efetch response holds fewer articles than were requested.
+
+    NCBI sometimes leaves articles out of a batch (throttling, a transient
+    backend miss). Such responses must not be cached, or the missing articles
+    would be served as missing on every later run.
+
+    Args:
+        endpoint (str): E-utility name.
+        params (dict): Request parameters; the IDs asked for are the
+            comma-joined "id" list or, for a history block, "retmax".
+        content (bytes): The response body.
+
+    Returns:
+        bool: True if fewer <article> elements came back than were requested.
+    """
+    if endpoint != "efetch" or params.get("db") != "pmc":
+        return False
+    if "WebEnv" in params:
+        expected = int(params.get("retmax", 0))
+    else:
+        expected = len({pmc_id.strip() for pmc_id in str(params.get("id", "")).split(",") if pmc_id.strip()})
+    return len(_ARTICLE_TAG.findall(content)) < expected
+
+def cache_key(endpoint, params):
+    """
+    Builds a content-addressed key from the endpoint and normalized parameters.
+
+    Parameter order, GET vs POST and credentials do not affect the key, and
+    neither do the order of a comma-joined ID list or repeated IDs in it.
+
+    Args:
+        endpoint (str): E-utility name, e.g. "esearch".
+        params (dict): Request parameters.
+
+    Returns:
+        str: SHA-256 hex digest identifying the request.
+    """
+    params = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+    if "," in str(params.get("id", "")):
+        params["id"] = ",".join(sorted({pmc_id.strip() for pmc_id in str(params["id"]).split(",")}))
+    normalized = sorted((str(k), str(v)) for k, v in params.items())
+    return hashlib.sha256(json.dumps([endpoint, normalized]).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    On-disk cache for E-utilities response bodies.
+
+    Bodies are stored as files named by their cache key in a sharded directory;
+    a small SQLite index tracks size, expiry and last access. When the total
+    size exceeds `max_bytes`, the least recently used entries are evicted. The
+    directory and index are created with the first stored response.
+
+    Args:
+        directory (Path): Cache directory.
+        max_bytes (int): Maximum total size of the cached bodies.
+        ttls (dict): Overrides for DEFAULT_TTLS.
+        offline (bool): If True, the client never goes to the network and a
+            cache miss raises CacheMiss. Expired entries are still served, so
+            a run can be repeated from the cache at any later time.
+    """
+
+    def __init__(self, directory, max_bytes=1024 ** 3, ttls=None, offline=False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _index(self, create=True):
+        """Returns the index connection, opening it on first use; None if there is no index yet and not `create`."""
+        if self._conn is None:
+            index_path = self.directory / "index.sqlite"
+            if not create and not index_path.exists():
+                return None
+            ensure_dir(self.directory)
+            self._conn = sqlite3.connect(index_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    expires REAL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _blob_path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, endpoint, params):
+        """
+        Returns the cached body for a request, or None on a miss or expired entry.
+
+        Requests of a kind that is not cached (TTL 0) always return None. An
+        offline cache ignores expiry.
+
+        Args:
+            endpoint (str): E-utility name.
+            params (dict): Request parameters.
+
+        Returns:
+            bytes: The cached response body, or None.
+        """
+        if self.ttls.get(request_kind(endpoint, params)) == 0:
+            return None
+        key = cache_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            if self._index(create=False) is None:
+                self.misses += 1
+                return None
+            row = self._conn.execute("SELECT expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and (row[0] is None or row[0] > now or self.offline):
+                try:
+                    content = self._blob_path(key).read_bytes()
+                except FileNotFoundError:
+                    content = None
+                if content is not None:
+                    self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                    self.hits += 1
+                    return content
+            if row is not None:
+                self._delete(key)
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def put(self, endpoint, params, content):
+        """
+        Stores a response body and evicts least recently used entries if needed.
+
+        Requests of a kind that is not cached (TTL 0) are ignored.
+
+        Args:
+            endpoint (str): E-utility name.
+            params (dict): Request parameters.
+            content (bytes): The response body.
+        """
+        ttl = self.ttls.get(request_kind(endpoint, params))
+        if ttl == 0:
+            return
+        key = cache_key(endpoint, params)
+        now = time.time()
+        path = self._blob_path(key)
+        ensure_dir(path.parent)
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._index().execute(
+                "INSERT OR REPLACE INTO entries (key, size, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, len(content), None if ttl is None else now + ttl, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _delete(self, key):
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._blob_path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            self._delete(key)
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Removes every cached entry."""
+        with self._lock:
+            if self._index(create=False) is None:
+                return
+            for (key,) in self._conn.execute("SELECT key FROM entries").fetchall():
+                self._delete(key)
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Returns cache statistics for this session.
+
+        Returns:
+            dict: Hits, misses, hit rate, evictions, number of entries and total bytes.
+        """
+        with self._lock:
+            if self._index(create=False) is None:
+                entries, total = 0, 0
+            else:
+                entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
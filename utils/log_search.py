@@ -1,18 +1,24 @@
-from utils.config import dir_log_results
+from pathlib import Path
+from utils.config import ensure_dir
 from datetime import datetime
 
-def keywords_to_ids(keywords, pmc_ids, log_file_path):
+def keywords_to_ids(keywords, pmc_ids, log_file_path, count=None):
     """
     Log the search keywords and PMC IDs to a log file.
     
     Args:
         keywords (List[str]): Keywords used for the search.
-        pmc_ids (List[str]): List of retrieved PMC IDs.
+        pmc_ids (Iterable[str]): Retrieved PMC IDs; written as they are iterated.
         log_file_path (Path): Path to the log file.
+        count (int): Number of PMC IDs; defaults to len(pmc_ids).
     """
+    ensure_dir(Path(log_file_path).parent)
     with open(log_file_path, 'a') as log_file:
         log_file.write(f"Search Query: {' AND '.join(keywords)}\n")
-        log_file.write(f"Found {len(pmc_ids)} articles\n")
-        log_file.write(f"PMC IDs Found: {', '.join([f'PMC{pmc_id}' for pmc_id in pmc_ids])}\n")
+        log_file.write(f"Found {len(pmc_ids) if count is None else count} articles\n")
+        log_file.write("PMC IDs Found: ")
+        for i, pmc_id in enumerate(pmc_ids):
+            log_file.write(f"{', ' if i else ''}PMC{pmc_id}")
+        log_file.write("\n")
         log_file.write(f"Search Time: {datetime.now()}\n\n")
 
@@ -0,0 +1,183 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from utils.config import ensure_dir
+
+# Download states recorded in the manifest
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_AGE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$")
+_AGE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks", "": "days"}
+
+def parse_age(value):
+    """
+    Parses an age such as "7d", "12h", "30m" or "2" (days) into a timedelta.
+
+    Args:
+        value (str): Number followed by an optional unit (s, m, h, d, w).
+
+    Returns:
+        timedelta: The parsed age.
+
+    Raises:
+        ValueError: If the value cannot be parsed.
+    """
+    match = _AGE_PATTERN.match(str(value).lower())
+    if match is None:
+        raise ValueError(f"Invalid age '{value}'; expected e.g. '7d', '12h' or '30m'")
+    amount, unit = match.groups()
+    return timedelta(**{_AGE_UNITS[unit]: float(amount)})
+
+class DownloadManifest:
+    """
+    Persistent SQLite record of every PMC ID that retrieve_articles has fetched.
+
+    Each row holds the PMC ID, its status ("done" or "failed"), the byte size
+    and SHA-256 hash of the saved XML and the time it was fetched. Recording is
+    idempotent: fetching an ID again simply updates its row. A failure never
+    demotes a done row, whose saved copy is still valid; it only records the error.
+
+    The manifest file and its folder are created with the first recorded download.
+
+    Args:
+        path (Path): Location of the SQLite manifest file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # Writers may run in worker threads, so share one connection behind a lock
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self, create=True):
+        """Returns the connection, opening it on first use; None if there is no manifest yet and not `create`."""
+        if self._conn is None:
+            if not create and not self.path.exists():
+                return None
+            ensure_dir(self.path.parent)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS downloads (
+                    pmc_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    size INTEGER,
+                    sha256 TEXT,
+                    fetched_at TEXT NOT NULL,
+                    error TEXT
+                )"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Closes the underlying SQLite connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _upsert(self, pmc_id, status, size=None, sha256=None, error=None):
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self._db().execute(
+                """INSERT INTO downloads (pmc_id, status, size, sha256, fetched_at, error)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(pmc_id) DO UPDATE SET
+                    status = excluded.status, size = excluded.size, sha256 = excluded.sha256,
+                    fetched_at = excluded.fetched_at, error = excluded.error""",
+                (str(pmc_id), status, size, sha256, fetched_at, error),
+            )
+            self._conn.commit()
+
+    def record_done(self, pmc_id, full_text):
+        """
+        Records a successfully saved article.
+
+        Args:
+            pmc_id (str): The PMC ID.
+            full_text (str): The XML text as it was written to disk.
+        """
+        content = full_text.encode("utf-8")
+        self._upsert(pmc_id, STATUS_DONE, size=len(content), sha256=hashlib.sha256(content).hexdigest())
+
+    def record_failed(self, pmc_id, error=None):
+        """
+        Records an article that could not be fetched or saved.
+
+        Args:
+            pmc_id (str): The PMC ID.
+            error (str): Optional error message.
+        """
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            # In SET, the column names refer to the existing row
+            self._db().execute(
+                """INSERT INTO downloads (pmc_id, status, fetched_at, error)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(pmc_id) DO UPDATE SET
+                    status = CASE WHEN status = ? THEN status ELSE excluded.status END,
+                    fetched_at = CASE WHEN status = ? THEN fetched_at ELSE excluded.fetched_at END,
+                    error = excluded.error""",
+                (str(pmc_id), STATUS_FAILED, fetched_at, error, STATUS_DONE, STATUS_DONE),
+            )
+            self._conn.commit()
+
+    def completed_ids(self, newer_than=None):
+        """
+        Returns the IDs recorded as done.
+
+        Args:
+            newer_than (timedelta): Only include IDs fetched within this age.
+
+        Returns:
+            set: PMC IDs with status "done".
+        """
+        query = "SELECT pmc_id FROM downloads WHERE status = ?"
+        params = [STATUS_DONE]
+        if newer_than is not None:
+            query += " AND fetched_at >= ?"
+            params.append((datetime.now(timezone.utc) - newer_than).isoformat())
+        with self._lock:
+            if self._db(create=False) is None:
+                return set()
+            return {row[0] for row in self._conn.execute(query, params)}
+
+    def pending_ids(self, pmc_ids, refresh_older_than=None, store=None):
+        """
+        Filters `pmc_ids` down to the IDs that still have to be fetched.
+
+        Completed IDs are skipped; failed and unknown IDs are kept. With
+        `refresh_older_than`, completed IDs fetched longer ago are kept as well.
+        With `store`, completed IDs that are missing from the store are kept.
+        The candidates are consumed lazily, so they can be streamed from the
+        history server.
+
+        Args:
+            pmc_ids (iterable): Candidate PMC IDs, e.g. the search results.
+            refresh_older_than (timedelta): Maximum age of a completed download.
+            store (article store): Store the full texts are saved to.
+
+        Yields:
+            str: PMC IDs to fetch, in the order given.
+        """
+        completed = self.completed_ids(newer_than=refresh_older_than)
+        for pmc_id in pmc_ids:
+            if str(pmc_id) not in completed or (store is not None and pmc_id not in store):
+                yield pmc_id
+
+    def summary(self):
+        """Returns a dictionary with the number of IDs per status."""
+        with self._lock:
+            if self._db(create=False) is None:
+                return {}
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM downloads GROUP BY status"))
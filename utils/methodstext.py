@@ -1,6 +1,15 @@
+import hashlib
+import json
 import os
+import re
 import xml.etree.ElementTree as ET
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from thefuzz import fuzz
+from utils.article_store import as_store
+from utils.config import ensure_dir
+from utils.paragraphs import ParagraphWriter, paragraph_index, paragraph_records
 
 # List of section titles to match (case insensitive)
 METHODS_TITLES = {"methods", "materials and methods", "methodology", "method"}
@@ -8,80 +17,495 @@ METHODS_TITLES = {"methods", "materials and methods", "methodology", "method"}
 # Minimum similarity score for fuzzy matching
 SIMILARITY_THRESHOLD = 80
 
+# Bump whenever the extraction code changes its output, to invalidate incremental runs
+EXTRACTOR_REVISION = 4
+
+# Sidecar index of incremental runs, kept in the output folder
+METHODS_INDEX = "methods_index.json"
+
+# Leading section numbers such as "2.", "2.1", "II." or "A)" in section titles
+_NUMBERING_PATTERN = re.compile(r"^(?:\d+(?:\.\d+)*[.):]?|(?:[ivxlc]+|[a-z])[.)])\s+")
+
+class TitleClassifier:
+    """
+    Decides whether section titles are methods titles, close to one dict lookup per call.
+
+    Titles are normalized (case, whitespace, leading numbering, trailing
+    punctuation) and decisions are memoized in a bounded LRU cache, since the
+    same few hundred titles repeat across a corpus. On a cache miss, exact
+    matches are accepted directly and references that cannot reach the
+    threshold by length or by shared characters are skipped before any fuzzy
+    scoring. The prefilters are exact bounds on fuzz.ratio, so decisions equal
+    plain fuzzy matching of the normalized title.
+
+    Args:
+        references (set): Reference titles (lowercase).
+        threshold (int): Minimum fuzz.ratio score for a match.
+        maxsize (int): Maximum number of memoized titles.
+    """
+
+    def __init__(self, references=METHODS_TITLES, threshold=SIMILARITY_THRESHOLD, maxsize=4096):
+        self.source = references
+        self.references = {ref: Counter(ref) for ref in references}
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.fuzzy_calls = 0
+
+    @staticmethod
+    def normalize(title):
+        """Lowercases a title, collapses whitespace and strips numbering and trailing punctuation."""
+        title = " ".join(title.lower().split())
+        title = _NUMBERING_PATTERN.sub("", title)
+        return title.rstrip(" .:;")
+
+    def __call__(self, title):
+        key = self.normalize(title)
+        decision = self._cache.get(key)
+        if decision is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return decision
+        self.misses += 1
+        decision = self._classify(key)
+        self._cache[key] = decision
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return decision
+
+    def _classify(self, key):
+        if key in self.references:
+            return True
+        # fuzz.ratio = 200 * LCS / (len(a) + len(b)), rounded, and the longest common
+        # subsequence is bounded by the shorter length and by the shared characters
+        key_chars = None
+        for ref, ref_chars in self.references.items():
+            total = len(key) + len(ref)
+            if 200 * min(len(key), len(ref)) < (self.threshold - 0.5) * total:
+                continue
+            if key_chars is None:
+                key_chars = Counter(key)
+            if 200 * sum((key_chars & ref_chars).values()) < (self.threshold - 0.5) * total:
+                continue
+            self.fuzzy_calls += 1
+            if fuzz.ratio(key, ref) >= self.threshold:
+                return True
+        return False
+
+    def stats(self):
+        """
+        Returns the memoization statistics of this classifier.
+
+        Returns:
+            dict: Hits, misses, hit rate, number of fuzzy comparisons and cache size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "fuzzy_calls": self.fuzzy_calls,
+            "cached": len(self._cache),
+        }
+
+_classifier = None
+
+def get_title_classifier():
+    """
+    Returns the shared TitleClassifier, rebuilding it if METHODS_TITLES or
+    SIMILARITY_THRESHOLD has been replaced since it was created.
+    """
+    global _classifier
+    if _classifier is None or _classifier.source is not METHODS_TITLES or _classifier.threshold != SIMILARITY_THRESHOLD:
+        _classifier = TitleClassifier(METHODS_TITLES, SIMILARITY_THRESHOLD)
+    return _classifier
+
 def is_methods_section(title):
     """
     Determines if a given title matches a methods-related section
     using fuzzy string matching.
 
+    Decisions are memoized per normalized title by the shared TitleClassifier.
+
     Args:
         title (str): The section title from the XML.
 
     Returns:
         bool: True if the title is likely a methods section, False otherwise.
     """
-    return any(fuzz.ratio(title.lower().strip(), ref) >= SIMILARITY_THRESHOLD for ref in METHODS_TITLES)
+    return get_title_classifier()(title)
+
+def _local_name(tag):
+    """Strips an XML namespace from a tag name."""
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def _section_title(section):
+    """Returns the text of the direct <title> child of a section, or an empty string."""
+    for child in section:
+        if _local_name(child.tag) == "title":
+            return " ".join("".join(child.itertext()).split())
+    return ""
+
+class _MethodsText:
+    """
+    Accumulates extracted text nodes and the character span of every section
+    and paragraph.
+
+    Text nodes are joined by a newline and top-level methods sections by a
+    blank line, matching the layout of the methods_<id>.txt files.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+        self.sections = []
+        self.paragraphs = []
+        self._open = []
+        self._separator = ""
+
+    def start_block(self):
+        """Starts a new top-level methods section."""
+        if self.parts:
+            self._separator = "\n\n"
+
+    def open_section(self, path):
+        record = {"path": path, "start": None, "end": None}
+        self.sections.append(record)
+        self._open.append(record)
+
+    def close_section(self):
+        record = self._open.pop()
+        if record["start"] is None:
+            # A section without any text of its own is an empty span where it occurred
+            record["start"] = record["end"] = self.length
+
+    def open_paragraph(self, path):
+        record = {"section_path": path, "start": None, "end": None}
+        self._open.append(record)
+        return record
+
+    def close_paragraph(self):
+        record = self._open.pop()
+        if record["start"] is not None:
+            self.paragraphs.append(record)
+
+    def add(self, text):
+        text = text.strip() if text else ""
+        if not text:
+            return
+        if self.parts:
+            self.parts.append(self._separator)
+            self.length += len(self._separator)
+        self._separator = "\n"
+        start = self.length
+        self.parts.append(text)
+        self.length += len(text)
+        for record in self._open:
+            if record["start"] is None:
+                record["start"] = start
+            record["end"] = self.length
+
+    def text(self):
+        return "".join(self.parts)
+
+def _walk(element, path, out):
+    """
+    Emits the text of an element and its descendants in document order.
+
+    Every text node is visited exactly once. Titles become part of the section
+    path instead of the text, each nested <sec> gets its own span, and every
+    other direct child of a <sec> (<p>, <list>, <table-wrap>, ...) is recorded
+    as one paragraph.
+    """
+    tag = _local_name(element.tag)
+    if tag == "title":
+        return
+    if tag == "sec":
+        path = path + [_section_title(element)]
+        out.open_section(path)
+    else:
+        out.add(element.text)
+    for child in element:
+        child_tag = _local_name(child.tag)
+        if tag == "sec" and child_tag not in ("sec", "title"):
+            out.open_paragraph(path)
+            _walk(child, path, out)
+            out.close_paragraph()
+        else:
+            _walk(child, path, out)
+        if child_tag not in ("sec", "title"):
+            out.add(child.tail)
+    if tag == "sec":
+        out.close_section()
 
 def extract_text_from_section(section):
     """
     Extracts and compiles text content from a given XML section.
 
+    Text nodes of nested sections are included once, in document order;
+    section titles are left out.
+
     Args:
         section (ElementTree.Element): The XML <sec> element.
 
     Returns:
         str: Extracted text content.
     """
-    section_text = []
-    for elem in section.iter():
-        if elem.tag not in ["title", "sec"]:  # Avoid nested sections
-            if elem.text:
-                section_text.append(elem.text.strip())
-            if elem.tail:
-                section_text.append(elem.tail.strip())
-    return "\n".join(filter(None, section_text)).strip()
+    out = _MethodsText()
+    _walk(section, [], out)
+    return out.text()
+
+def extract_methods_text(xml_file):
+    """
+    Extracts the methods sections of an article in a single streaming pass.
+
+    The XML is pull-parsed with iterparse. Each <sec> is classified once, when
+    its sec-type or title becomes known; the outermost methods section is
+    emitted when it closes, so a methods section nested inside another one is
+    never collected twice. Everything outside methods sections is cleared as
+    soon as it has been parsed, which keeps memory flat on very large articles.
+
+    Args:
+        xml_file (Path or file object): The article XML.
+
+    Returns:
+        tuple: (text, sections, paragraphs) where text is the extracted methods
+        text, sections is a list of {"path", "start", "end"} dictionaries giving
+        the title path of every methods (sub)section and its character span in
+        text, and paragraphs lists the {"section_path", "start", "end"} span of
+        every paragraph.
+    """
+    out = _MethodsText()
+    # Open <sec> elements: [element, depth, title, is_methods (None = not yet known)]
+    stack = []
+    depth = 0
+
+    for event, element in ET.iterparse(xml_file, events=("start", "end")):
+        tag = _local_name(element.tag)
+        if event == "start":
+            depth += 1
+            if tag == "sec":
+                stack.append([element, depth, "", True if element.get("sec-type") == "methods" else None])
+            continue
+
+        depth -= 1
+        if tag == "title" and stack and stack[-1][1] == depth:
+            # Direct title of the innermost open section: classify the section now
+            frame = stack[-1]
+            frame[2] = " ".join("".join(element.itertext()).split())
+            if frame[3] is None:
+                frame[3] = bool(frame[2]) and is_methods_section(frame[2])
+        elif tag == "sec":
+            _, _, title, is_methods = stack.pop()
+            if is_methods and not any(frame[3] for frame in stack):
+                out.start_block()
+                path = [frame[2] for frame in stack]
+                _walk(element, path, out)
+                element.clear()
+                continue
+
+        # Drop parsed content that can no longer end up in a methods section
+        if all(frame[3] is False for frame in stack):
+            element.clear()
+
+    return out.text(), out.sections, out.paragraphs
+
+def _extract_article(store, pmc_id):
+    """
+    Extracts the methods text of one stored article; runs in a worker process.
+
+    Returns:
+        tuple: (pmc_id, status, text, sections, paragraphs, title_lookups) where
+        status is "extracted", "no_methods" or "error", text is the methods text
+        or the error message, sections and paragraphs are the spans returned by
+        extract_methods_text and title_lookups is the (hits, misses) count of
+        the title classifier for this article.
+    """
+    classifier = get_title_classifier()
+    hits, misses = classifier.hits, classifier.misses
+    try:
+        with store.open(pmc_id) as xml_file:
+            text, sections, paragraphs = extract_methods_text(xml_file)
+    except Exception as e:
+        text, sections, paragraphs, status = str(e), None, None, "error"
+    else:
+        status = "extracted" if text else "no_methods"
+    title_lookups = (classifier.hits - hits, classifier.misses - misses)
+    if status == "no_methods":
+        text, sections, paragraphs = None, None, None
+    return pmc_id, status, text, sections, paragraphs, title_lookups
+
+def extractor_version():
+    """
+    Identifies the current extraction rules.
+
+    Combines EXTRACTOR_REVISION with METHODS_TITLES and SIMILARITY_THRESHOLD, so
+    changing the matching rules invalidates every entry of the incremental index.
+
+    Returns:
+        str: A short hash of the extraction rules.
+    """
+    rules = json.dumps([EXTRACTOR_REVISION, sorted(METHODS_TITLES), SIMILARITY_THRESHOLD])
+    return hashlib.sha256(rules.encode("utf-8")).hexdigest()[:16]
+
+def _load_index(output_folder):
+    """Loads the incremental index of an output folder, or an empty one."""
+    index_path = output_folder / METHODS_INDEX
+    if index_path.exists():
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"extractor_version": None, "articles": {}}
+
+def _save_index(output_folder, index):
+    """Writes the incremental index atomically."""
+    index_path = output_folder / METHODS_INDEX
+    tmp_path = index_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+def _fingerprint(store, pmc_id, entry):
+    """
+    Identifies the current version of an article.
+
+    The SHA-256 of the XML is taken from the index entry while the store
+    reports the same size and mtime as when it was hashed; otherwise the
+    article is read and hashed again.
+
+    Returns:
+        dict: "sha256" of the article XML and its "stat" (see DirectoryStore.stat).
+    """
+    stat = store.stat(pmc_id)
+    if stat is not None and entry is not None and entry.get("stat") == stat:
+        return {"sha256": entry["sha256"], "stat": stat}
+    return {"sha256": hashlib.sha256(store.get(pmc_id)).hexdigest(), "stat": stat}
 
-def extract_methods(input_folder, output_folder):
+def extract_methods(input_folder, output_folder, workers=None, chunksize=32, incremental=True):
     """
     Extracts methods-related sections from full-text XML files in the given input folder
     and saves them as text files in the specified output folder.
 
+    Articles are parsed across a process pool; the workers return the extracted
+    text and a status per article, which are written out and reported in PMC ID
+    order, so the output does not depend on the number of workers.
+
+    In incremental mode, a sidecar index (methods_index.json) maps each article
+    to the SHA-256 of its XML, its output file and the character spans of its
+    methods (sub)sections. Unchanged articles are
+    skipped, and everything is extracted again when the extraction rules
+    change (see extractor_version). An article is only read and hashed again
+    when the size or mtime of its file changed. The index is written in
+    both modes, and outputs of articles deleted since the last run are
+    removed in both modes.
+
+    Every methods paragraph is also written as one record of
+    methods_paragraphs.jsonl (see utils.paragraphs.read_paragraphs), with its
+    section path and character offsets into the methods text. The records of
+    skipped articles are carried over from the previous file as raw bytes.
+
     Args:
-        input_folder (Path): Directory containing the full-text XML files.
+        input_folder (Path or article store): Store (or folder) containing the full-text XML files.
         output_folder (Path): Directory where extracted methods will be saved.
+        workers (int): Number of worker processes; defaults to the number of CPUs.
+            Use 1 to extract in the current process.
+        chunksize (int): Number of articles handed to a worker at a time.
+        incremental (bool): Skip articles that are unchanged since the last run.
 
     Returns:
-        None
-    """
-    for file_name in os.listdir(input_folder):
-        if file_name.endswith(".xml"):
-            file_path = input_folder / file_name
-            try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-
-                methods_text = []
-                
-                # Find all <sec> sections
-                for sec in root.findall(".//sec"):
-                    # Check for `sec-type="methods"`
-                    if sec.get("sec-type") == "methods":
-                        methods_text.append(extract_text_from_section(sec))
-                        continue
-
-                    # Check section title
-                    title_element = sec.find("title")
-                    if title_element is not None and is_methods_section(title_element.text.strip()):
-                        methods_text.append(extract_text_from_section(sec))
-
-                # Save extracted methods
-                if methods_text:
-                    pmc_id = file_name.replace(".xml", "")
-                    output_file = output_folder / f"methods_{pmc_id}.txt"
-                    with open(output_file, "w", encoding="utf-8") as txt_file:
-                        txt_file.write("\n\n".join(methods_text))
-                    print(f"Extracted methods from {file_name} → {output_file}")
-                else:
-                    print(f"No methods section found in {file_name}")
-
-            except Exception as e:
-                print(f"Error processing file {file_name}: {e}")
+        dict: PMC IDs per status ("extracted", "no_methods", "skipped", "removed"),
+        error messages per PMC ID ("error") and title cache hits and misses
+        ("title_cache").
+    """
+    output_folder = ensure_dir(output_folder)
+    store = as_store(input_folder)
+    pmc_ids = store.ids()
+    version = extractor_version()
+    previous = _load_index(output_folder)
+    if incremental and previous["extractor_version"] == version:
+        index = previous
+    else:
+        index = {"extractor_version": version, "articles": {}}
+    articles = index["articles"]
+
+    # The hashes of the previous index stay usable across rule changes
+    fingerprints = {pmc_id: _fingerprint(store, pmc_id, previous["articles"].get(pmc_id)) for pmc_id in pmc_ids}
+    # An article with methods text is only up to date if its paragraphs were written too
+    has_paragraphs = paragraph_index(output_folder).keys()
+    todo, skipped = [], []
+    for pmc_id in pmc_ids:
+        entry = articles.get(pmc_id)
+        if (entry is not None and entry["sha256"] == fingerprints[pmc_id]["sha256"]
+                and (entry["output"] is None
+                     or ((output_folder / entry["output"]).exists() and pmc_id in has_paragraphs))):
+            skipped.append(pmc_id)
+        else:
+            todo.append(pmc_id)
+
+    workers = workers or os.cpu_count() or 1
+    extract = partial(_extract_article, store)
+    with ParagraphWriter(output_folder, keep_ids=skipped) as paragraph_writer:
+        if workers == 1 or len(todo) <= chunksize:
+            report = _save_methods(map(extract, todo), output_folder, articles, fingerprints, paragraph_writer)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(extract, todo, chunksize=chunksize)
+                report = _save_methods(results, output_folder, articles, fingerprints, paragraph_writer)
+    report["skipped"] = skipped
+
+    # Remove outputs whose input article no longer exists, using the previous
+    # index, which still lists them after a rule change or a full run
+    report["removed"] = []
+    for pmc_id in sorted(set(previous["articles"]) - set(fingerprints)):
+        output = previous["articles"][pmc_id]["output"]
+        articles.pop(pmc_id, None)
+        if output:
+            (output_folder / output).unlink(missing_ok=True)
+        report["removed"].append(pmc_id)
+
+    _save_index(output_folder, index)
+    print_extraction_report(report)
+    return report
+
+def _save_methods(results, output_folder, articles, fingerprints, paragraph_writer):
+    """Writes the extracted methods texts and paragraphs, updates the index entries and collects the statuses."""
+    report = {"extracted": [], "no_methods": [], "error": {}, "title_cache": {"hits": 0, "misses": 0}}
+    for pmc_id, status, text, sections, paragraphs, (hits, misses) in results:
+        report["title_cache"]["hits"] += hits
+        report["title_cache"]["misses"] += misses
+        output_file = output_folder / f"methods_{pmc_id}.txt"
+        if status == "extracted":
+            with open(output_file, "w", encoding="utf-8") as txt_file:
+                txt_file.write(text)
+            paragraph_writer.write(pmc_id, paragraph_records(pmc_id, text, paragraphs))
+            articles[pmc_id] = {**fingerprints[pmc_id], "output": output_file.name, "sections": sections}
+            report["extracted"].append(pmc_id)
+        elif status == "no_methods":
+            # Drop the output of an earlier version of the article that did have methods
+            output_file.unlink(missing_ok=True)
+            articles[pmc_id] = {**fingerprints[pmc_id], "output": None}
+            report["no_methods"].append(pmc_id)
+        else:
+            # Errors are not indexed, so the article is tried again on the next run;
+            # the output of an earlier version is dropped, like its paragraph records
+            output_file.unlink(missing_ok=True)
+            articles.pop(pmc_id, None)
+            report["error"][pmc_id] = text
+    return report
+
+def print_extraction_report(report):
+    """Prints a summary of an extract_methods run."""
+    total = len(report["extracted"]) + len(report["no_methods"]) + len(report["error"]) + len(report["skipped"])
+    print(f"Methods extraction summary ({total} articles)")
+    print(f"  Methods extracted:     {len(report['extracted'])}")
+    print(f"  No methods section:    {len(report['no_methods'])}")
+    print(f"  Unchanged (skipped):   {len(report['skipped'])}")
+    print(f"  Removed (input gone):  {len(report['removed'])}")
+    print(f"  Errors:                {len(report['error'])}")
+    lookups = report["title_cache"]["hits"] + report["title_cache"]["misses"]
+    if lookups:
+        print(f"  Section titles:        {lookups} classified, "
+              f"{report['title_cache']['hits'] / lookups:.1%} from the title cache")
+    for pmc_id, message in report["error"].items():
+        print(f"    {pmc_id}.xml: {message}")
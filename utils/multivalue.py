@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+def split_values(series: pd.Series, sep: str = ";", strip: bool = True) -> pd.Series:
+    """
+    Splits a multi-valued text column into one value per row.
+
+    Every entry is converted with str() (so a missing value becomes "nan", as
+    with str(value).split(sep)), split on `sep`, optionally stripped, and empty
+    values are dropped.
+
+    Args:
+        series (pd.Series): Multi-valued column, e.g. "Force plates;IMU".
+        sep (str): Separator between values.
+        strip (bool): Strip whitespace around each value.
+
+    Returns:
+        pd.Series: The values in input order, indexed by the label of the row they came from.
+    """
+    # Through NumPy, as astype(str) keeps missing values missing with the pandas string dtype
+    text = pd.Series(series.to_numpy(dtype=object).astype(str), index=series.index, name=series.name)
+    values = text.str.split(sep, regex=False).explode()
+    if strip:
+        values = values.str.strip()
+    return values[values.notna() & (values != "")]
+
+def encode(values: pd.Series, categories=None):
+    """
+    Encodes exploded values as integer codes.
+
+    Args:
+        values (pd.Series): Exploded values, indexed by study.
+        categories (list): Value vocabulary; defaults to the values in order of first appearance.
+
+    Returns:
+        tuple: (rows, codes, studies, categories) where rows and codes are int
+        arrays giving the study position and value code of each entry, studies
+        holds the distinct index labels in order of first appearance and
+        categories the value vocabulary.
+    """
+    rows, studies = pd.factorize(values.index)
+    if categories is None:
+        codes, categories = pd.factorize(values.to_numpy())
+    else:
+        categories = pd.Index(categories)
+        codes = categories.get_indexer(values.to_numpy())
+        if (codes < 0).any():
+            raise KeyError(f"Values missing from categories: {sorted(set(values[codes < 0]))}")
+    return rows, codes, studies, pd.Index(categories)
+
+def indicator_matrix(values: pd.Series, index=None, columns=None, dtype=bool) -> pd.DataFrame:
+    """
+    Builds a study x value indicator matrix from exploded values.
+
+    Args:
+        values (pd.Series): Exploded values, indexed by study.
+        index (list): Row labels; defaults to the studies in order of first appearance.
+            Studies without values get an all-zero row.
+        columns (list): Column labels; defaults to the values in order of first appearance.
+        dtype: Data type of the matrix, e.g. bool or int.
+
+    Returns:
+        pd.DataFrame: 1/True where a study has a value.
+
+    Raises:
+        KeyError: If `index` or `columns` leave out a study or value that occurs in `values`.
+    """
+    rows, codes, studies, categories = encode(values, columns)
+    if index is not None:
+        index = pd.Index(index)
+        positions = index.get_indexer(studies)
+        if (positions < 0).any():
+            raise KeyError(f"Studies missing from index: {list(studies[positions < 0])}")
+        rows = positions[rows]
+        studies = index
+    matrix = np.zeros((len(studies), len(categories)), dtype=dtype)
+    matrix[rows, codes] = 1
+    return pd.DataFrame(matrix, index=studies, columns=categories)
+
+def cross_product(left: pd.Series, right: pd.Series, names=None) -> pd.DataFrame:
+    """
+    Pairs every value of `left` with every value of `right` from the same study.
+
+    The result is ordered by study, then by left value, then by right value,
+    as nested loops over itertools.product would produce it.
+
+    Args:
+        left (pd.Series): Exploded values, indexed by study.
+        right (pd.Series): Exploded values, indexed by study.
+        names (tuple): Column names; default to the names of the two series.
+
+    Returns:
+        pd.DataFrame: One row per pair.
+    """
+    names = names or (left.name, right.name)
+    left_frame = pd.DataFrame({"study": left.index, names[0]: left.to_numpy(), "_order": np.arange(len(left))})
+    right_frame = pd.DataFrame({"study": right.index, names[1]: right.to_numpy()})
+    pairs = left_frame.merge(right_frame, on="study", how="inner", sort=False)
+    # The merge keeps right matches in input order; restore the left order explicitly
+    pairs = pairs.sort_values("_order", kind="stable")
+    return pairs[list(names)].reset_index(drop=True)
+
+def crosstab(pairs: pd.DataFrame, rows: str, columns: str) -> pd.DataFrame:
+    """
+    Counts the pairs per (row value, column value), as a wide table with zeros for absent pairs.
+
+    Pairs with a missing row or column value are left out, as in pd.crosstab.
+
+    Args:
+        pairs (pd.DataFrame): Long table, e.g. from cross_product.
+        rows (str): Column whose values become the rows.
+        columns (str): Column whose values become the columns.
+
+    Returns:
+        pd.DataFrame: Counts with sorted row and column labels.
+    """
+    # factorize would code missing values as -1, which bincount cannot count
+    pairs = pairs.dropna(subset=[rows, columns])
+    row_codes, row_labels = pd.factorize(pairs[rows], sort=True)
+    col_codes, col_labels = pd.factorize(pairs[columns], sort=True)
+    counts = np.bincount(row_codes * len(col_labels) + col_codes, minlength=len(row_labels) * len(col_labels))
+    table = pd.DataFrame(counts.reshape(len(row_labels), len(col_labels)),
+                         index=pd.Index(row_labels, name=rows), columns=pd.Index(col_labels, name=columns))
+    return table
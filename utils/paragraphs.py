@@ -0,0 +1,172 @@
+import json
+import mmap
+import os
+from pathlib import Path
+
+# One JSON record per methods paragraph, grouped by article in PMC ID order
+PARAGRAPHS_FILE = "methods_paragraphs.jsonl"
+
+# Byte range of every article's records inside PARAGRAPHS_FILE
+PARAGRAPHS_INDEX = "methods_paragraphs.idx.json"
+
+# Fields of a paragraph record
+PARAGRAPH_COLUMNS = ("pmc_id", "section_path", "paragraph", "start", "end", "text")
+
+def paragraph_records(pmc_id, text, paragraphs):
+    """
+    Builds the paragraph records of one article.
+
+    Args:
+        pmc_id (str): The PMC ID.
+        text (str): The methods text, as written to methods_<pmc_id>.txt.
+        paragraphs (list): {"section_path", "start", "end"} spans from
+            utils.methodstext.extract_methods_text.
+
+    Returns:
+        list: Records with the PMC ID, section path, paragraph index, character
+        offsets into the methods text and the paragraph text.
+    """
+    return [
+        {
+            "pmc_id": pmc_id,
+            "section_path": span["section_path"],
+            "paragraph": i,
+            "start": span["start"],
+            "end": span["end"],
+            "text": text[span["start"]:span["end"]],
+        }
+        for i, span in enumerate(paragraphs)
+    ]
+
+class ParagraphWriter:
+    """
+    Rewrites the paragraph file of an output folder in a single streaming pass.
+
+    New records are written with write(); articles listed in `keep_ids` are
+    copied as raw bytes from the previous file, so an incremental run never
+    re-serializes unchanged articles. Articles are written in PMC ID order;
+    calls to write() must follow that order too.
+
+    Args:
+        output_folder (Path): Folder holding the paragraph file and its index.
+        keep_ids (list): Sorted PMC IDs whose existing records are kept.
+    """
+
+    def __init__(self, output_folder, keep_ids=()):
+        self.folder = Path(output_folder)
+        self.path = self.folder / PARAGRAPHS_FILE
+        self.index_path = self.folder / PARAGRAPHS_INDEX
+        self._old_index = _load_index(self.folder)
+        self._old_file = None
+        self._old_map = None
+        if self._old_index and self.path.stat().st_size:
+            self._old_file = open(self.path, "rb")
+            self._old_map = mmap.mmap(self._old_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._keep = [pmc_id for pmc_id in keep_ids if self._old_map is not None and pmc_id in self._old_index]
+        self._keep_pos = 0
+        self._tmp_path = self.path.with_name(f".{PARAGRAPHS_FILE}.{os.getpid()}.tmp")
+        self._out = open(self._tmp_path, "wb")
+        self.index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort()
+
+    def _copy_kept(self, before=None):
+        while self._keep_pos < len(self._keep) and (before is None or self._keep[self._keep_pos] < before):
+            pmc_id = self._keep[self._keep_pos]
+            start, end = self._old_index[pmc_id]
+            position = self._out.tell()
+            self._out.write(self._old_map[start:end])
+            self.index[pmc_id] = [position, self._out.tell()]
+            self._keep_pos += 1
+
+    def write(self, pmc_id, records):
+        """
+        Writes the records of one article.
+
+        Args:
+            pmc_id (str): The PMC ID.
+            records (list): Records from paragraph_records.
+        """
+        self._copy_kept(before=pmc_id)
+        position = self._out.tell()
+        for record in records:
+            self._out.write(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+            self._out.write(b"\n")
+        self.index[pmc_id] = [position, self._out.tell()]
+
+    def close(self):
+        """Copies the remaining kept articles and replaces the paragraph file and its index."""
+        self._copy_kept()
+        self._out.close()
+        self._close_old()
+        os.replace(self._tmp_path, self.path)
+        tmp_index = self.index_path.with_suffix(".tmp")
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_index, self.index_path)
+
+    def _abort(self):
+        self._out.close()
+        self._close_old()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def _close_old(self):
+        if self._old_map is not None:
+            self._old_map.close()
+            self._old_file.close()
+            self._old_map = self._old_file = None
+
+def paragraph_index(folder):
+    """Returns the {pmc_id: [byte_start, byte_end]} index of a folder's paragraph file."""
+    return _load_index(folder)
+
+def _load_index(folder):
+    index_path = Path(folder) / PARAGRAPHS_INDEX
+    if not index_path.exists() or not (Path(folder) / PARAGRAPHS_FILE).exists():
+        return {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def read_paragraphs(folder, pmc_ids=None, columns=None):
+    """
+    Streams paragraph records from a methods output folder.
+
+    The paragraph file is memory-mapped and, when `pmc_ids` is given, only the
+    byte ranges of those articles are read and decoded.
+
+    Args:
+        folder (Path): Folder holding methods_paragraphs.jsonl, e.g. utils.config.dir_methods.
+        pmc_ids (iterable): Only yield records of these articles (in this order).
+        columns (iterable): Only keep these fields of each record.
+
+    Yields:
+        dict: One record per paragraph.
+    """
+    path = Path(folder) / PARAGRAPHS_FILE
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    columns = list(columns) if columns is not None else None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if pmc_ids is None:
+            for line in iter(mm.readline, b""):
+                yield _decode(line, columns)
+            return
+        index = _load_index(folder)
+        for pmc_id in pmc_ids:
+            if str(pmc_id) in index:
+                start, end = index[str(pmc_id)]
+                for line in mm[start:end].splitlines():
+                    yield _decode(line, columns)
+
+def _decode(line, columns):
+    record = json.loads(line)
+    if columns is not None:
+        record = {column: record[column] for column in columns}
+    return record
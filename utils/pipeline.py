@@ -0,0 +1,317 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils import config
+from utils.config import dir_proj, ensure_dir
+from utils.datasets import CLEANED_TABLES, dataset_path, raw_dataset
+from utils.render import FIGURES, figure_data, script_inputs
+from utils.renderprofile import plot_path
+from utils.search_index import SEARCH_INDEX_FILE
+
+def stages():
+    """
+    Builds the stage table under the current project root (see utils.config.set_root).
+
+    Returns:
+        dict: Pipeline stages, by name: the script to run (relative to
+        scripts/) with its arguments, the files or folders it reads and
+        writes, and whether it always runs (its source is external, like
+        PubMed). Stages depend on the stages writing their inputs.
+    """
+    table = {
+        "retrieve": {"script": "retrieve_articles.py", "args": ["--resume"], "inputs": [],
+                     "outputs": [config.dir_fulltexts], "always": True},
+        "filter": {"script": "filter_researcharticles.py", "inputs": [config.dir_fulltexts],
+                   "outputs": [config.dir_researcharticles]},
+        "extract": {"script": "extractmethods.py", "inputs": [config.dir_researcharticles],
+                    "outputs": [config.dir_methods]},
+        "index": {"script": "index_methods.py", "inputs": [config.dir_methods],
+                  "outputs": [config.dir_results / SEARCH_INDEX_FILE]},
+        "tag": {"script": "tag_methods.py", "inputs": [config.dir_methods, config.dir_researcharticles],
+                "outputs": [config.dir_tagged]},
+        # The reviewed Elicit export is produced by hand and is a source of the pipeline
+        "clean": {"script": "clean_elicitdatacsv.py", "inputs": [raw_dataset()],
+                  "outputs": [dataset_path(name) for name in CLEANED_TABLES]},
+    }
+    table.update({
+        name: {"script": figure["script"], "inputs": figure_data(name),
+               "outputs": [plot_path(figure["output"], create=False)]}
+        for name, figure in FIGURES.items()
+    })
+    return table
+
+def pipeline_state_file():
+    """Returns the file keeping the content hashes of the inputs and outputs of every stage at its last successful run."""
+    return config.dir_results / "pipeline_state.json"
+
+def _files(path):
+    """All files of a file or folder, sorted."""
+    path = Path(path)
+    if path.is_file():
+        return [path]
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file())
+    return []
+
+class _Hasher:
+    """SHA-256 of files and folders, re-reading a file only when its size or mtime changed."""
+
+    def __init__(self, known):
+        self.known = known
+
+    def file(self, path):
+        stat = path.stat()
+        key = os.fspath(path)
+        entry = self.known.get(key)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.known[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def paths(self, paths):
+        digest = hashlib.sha256()
+        for path in map(Path, paths):
+            for file in _files(path):
+                # Names relative to the project, so that the hashes survive moving the checkout
+                name = file.relative_to(dir_proj) if file.is_relative_to(dir_proj) else file
+                digest.update(f"{name}\0{self.file(file)}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+def _stage_inputs(stage):
+    return script_inputs(dir_proj / "scripts" / stage["script"]) + [Path(path) for path in stage["inputs"]]
+
+def _contains(outer, inner):
+    outer, inner = Path(outer), Path(inner)
+    return inner == outer or outer in inner.parents
+
+def dependencies(names=None, table=None):
+    """
+    Builds the stage graph.
+
+    Args:
+        names (list): Target stages; with their upstream stages, they make up the graph. All stages by default.
+        table (dict): Stage table; defaults to stages().
+
+    Returns:
+        dict: Upstream stages of every stage in the graph.
+
+    Raises:
+        ValueError: If a target stage is not in the table.
+    """
+    table = stages() if table is None else table
+    upstream = {
+        name: sorted(other for other in table if other != name and any(
+            _contains(output, path) or _contains(path, output)
+            for output in table[other]["outputs"] for path in table[name]["inputs"]))
+        for name in table
+    }
+    selected, todo = set(), list(names or table)
+    while todo:
+        name = todo.pop()
+        if name not in table:
+            raise ValueError(f"Unknown stage '{name}' (choose from {', '.join(table)})")
+        if name not in selected:
+            selected.add(name)
+            todo += upstream[name]
+    return {name: upstream[name] for name in table if name in selected}
+
+def levels(graph):
+    """
+    Orders a stage graph into levels of independent stages.
+
+    Args:
+        graph (dict): Upstream stages of every stage, from dependencies().
+
+    Returns:
+        list: Lists of stage names; every stage comes after all its upstream stages.
+
+    Raises:
+        ValueError: If the stages form a cycle.
+    """
+    done, result = set(), []
+    while len(done) < len(graph):
+        level = [name for name in graph if name not in done and all(dep in done for dep in graph[name])]
+        if not level:
+            raise ValueError(f"Cycle between stages: {', '.join(sorted(set(graph) - done))}")
+        result.append(level)
+        done.update(level)
+    return result
+
+class Pipeline:
+    """
+    Runs the pipeline stages as a DAG, rerunning only stages with stale outputs.
+
+    A stage is stale when an output is missing, when the content of its
+    script, the utils modules the script imports (also indirectly) or its
+    inputs changed since its last successful run, or when its outputs were
+    changed by something else. Stages marked "always" run every time, but their downstream stages
+    only rerun if the content of the outputs actually changed. Independent
+    stages run in parallel, each as its own process with its output in
+    logs/pipeline_<stage>.log.
+
+    The stage table and the state file are resolved under the project root
+    current when the pipeline is created.
+
+    Args:
+        state_path (Path): File keeping the content hashes between runs;
+            defaults to results/pipeline_state.json.
+        table (dict): Stage table; defaults to stages().
+    """
+
+    def __init__(self, state_path=None, table=None):
+        self.stages = stages() if table is None else table
+        self.state_path = Path(state_path) if state_path is not None else pipeline_state_file()
+        state = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+        self.stamps = state.get("stages", {})
+        self.hasher = _Hasher(state.get("files", {}))
+
+    def _save(self):
+        ensure_dir(self.state_path.parent)
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.tmp")
+        tmp_path.write_text(json.dumps({"stages": self.stamps, "files": self.hasher.known}, indent=1))
+        os.replace(tmp_path, self.state_path)
+
+    def status(self, name):
+        """
+        Tells whether a stage is up to date.
+
+        Args:
+            name (str): Stage name.
+
+        Returns:
+            str: "up to date", or the reason the stage has to run.
+        """
+        stage, stamp = self.stages[name], self.stamps.get(name)
+        if stage.get("always"):
+            return "always runs"
+        if any(not Path(path).exists() for path in stage["outputs"]):
+            return "missing outputs"
+        if stamp is None:
+            return "never run"
+        if stamp["inputs"] != self.hasher.paths(_stage_inputs(stage)):
+            return "inputs changed"
+        if stamp["outputs"] != self.hasher.paths(stage["outputs"]):
+            return "outputs changed"
+        return "up to date"
+
+    def _run_stage(self, name):
+        stage = self.stages[name]
+        log_path = ensure_dir(config.dir_log_results) / f"pipeline_{name}.log"
+        env = dict(os.environ, MPLBACKEND="Agg",
+                   PYTHONPATH=os.pathsep.join(filter(None, [os.fspath(dir_proj), os.environ.get("PYTHONPATH")])))
+        start = time.perf_counter()
+        with open(log_path, "w", encoding="utf-8") as log:
+            returncode = subprocess.run(
+                [sys.executable, os.fspath(dir_proj / "scripts" / stage["script"]), *stage.get("args", [])],
+                cwd=dir_proj, env=env, stdout=log, stderr=subprocess.STDOUT,
+            ).returncode
+        return returncode, time.perf_counter() - start, log_path
+
+    def plan(self, names=None, force=False):
+        """
+        Works out which stages would run, without running anything.
+
+        Args:
+            names (list): Target stages (with their upstream stages); all by default.
+            force (bool): Treat every stage as stale.
+
+        Returns:
+            list: (level, stage, reason) for every stage; the reason is "up to
+            date" for stages that would be skipped.
+        """
+        graph = dependencies(names, self.stages)
+        stale, plan = set(), []
+        for i, level in enumerate(levels(graph)):
+            for name in level:
+                reason = "forced" if force else self.status(name)
+                if reason == "up to date" and any(dep in stale for dep in graph[name]):
+                    reason = "upstream stage may change its inputs"
+                if reason != "up to date":
+                    stale.add(name)
+                plan.append((i, name, reason))
+        return plan
+
+    def run(self, names=None, jobs=None, force=False, report=print):
+        """
+        Runs the stale stages, level by level, in parallel within a level.
+
+        Staleness is checked when a level starts, so a stage whose upstream
+        stages reran but produced identical outputs is still skipped. Stages
+        downstream of a failed stage are not run.
+
+        Args:
+            names (list): Target stages (with their upstream stages); all by default.
+            jobs (int): Maximum number of stages running at once; defaults to the number of CPUs.
+            force (bool): Run every stage.
+            report (callable): Receives one progress line per stage.
+
+        Returns:
+            list: One dict per stage with "name", "status" ("ran", "skipped",
+            "failed" or "blocked"), "reason" and "seconds".
+        """
+        graph = dependencies(names, self.stages)
+        results = {}
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            for level in levels(graph):
+                to_run = []
+                for name in level:
+                    if any(results[dep]["status"] in ("failed", "blocked") for dep in graph[name]):
+                        results[name] = {"name": name, "status": "blocked", "reason": "upstream stage failed",
+                                         "seconds": 0.0}
+                        continue
+                    reason = "forced" if force else self.status(name)
+                    if reason == "up to date":
+                        results[name] = {"name": name, "status": "skipped", "reason": reason, "seconds": 0.0}
+                        continue
+                    to_run.append((name, reason))
+                for name, reason in to_run:
+                    report(f"Running {name} ({reason})")
+                futures = {name: pool.submit(self._run_stage, name) for name, _ in to_run}
+                for name, reason in to_run:
+                    returncode, seconds, log_path = futures[name].result()
+                    ok = returncode == 0
+                    results[name] = {"name": name, "status": "ran" if ok else "failed", "reason": reason,
+                                     "seconds": seconds}
+                    if ok:
+                        stage = self.stages[name]
+                        self.stamps[name] = {"inputs": self.hasher.paths(_stage_inputs(stage)),
+                                             "outputs": self.hasher.paths(stage["outputs"])}
+                    else:
+                        self.stamps.pop(name, None)
+                    report(f"{'Finished' if ok else 'FAILED'} {name} in {seconds:.1f}s (log: {log_path})")
+                self._save()
+        return [results[name] for name in graph]
+
+def main(argv=None):
+    """Command line entry point (pipeline)."""
+    parser = argparse.ArgumentParser(description="Run the LitExtract pipeline, rerunning only stale stages.")
+    parser.add_argument("stages", nargs="*", help=f"Target stages ({', '.join(stages())}); all by default.")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="Show which stages would run and why.")
+    parser.add_argument("-j", "--jobs", type=int, help="Maximum number of stages running at once.")
+    parser.add_argument("-f", "--force", action="store_true", help="Run every selected stage.")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline()
+    if args.dry_run:
+        for level, name, reason in pipeline.plan(args.stages, force=args.force):
+            print(f"[{level}] {name:<9} {'skip' if reason == 'up to date' else 'run':<5} {reason}")
+        return 0
+
+    start = time.perf_counter()
+    results = pipeline.run(args.stages, jobs=args.jobs, force=args.force)
+    elapsed = time.perf_counter() - start
+    print(f"\n{'Stage':<9} {'Status':<8} {'Time (s)':>9}  Reason")
+    for result in results:
+        print(f"{result['name']:<9} {result['status']:<8} {result['seconds']:>9.1f}  {result['reason']}")
+    print(f"Total wall time: {elapsed:.1f}s")
+    return 1 if any(result["status"] in ("failed", "blocked") for result in results) else 0
@@ -0,0 +1,236 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import warnings
+from pathlib import Path
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+from utils import config
+from utils.config import dir_proj, ensure_dir, get_root
+from utils.datasets import CLEANED_TABLES, dataset_path, load_cleaned, load_studies
+from utils.renderprofile import RENDER_PROFILE_ENV, RENDER_PROFILES, plot_path, render_profile
+
+# Figure scripts, by name, with the datasets they read and the plot they write. Datasets
+# are named as in utils.datasets.dataset_path: "studies" is the reviewed Elicit export,
+# the other names refer to the cleaned tables (see CLEANED_TABLES)
+FIGURES = {
+    "fig1": {"script": "fig1_cohort_task.py", "inputs": ["studies"], "output": "fig1_cohort_task.png"},
+    "fig2": {"script": "fig2_eegelec_gait.py", "inputs": ["studies"], "output": "fig2_eeg_gait_heatmap.png"},
+    "fig3": {"script": "fig3_stepsnetwork.py", "inputs": ["steps", "outcomes"], "output": "fig3_stepsnetwork.png"},
+    "fig4": {"script": "fig4_steps_upset.py", "inputs": ["studies"], "output": "fig4_steps_upset.png"},
+    "fig5": {"script": "fig5_artifactrej.py", "inputs": ["artifacts"], "output": "fig5_artifactrej.png"},
+}
+
+# Imports of modules of this package ("from utils.x import ...", "import utils.x", "from utils import x, y")
+_UTILS_IMPORT = re.compile(r"^\s*(?:from|import)\s+utils\.(\w+)"
+                           r"|^\s*from\s+utils\s+import\s+(?:\(([^)]*)\)|([^\n(#]+))", re.MULTILINE)
+
+def _imported_modules(path):
+    """Names of the modules of this package a source file imports."""
+    modules = set()
+    for module, grouped, listed in _UTILS_IMPORT.findall(path.read_text(encoding="utf-8")):
+        if module:
+            modules.add(module)
+        for name in (grouped or listed).split(","):
+            if name.split():
+                modules.add(name.split()[0])
+    return modules
+
+def script_inputs(script):
+    """
+    Lists the source files a script depends on.
+
+    Args:
+        script (Path): A script in the scripts folder.
+
+    Returns:
+        list: The script and the modules of this package it imports, directly
+        or through other modules of this package (sorted).
+    """
+    script = Path(script)
+    modules, todo = set(), [script]
+    while todo:
+        for name in _imported_modules(todo.pop()):
+            path = dir_proj / "utils" / f"{name}.py"
+            if path not in modules and path.exists():
+                modules.add(path)
+                todo.append(path)
+    return [script] + sorted(modules)
+
+def render_stamps_file():
+    """Returns the file keeping, per render profile, the input hashes of the last successful render of every figure."""
+    return config.dir_results / "render_stamps.json"
+
+def figure_data(name):
+    """Lists the data files a figure reads, under the current root."""
+    return [dataset_path(dataset) for dataset in FIGURES[name]["inputs"]]
+
+def _digest_name(path):
+    """Names a file relative to the data root or the project, so that digests survive moving either."""
+    for root in (get_root(), dir_proj):
+        if path.is_relative_to(root):
+            return path.relative_to(root)
+    return path
+
+def figure_inputs(name):
+    """
+    Lists everything a figure depends on.
+
+    Args:
+        name (str): Figure name, a key of FIGURES.
+
+    Returns:
+        list: The script, the utils modules it depends on and its data files.
+    """
+    return script_inputs(dir_proj / "scripts" / FIGURES[name]["script"]) + figure_data(name)
+
+def input_digest(name):
+    """
+    Hashes everything a figure depends on.
+
+    Args:
+        name (str): Figure name, a key of FIGURES.
+
+    Returns:
+        str: SHA-256 over the script, the utils modules it depends on and its data files.
+    """
+    digest = hashlib.sha256()
+    for path in figure_inputs(name):
+        digest.update(os.fspath(_digest_name(path)).encode("utf-8"))
+        digest.update(path.read_bytes() if path.exists() else b"")
+    return digest.hexdigest()
+
+def _peak_memory_mb():
+    """Peak resident memory of the current process in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _render(name):
+    """Runs one figure script headless in the current (worker) process."""
+    import runpy
+
+    figure = FIGURES[name]
+    script = dir_proj / "scripts" / figure["script"]
+    log_path = ensure_dir(config.dir_log_results) / f"render_{name}_{render_profile()}.log"
+    start = time.perf_counter()
+    error = None
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log), \
+            contextlib.redirect_stderr(log), warnings.catch_warnings():
+        # plt.show() is a no-op on Agg; do not warn about it
+        warnings.filterwarnings("ignore", message=".*non-interactive.*cannot be shown")
+        plt = None
+        try:
+            # A broken matplotlib install is recorded as this figure's failure too
+            import matplotlib
+            matplotlib.use("Agg", force=True)
+            import matplotlib.pyplot as plt
+            runpy.run_path(os.fspath(script), run_name="__main__")
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        finally:
+            if plt is not None:
+                plt.close("all")
+    return {"name": name, "seconds": time.perf_counter() - start, "peak_mb": _peak_memory_mb(),
+            "error": error, "log": os.fspath(log_path)}
+
+def _load_stamps():
+    stamps_file = render_stamps_file()
+    if stamps_file.exists():
+        return json.loads(stamps_file.read_text())
+    return {}
+
+def render_all(names=None, jobs=None, force=False, profile=None):
+    """
+    Renders figures in parallel worker processes with the Agg backend.
+
+    The datasets are loaded once before the workers start, so forked workers
+    share them. A figure is skipped while its plot exists and its script, the
+    utils modules it imports (also indirectly) and its data files are
+    unchanged since the last successful render with the same profile. The
+    output of every script goes to logs/render_<name>_<profile>.log.
+
+    Args:
+        names (list): Figures to render (keys of FIGURES); all by default.
+        jobs (int): Number of worker processes; defaults to the number of CPUs.
+        force (bool): Render even if nothing has changed.
+        profile (str): Render profile ("final" or "draft"); defaults to
+            LITEXTRACT_RENDER_PROFILE, or "final".
+
+    Returns:
+        list: One dict per figure with "name", "status" ("rendered", "skipped"
+        or "failed"), "seconds", "peak_mb" and "log".
+    """
+    names = list(names or FIGURES)
+    unknown = [name for name in names if name not in FIGURES]
+    if unknown:
+        raise ValueError(f"Unknown figures: {', '.join(unknown)} (choose from {', '.join(FIGURES)})")
+
+    if profile is not None:
+        if profile not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile '{profile}' (choose from {', '.join(RENDER_PROFILES)})")
+        # Inherited by the workers
+        os.environ[RENDER_PROFILE_ENV] = profile
+    profile = render_profile()
+
+    all_stamps = _load_stamps()
+    stamps = all_stamps.setdefault(profile, {})
+    digests = {name: input_digest(name) for name in names}
+    pending = [name for name in names if force or stamps.get(name) != digests[name]
+               or not plot_path(FIGURES[name]["output"], create=False).exists()]
+    results = {name: {"name": name, "status": "skipped", "seconds": 0.0, "peak_mb": None, "log": None}
+               for name in names if name not in pending}
+
+    if pending:
+        os.environ["MPLBACKEND"] = "Agg"
+        # Warm the dataset cache; forked workers inherit the loaded tables
+        load_studies()
+        for table in CLEANED_TABLES:
+            load_cleaned(table)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+        # One task per worker process, so that peak memory is measured per figure
+        with context.Pool(jobs, maxtasksperchild=1) as pool:
+            for result in pool.imap_unordered(_render, pending):
+                name = result["name"]
+                result["status"] = "failed" if result["error"] else "rendered"
+                results[name] = result
+                if result["error"] is None:
+                    stamps[name] = digests[name]
+                    stamps_file = render_stamps_file()
+                    ensure_dir(stamps_file.parent)
+                    stamps_file.write_text(json.dumps(all_stamps, indent=2))
+    return [results[name] for name in names]
+
+def main(argv=None):
+    """Command line entry point (render-all)."""
+    parser = argparse.ArgumentParser(description="Render the manuscript figures headless and in parallel.")
+    parser.add_argument("figures", nargs="*", help=f"Figures to render ({', '.join(FIGURES)}); all by default.")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument("-f", "--force", action="store_true", help="Render even if the inputs are unchanged.")
+    parser.add_argument("-p", "--profile", choices=list(RENDER_PROFILES),
+                        help="Render profile: 'draft' for fast previews in plots/draft, 'final' (default) for the manuscript.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = render_all(args.figures, jobs=args.jobs, force=args.force, profile=args.profile)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Figure':<8} {'Status':<9} {'Time (s)':>9} {'Peak (MB)':>10}")
+    for result in results:
+        peak = f"{result['peak_mb']:.0f}" if result["peak_mb"] is not None else "-"
+        print(f"{result['name']:<8} {result['status']:<9} {result['seconds']:>9.1f} {peak:>10}")
+        if result["status"] == "failed":
+            print(f"  {result['error']} (see {result['log']})")
+    print(f"Total wall time: {elapsed:.1f}s ({render_profile()} profile)")
+    return 1 if any(result["status"] == "failed" for result in results) else 0
@@ -0,0 +1,59 @@
+import os
+from utils import config
+from utils.config import ensure_dir
+
+# Environment variable selecting the render profile of the figure scripts
+RENDER_PROFILE_ENV = "LITEXTRACT_RENDER_PROFILE"
+
+# "final" reproduces the manuscript figures; "draft" is a fast preview that
+# caps the resolution, batches repeated artists into collections, rasterizes
+# dense layers and writes to plots/draft so the final plots stay untouched
+RENDER_PROFILES = {
+    "final": {"max_dpi": None, "batch_artists": False, "rasterize": False, "subdir": None},
+    "draft": {"max_dpi": 100, "batch_artists": True, "rasterize": True, "subdir": "draft"},
+}
+
+def render_profile():
+    """
+    Returns the name of the active render profile.
+
+    Raises:
+        ValueError: If LITEXTRACT_RENDER_PROFILE names an unknown profile.
+    """
+    name = os.environ.get(RENDER_PROFILE_ENV, "final").strip().lower() or "final"
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}' (choose from {', '.join(RENDER_PROFILES)})")
+    return name
+
+def profile_setting(key):
+    """Returns one setting of the active render profile (see RENDER_PROFILES)."""
+    return RENDER_PROFILES[render_profile()][key]
+
+def figure_dpi(final_dpi):
+    """
+    Returns the resolution to use for a figure.
+
+    Args:
+        final_dpi (int): Resolution of the final figure.
+
+    Returns:
+        int: `final_dpi`, capped by the active profile.
+    """
+    max_dpi = profile_setting("max_dpi")
+    return final_dpi if max_dpi is None else min(final_dpi, max_dpi)
+
+def plot_path(filename, create=True):
+    """
+    Returns where to save a plot under the active profile.
+
+    Args:
+        filename (str): File name of the plot, e.g. "fig3_stepsnetwork.png".
+        create (bool): Create the plot folder if it does not exist yet.
+
+    Returns:
+        Path: plots/<filename> for final figures, plots/<subdir>/<filename> otherwise,
+        under the current project root (see utils.config.set_root).
+    """
+    subdir = profile_setting("subdir")
+    folder = config.dir_plots if subdir is None else config.dir_plots / subdir
+    return (ensure_dir(folder) if create else folder) / filename
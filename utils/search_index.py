@@ -0,0 +1,344 @@
+import re
+import sqlite3
+from pathlib import Path
+from utils.config import ensure_dir
+
+# Search index file, kept next to the other results
+SEARCH_INDEX_FILE = "search_index.sqlite"
+
+# Words, keeping hyphenated and underscored names such as "high-pass" or "clean_rawdata" together
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-_]\w+)*")
+
+# Query syntax: quoted phrases, parentheses, operators and terms (a trailing * makes a prefix query)
+_QUERY_PATTERN = re.compile(r'"([^"]*)"|(\()|(\))|(\S+?\*?)(?=[\s()"]|$)')
+
+def tokenize(text):
+    """
+    Splits text into lowercase tokens with their character offsets.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list: (token, character offset) pairs in text order.
+    """
+    return [(match.group().lower(), match.start()) for match in _TOKEN_PATTERN.finditer(text)]
+
+def _encode_varints(values):
+    """Encodes non-negative integers as LEB128 varints."""
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+def _decode_varints(data):
+    """Decodes LEB128 varints."""
+    values, value, shift = [], 0, 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value, shift = 0, 0
+    return values
+
+def _encode_positions(positions):
+    """Delta-encodes sorted (token position, character offset) pairs into a compact blob."""
+    deltas, last_position, last_offset = [], 0, 0
+    for position, offset in positions:
+        deltas += (position - last_position, offset - last_offset)
+        last_position, last_offset = position, offset
+    return _encode_varints(deltas)
+
+def _decode_positions(blob):
+    """Inverse of _encode_positions."""
+    deltas = _decode_varints(blob)
+    positions, position, offset = [], 0, 0
+    for i in range(0, len(deltas), 2):
+        position += deltas[i]
+        offset += deltas[i + 1]
+        positions.append((position, offset))
+    return positions
+
+class SearchIndex:
+    """
+    On-disk inverted index over the extracted methods sections.
+
+    Every term maps to a posting list of the documents containing it, with the
+    token positions and character offsets of each occurrence stored as
+    delta-encoded varints in one SQLite row per (term, document). Documents are
+    re-indexed only when their file changes, so updating after a new
+    extraction run touches new and changed articles only.
+
+    Queries support AND (also implicit between terms), OR, NOT, parentheses,
+    quoted phrases and prefix terms ending in *, e.g.
+    'ASR AND (iclabel OR "independent component")'.
+
+    Args:
+        path (Path): Location of the SQLite index file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        ensure_dir(self.path.parent)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(
+            """PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY,
+                pmc_id TEXT UNIQUE NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                term_id INTEGER PRIMARY KEY,
+                term TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                doc_id INTEGER NOT NULL,
+                positions BLOB NOT NULL,
+                PRIMARY KEY (term_id, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc_id);"""
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Closes the underlying SQLite connection."""
+        self._conn.close()
+
+    def update(self, corpus):
+        """
+        Brings the index up to date with a corpus of methods texts.
+
+        New and changed files (by size and modification time) are indexed,
+        and documents whose file has disappeared are dropped.
+
+        Args:
+            corpus (TextCorpus): Methods texts, e.g. read_txt_files(dir_methods).
+
+        Returns:
+            dict: PMC IDs that were "added", "updated" and "removed", and the
+            number of "unchanged" documents.
+        """
+        known = {pmc_id: (doc_id, size, mtime_ns) for doc_id, pmc_id, size, mtime_ns in
+                 self._conn.execute("SELECT doc_id, pmc_id, size, mtime_ns FROM documents")}
+        term_ids = dict(self._conn.execute("SELECT term, term_id FROM terms"))
+        report = {"added": [], "updated": [], "removed": [], "unchanged": 0}
+        seen = set()
+        with self._conn:
+            for name in corpus:
+                pmc_id = name.removeprefix("methods_").removesuffix(".txt")
+                seen.add(pmc_id)
+                stat = corpus.path(name).stat()
+                entry = known.get(pmc_id)
+                if entry is not None and entry[1:] == (stat.st_size, stat.st_mtime_ns):
+                    report["unchanged"] += 1
+                    continue
+                if entry is not None:
+                    self._drop(entry[0])
+                doc_id = self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (pmc_id, size, mtime_ns) VALUES (?, ?, ?)",
+                    (pmc_id, stat.st_size, stat.st_mtime_ns),
+                ).lastrowid
+                self._index(doc_id, corpus[name], term_ids)
+                report["updated" if entry is not None else "added"].append(pmc_id)
+            for pmc_id in sorted(set(known) - seen):
+                self._drop(known[pmc_id][0])
+                self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (known[pmc_id][0],))
+                report["removed"].append(pmc_id)
+        return report
+
+    def _index(self, doc_id, text, term_ids):
+        occurrences = {}
+        for position, (token, offset) in enumerate(tokenize(text)):
+            occurrences.setdefault(token, []).append((position, offset))
+        rows = []
+        for token, positions in occurrences.items():
+            term_id = term_ids.get(token)
+            if term_id is None:
+                term_id = term_ids[token] = self._conn.execute("INSERT INTO terms (term) VALUES (?)", (token,)).lastrowid
+            rows.append((term_id, doc_id, _encode_positions(positions)))
+        self._conn.executemany("INSERT INTO postings (term_id, doc_id, positions) VALUES (?, ?, ?)", rows)
+
+    def _drop(self, doc_id):
+        self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def postings(self, term):
+        """
+        Returns the posting list of a single term.
+
+        Args:
+            term (str): The term (matched case-insensitively).
+
+        Returns:
+            dict: Character offsets of every occurrence per PMC ID.
+        """
+        rows = self._conn.execute(
+            """SELECT d.pmc_id, p.positions FROM postings p
+            JOIN terms t ON t.term_id = p.term_id JOIN documents d ON d.doc_id = p.doc_id
+            WHERE t.term = ? ORDER BY d.pmc_id""",
+            (term.lower(),),
+        )
+        return {pmc_id: [offset for _, offset in _decode_positions(blob)] for pmc_id, blob in rows}
+
+    def search(self, query):
+        """
+        Runs a boolean query.
+
+        Args:
+            query (str): Query such as 'ASR AND iclabel', '"line noise" OR notch*'
+                or 'ica NOT amica'.
+
+        Returns:
+            list: Matching PMC IDs, sorted.
+
+        Raises:
+            ValueError: If the query cannot be parsed.
+        """
+        doc_ids = _QueryParser(self, query).parse()
+        if not doc_ids:
+            return []
+        names = dict(self._conn.execute("SELECT doc_id, pmc_id FROM documents"))
+        return sorted(names[doc_id] for doc_id in doc_ids)
+
+    def _term_docs(self, term):
+        if term.endswith("*"):
+            prefix = term[:-1].lower()
+            rows = self._conn.execute(
+                """SELECT DISTINCT p.doc_id FROM terms t JOIN postings p ON p.term_id = t.term_id
+                WHERE t.term >= ? AND t.term < ?""",
+                (prefix, prefix + "\U0010ffff"),
+            )
+        else:
+            rows = self._conn.execute(
+                "SELECT p.doc_id FROM terms t JOIN postings p ON p.term_id = t.term_id WHERE t.term = ?",
+                (term.lower(),),
+            )
+        return {row[0] for row in rows}
+
+    def _phrase_docs(self, phrase):
+        tokens = [token for token, _ in tokenize(phrase)]
+        if not tokens:
+            return set()
+        if len(tokens) == 1:
+            return self._term_docs(tokens[0])
+        # Rarest-first intersection before any positions are decoded
+        candidates = None
+        for token in sorted(set(tokens), key=self._document_frequency):
+            docs = self._term_docs(token)
+            candidates = docs if candidates is None else candidates & docs
+            if not candidates:
+                return set()
+        positions = {}
+        for token in set(tokens):
+            rows = self._conn.execute(
+                "SELECT p.doc_id, p.positions FROM terms t JOIN postings p ON p.term_id = t.term_id WHERE t.term = ?",
+                (token,),
+            )
+            positions[token] = {doc_id: {pos for pos, _ in _decode_positions(blob)}
+                                for doc_id, blob in rows if doc_id in candidates}
+        matches = set()
+        for doc_id in candidates:
+            starts = positions[tokens[0]][doc_id]
+            for i, token in enumerate(tokens[1:], start=1):
+                starts = {start for start in starts if start + i in positions[token][doc_id]}
+                if not starts:
+                    break
+            if starts:
+                matches.add(doc_id)
+        return matches
+
+    def _document_frequency(self, token):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM terms t JOIN postings p ON p.term_id = t.term_id WHERE t.term = ?", (token,)
+        ).fetchone()[0]
+
+    def _all_docs(self):
+        return {row[0] for row in self._conn.execute("SELECT doc_id FROM documents")}
+
+class _QueryParser:
+    """Recursive-descent parser evaluating a query into a set of document IDs."""
+
+    def __init__(self, index, query):
+        self.index = index
+        self.tokens = []
+        for phrase, lparen, rparen, word in _QUERY_PATTERN.findall(query):
+            if lparen or rparen:
+                self.tokens.append(("(", None) if lparen else (")", None))
+            elif word in ("AND", "OR", "NOT"):
+                self.tokens.append((word, None))
+            elif word:
+                self.tokens.append(("term", word))
+            else:
+                self.tokens.append(("phrase", phrase))
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty query")
+        result = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.pos][1] or self.tokens[self.pos][0]}' in query")
+        return result
+
+    def _or(self):
+        result = self._and()
+        while self._peek() == "OR":
+            self._next()
+            result = result | self._and()
+        return result
+
+    def _and(self):
+        result = self._not()
+        while self._peek() in ("AND", "NOT", "term", "phrase", "("):
+            if self._peek() == "AND":
+                self._next()
+            result = result & self._not()
+        return result
+
+    def _not(self):
+        if self._peek() == "NOT":
+            self._next()
+            return self.index._all_docs() - self._not()
+        return self._atom()
+
+    def _atom(self):
+        kind = self._peek()
+        if kind is None:
+            raise ValueError("Query ends unexpectedly")
+        _, value = self._next()
+        if kind == "(":
+            result = self._or()
+            if self._peek() != ")":
+                raise ValueError("Missing ')' in query")
+            self._next()
+            return result
+        if kind == "term" and value.endswith("*"):
+            return self.index._term_docs(value)
+        if kind in ("term", "phrase"):
+            # Terms are tokenized like the text, so "ICLabel," matches "iclabel"
+            return self.index._phrase_docs(value)
+        raise ValueError(f"Unexpected '{kind}' in query")
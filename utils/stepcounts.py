@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from utils.multivalue import encode
+
+# Studies per block of the indicator matrix in cooccurrence_matrix
+MATRIX_BLOCK_STUDIES = 16_384
+
+def _count_events(sources, targets, order, categories, names):
+    """
+    Counts (source, target) events given as integer codes.
+
+    Pairs are packed into one integer per event; np.unique then yields the
+    count and the first event of every distinct pair, so the result lists the
+    pairs in the order they first occur (like a collections.Counter filled in
+    `order`).
+    """
+    if len(sources) == 0:
+        return pd.DataFrame({names[0]: pd.Series(dtype=object), names[1]: pd.Series(dtype=object),
+                             names[2]: pd.Series(dtype=np.int64)})
+    packed = sources.astype(np.int64) * len(categories) + targets
+    packed = packed[order]
+    pairs, first, counts = np.unique(packed, return_index=True, return_counts=True)
+    by_first = np.argsort(first, kind="stable")
+    pairs, counts = pairs[by_first], counts[by_first]
+    labels = np.asarray(categories, dtype=object)
+    return pd.DataFrame({
+        names[0]: labels[pairs // len(categories)],
+        names[1]: labels[pairs % len(categories)],
+        names[2]: counts.astype(np.int64),
+    })
+
+def count_values(values: pd.Series) -> pd.Series:
+    """
+    Counts exploded values, listing them in order of first appearance.
+
+    Args:
+        values (pd.Series): Exploded values.
+
+    Returns:
+        pd.Series: Count per value.
+    """
+    _, codes, _, categories = encode(values)
+    return pd.Series(np.bincount(codes, minlength=len(categories)), index=categories, dtype=np.int64)
+
+def count_transitions(steps: pd.Series, outcomes: pd.Series = None) -> pd.DataFrame:
+    """
+    Counts transitions between consecutive steps of each study.
+
+    With `outcomes`, the last step of every study that has both steps and
+    outcomes is also linked to each of its outcomes. Pairs are listed in the
+    order they first occur when the studies are walked in order, each study's
+    step transitions before its outcome links.
+
+    Args:
+        steps (pd.Series): Exploded step sequences, indexed by study; the steps of
+            a study must be contiguous and in order.
+        outcomes (pd.Series): Exploded outcomes, indexed by study.
+
+    Returns:
+        pd.DataFrame: Columns source, target and count.
+    """
+    names = ("source", "target", "count")
+    labels = steps if outcomes is None else pd.concat([steps, outcomes])
+    rows, codes, studies, categories = encode(labels)
+    step_rows, step_codes = rows[:len(steps)], codes[:len(steps)]
+
+    # Consecutive steps of the same study
+    same_study = step_rows[1:] == step_rows[:-1]
+    sources, targets = step_codes[:-1][same_study], step_codes[1:][same_study]
+    event_rows = step_rows[:-1][same_study]
+    event_phase = np.zeros(len(sources), dtype=np.int8)
+    event_seq = np.flatnonzero(same_study)
+
+    if outcomes is not None and len(outcomes):
+        out_rows, out_codes = rows[len(steps):], codes[len(steps):]
+        # Last step of every study
+        is_last = np.append(step_rows[1:] != step_rows[:-1], True) if len(step_rows) else np.array([], dtype=bool)
+        last_step = np.full(len(studies), -1)
+        last_step[step_rows[is_last]] = step_codes[is_last]
+        linked = last_step[out_rows] >= 0
+        sources = np.concatenate([sources, last_step[out_rows][linked]])
+        targets = np.concatenate([targets, out_codes[linked]])
+        event_rows = np.concatenate([event_rows, out_rows[linked]])
+        event_phase = np.concatenate([event_phase, np.ones(linked.sum(), dtype=np.int8)])
+        event_seq = np.concatenate([event_seq, np.flatnonzero(linked)])
+
+    order = np.lexsort((event_seq, event_phase, event_rows))
+    return _count_events(sources, targets, order, categories, names)
+
+def count_cooccurrences(values: pd.Series, names=("Step_A", "Step_B", "Co_occurrence")) -> pd.DataFrame:
+    """
+    Counts how many studies contain each pair of distinct values.
+
+    Pairs are ordered by name within the pair (as itertools.combinations over
+    the sorted values of a study yields them) and listed in order of first
+    occurrence when the studies are walked in order.
+
+    Args:
+        values (pd.Series): Exploded values, indexed by study.
+        names (tuple): Names of the two value columns and the count column.
+
+    Returns:
+        pd.DataFrame: One row per co-occurring pair.
+    """
+    rows, codes, studies, categories = encode(values, sorted(set(values)))
+    # One entry per (study, value), sorted by study and value name
+    unique_entries = np.unique(rows.astype(np.int64) * len(categories) + codes)
+    rows, codes = unique_entries // len(categories), unique_entries % len(categories)
+    sizes = np.bincount(rows, minlength=len(studies))
+    starts = np.cumsum(sizes) - sizes
+
+    sources, targets, event_rows, event_rank = [], [], [], []
+    # All studies with k values share the same k*(k-1)/2 combination pattern
+    for k in np.unique(sizes[sizes >= 2]):
+        members = np.flatnonzero(sizes == k)
+        block = codes[starts[members][:, None] + np.arange(k)]
+        first, second = np.triu_indices(k, 1)
+        sources.append(block[:, first].ravel())
+        targets.append(block[:, second].ravel())
+        event_rows.append(np.repeat(members, len(first)))
+        event_rank.append(np.tile(np.arange(len(first)), len(members)))
+    if not sources:
+        return _count_events(np.array([], dtype=np.int64), None, None, categories, names)
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    order = np.lexsort((np.concatenate(event_rank), np.concatenate(event_rows)))
+    return _count_events(sources, targets, order, categories, names)
+
+def cooccurrence_matrix(values: pd.Series) -> pd.DataFrame:
+    """
+    Builds the value x value co-occurrence matrix as X.T @ X of the study indicator matrix X.
+
+    Args:
+        values (pd.Series): Exploded values, indexed by study.
+
+    Returns:
+        pd.DataFrame: Number of studies containing both values; the diagonal
+        holds the number of studies per value.
+    """
+    rows, codes, studies, categories = encode(values, sorted(set(values)))
+    counts = np.zeros((len(categories), len(categories)))
+    # Float blocks go through BLAS and stay exact for any realistic count
+    for start in range(0, len(studies), MATRIX_BLOCK_STUDIES):
+        in_block = (rows >= start) & (rows < start + MATRIX_BLOCK_STUDIES)
+        indicators = np.zeros((min(MATRIX_BLOCK_STUDIES, len(studies) - start), len(categories)))
+        indicators[rows[in_block] - start, codes[in_block]] = 1
+        counts += indicators.T @ indicators
+    return pd.DataFrame(counts.astype(np.int64), index=categories, columns=categories)
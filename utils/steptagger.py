@@ -0,0 +1,210 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils.cleandata import make_citations_unique
+from utils.vocabulary import ARTIFACT_SYNONYMS, OUTCOME_SYNONYMS, RAW_DATA_STEP, STEP_SYNONYMS
+
+# Output column of each tagger, as in the cleaned Elicit CSVs
+TAG_COLUMNS = {
+    "step_keywords": STEP_SYNONYMS,
+    "artifactrej_methods": ARTIFACT_SYNONYMS,
+    "outcome_keywords_script": OUTCOME_SYNONYMS,
+}
+
+def _trie_pattern(words):
+    """
+    Builds a regular expression matching any of `words` from a character trie.
+
+    Shared prefixes are factored out, so the regex engine follows one branch per
+    character instead of trying every word at every position, and longer words
+    are preferred over their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        if list(node) == [""]:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+class StepTagger:
+    """
+    Rule-based tagger finding vocabulary terms in methods text.
+
+    The synonyms of all columns are compiled into one trie-shaped regular
+    expression, so a document is scanned once regardless of the vocabulary
+    size. Synonyms match case-insensitively at the start of a word and may run
+    on into the rest of the word ("epoch" matches "epochs"); all-uppercase
+    acronyms such as "ICA" are matched by a second, small pattern as whole,
+    case-sensitive words (optionally plural).
+
+    The patterns are lookaheads tried at every word start, so overlapping
+    synonyms are all reported: "removed bad channels" yields both "Bad channel
+    removal" and "Bad channel detection" ("bad channel" starts inside it).
+
+    Args:
+        vocabularies (dict): Maps each output column to {label: synonyms}.
+    """
+
+    def __init__(self, vocabularies=TAG_COLUMNS):
+        self.vocabularies = vocabularies
+        self._folded = {}
+        self._exact = {}
+        for column, synonyms in vocabularies.items():
+            for label, terms in synonyms.items():
+                for term in terms:
+                    target = self._exact.setdefault(term, []) if term.isupper() else self._folded.setdefault(term.lower(), [])
+                    if (column, label) not in target:
+                        target.append((column, label))
+        # The regex reports the longest synonym starting at a word; a folded synonym may
+        # also start with shorter ones ("bad channels were removed" contains "bad channel")
+        for term, keys in self._folded.items():
+            for other, other_keys in self._folded.items():
+                if other != term and term.startswith(other):
+                    keys.extend(key for key in other_keys if key not in keys)
+        # Folded terms are matched against the lowercased text, which is much faster than (?i)
+        # Zero-width matches, so the scan resumes at the next word instead of after the synonym
+        self.folded_pattern = re.compile(rf"\b(?=({_trie_pattern(self._folded)}))") if self._folded else None
+        self.exact_pattern = re.compile(rf"\b(?=({_trie_pattern(self._exact)})s?\b)") if self._exact else None
+
+    def __call__(self, text):
+        """
+        Tags a text.
+
+        Args:
+            text (str): Methods text.
+
+        Returns:
+            dict: Labels found in the text per column, ordered by their first mention, without duplicates.
+        """
+        first_seen = {}
+        for pattern, terms, haystack in ((self.folded_pattern, self._folded, text.lower()),
+                                         (self.exact_pattern, self._exact, text)):
+            if pattern is None:
+                continue
+            for match in pattern.finditer(haystack):
+                for key in terms[match.group(1)]:
+                    if key not in first_seen or match.start() < first_seen[key]:
+                        first_seen[key] = match.start()
+        tags = {column: [] for column in self.vocabularies}
+        for (column, label), _ in sorted(first_seen.items(), key=lambda item: item[1]):
+            tags[column].append(label)
+        return tags
+
+def tag_methods(text, tagger=None):
+    """
+    Tags the preprocessing steps, artifact rejection methods and outcomes of one methods text.
+
+    Args:
+        text (str): Methods text.
+        tagger (StepTagger): Tagger to use; defaults to get_tagger().
+
+    Returns:
+        dict: Ordered labels per column of TAG_COLUMNS. Step sequences start with "Raw data".
+    """
+    tags = (tagger or get_tagger())(text)
+    if "step_keywords" in tags:
+        tags["step_keywords"] = [RAW_DATA_STEP] + tags["step_keywords"]
+    return tags
+
+_tagger = None
+
+def get_tagger():
+    """Returns the shared StepTagger for TAG_COLUMNS, compiling it on first use."""
+    global _tagger
+    if _tagger is None:
+        _tagger = StepTagger()
+    return _tagger
+
+def article_metadata(xml_file):
+    """
+    Reads the title and a short citation ("Surname, A.B., et al., Year") from an article's front matter.
+
+    Parsing stops at the end of <front>, so the body is never read.
+
+    Args:
+        xml_file (str or file object): Path to (or binary file object of) the XML file.
+
+    Returns:
+        tuple: (title, citation); either may be None if it is missing.
+    """
+    title = surname = initials = year = None
+    for event, elem in ET.iterparse(xml_file, events=("end",)):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag == "article-title" and title is None:
+            title = " ".join("".join(elem.itertext()).split())
+        elif tag == "name" and surname is None:
+            surname = elem.findtext("surname")
+            given = elem.findtext("given-names") or ""
+            initials = "".join(
+                "-".join(part[0] + "." for part in name.split("-") if part) for name in given.replace(".", " ").split()
+            )
+        elif tag == "pub-date" and year is None:
+            year = elem.findtext("year")
+        elif tag == "front":
+            break
+    if surname is None:
+        return title, None
+    author = f"{surname.strip()}, {initials}" if initials else surname.strip()
+    return title, f"{author}, et al., {year}" if year else f"{author}, et al."
+
+def tag_corpus(corpus, store=None, workers=None, chunksize=64):
+    """
+    Tags every methods text of a corpus and builds tables in the cleaned Elicit CSV schema.
+
+    Texts are tagged across a process pool. One process tags about 1,500
+    methods sections of 5-10 kB per second, so a multi-core machine reaches
+    several thousand; the tables do not depend on the number of workers.
+
+    Args:
+        corpus (Mapping): Methods texts by file name (methods_<pmc_id>.txt), e.g. read_txt_files(dir_methods).
+        store (article store): Store of the articles, used for titles and citations; without it
+            (or for missing articles) the PMC ID is used as the citation.
+        workers (int): Number of worker processes; defaults to the number of CPUs.
+            Use 1 to tag in the current process.
+        chunksize (int): Number of texts handed to a worker at a time.
+
+    Returns:
+        dict: One DataFrame with columns title, citation and the tag column per column of
+        TAG_COLUMNS, one row per tag in the order the tags were found.
+    """
+    names = sorted(corpus)
+    texts = (corpus[name] for name in names)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(names) <= chunksize:
+        return _build_tables(names, map(tag_methods, texts), store)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return _build_tables(names, pool.map(tag_methods, texts, chunksize=chunksize), store)
+
+def _build_tables(names, tagged_texts, store):
+    """Collects the tags of every text, in name order, into one table per column of TAG_COLUMNS."""
+    rows = {column: [] for column in TAG_COLUMNS}
+    studies = []
+    for name, tags in zip(names, tagged_texts):
+        pmc_id = name.removeprefix("methods_").removesuffix(".txt")
+        title = citation = None
+        if store is not None and pmc_id in store:
+            with store.open(pmc_id) as xml_file:
+                title, citation = article_metadata(xml_file)
+        studies.append((title, citation or pmc_id))
+        for column, labels in tags.items():
+            rows[column].extend((len(studies) - 1, label) for label in labels)
+
+    citations = make_citations_unique([citation for _, citation in studies])
+    tables = {}
+    for column, tagged in rows.items():
+        tables[column] = pd.DataFrame(
+            [(studies[i][0], citations[i], label) for i, label in tagged],
+            columns=["title", "citation", column],
+        )
+    return tables
@@ -0,0 +1,86 @@
+# Controlled vocabulary of the preprocessing review, shared by the figures and the step tagger.
+# Synonyms are matched at the start of a word and may be followed by further word characters
+# ("epoch" also matches "epochs", "epoched"); all-uppercase acronyms are matched case-sensitively
+# as whole words (an optional plural "s" is allowed).
+# The synonym lists started from utils/keywords.txt, but they are maintained here and that file is not read.
+
+# Preprocessing steps grouped by pipeline stage, in pipeline order
+STAGE_MAP = {
+    "Raw data": ["Raw data"],
+    "Pre ICA - Signal Cleaning": ["Channel removal", "High-pass filter", "Low-pass filter",
+                                  "Bandpass filter", "Notch filter", "Downsample"],
+    "Pre ICA - Data Preprocessing": ["Artifact Rejection", "Bad channel detection", "Re-reference", "Epoching"],
+    "ICA": ["IC decomposition", "IC rejection"],
+    "Post ICA": ["Clustering", "Baseline correction", "Dipole fitting", "Normalization", "Despiking"],
+    "Outcome": ["PSD", "ERD/ERS", "ERSP", "CMC"]
+}
+
+# Every pipeline starts from the recorded data, so "Raw data" opens each step sequence
+RAW_DATA_STEP = "Raw data"
+
+# Step keywords (step_keywords column) and the phrases that indicate them in methods text
+STEP_SYNONYMS = {
+    "Channel removal": ["channel removal", "removed channels", "remove channels", "channels were removed",
+                        "channels were excluded", "excluded channels"],
+    "High-pass filter": ["high-pass", "highpass", "high pass", "remove drift"],
+    "Low-pass filter": ["low-pass", "lowpass", "low pass"],
+    "Bandpass filter": ["band-pass", "bandpass", "band pass"],
+    "Notch filter": ["notch", "line noise", "cleanline", "bandstop", "band-stop"],
+    "Downsample": ["downsampl", "down-sampl", "resampl", "re-sampl"],
+    "Artifact Rejection": ["artifact rejection", "artefact rejection", "artifact removal", "artefact removal",
+                           "remove artifacts", "remove artefacts", "removed artifacts", "clean_artifacts",
+                           "remove segments", "visual inspection"],
+    "Bad channel detection": ["bad channel", "noisy channel", "channel rejection", "reject channels",
+                              "rejected channels"],
+    "Re-reference": ["re-referenc", "rereferenc", "average reference", "average-reference", "common average",
+                     "linked earlobe", "linked mastoid", "referenced to"],
+    "Epoching": ["epoch", "segmented into", "segmentation"],
+    "IC decomposition": ["ICA", "independent component analysis", "independent components analysis",
+                         "runica", "fastica", "infomax", "amica", "blind source separation"],
+    "IC rejection": ["iclabel", "ADJUST", "exclude component", "excluded component",
+                     "reject component", "rejected component", "remove component", "removed component",
+                     "components were rejected", "components were removed", "components were excluded",
+                     "non-brain component", "nonbrain component", "bad ic", "artifactual component"],
+    "Clustering": ["k-means", "kmeans", "clustering", "cluster analysis", "were clustered"],
+    "Baseline correction": ["baseline correct", "baseline-correct", "baseline removal", "baseline subtraction",
+                            "subtracted the baseline", "baseline normaliz"],
+    "Dipole fitting": ["dipfit", "dipole", "boundary element model"],
+    "Normalization": ["amplitude normaliz", "z-transform", "z-scor", "time normaliz", "time-normaliz", "normaliz",
+                      "normalis"],
+    "Despiking": ["despik", "de-spik"],
+}
+
+# Artifact rejection methods (artifactrej_methods column)
+ARTIFACT_SYNONYMS = {
+    "Bad channel removal": ["bad channel removal", "removed bad channels", "remove bad channels",
+                            "bad channels were removed", "bad channels were rejected", "noisy channels were removed",
+                            "rejected bad channels", "channel rejection"],
+    "Bad channel interpolation": ["interpolat"],
+    "Manual selection": ["manual", "visual inspection", "visually inspect", "by visual"],
+    "ASR": ["ASR", "artifact subspace reconstruction", "artefact subspace reconstruction"],
+    "Epoch rejection": ["epoch rejection", "rejected epochs", "epochs were rejected", "epochs were removed",
+                        "epochs were excluded", "trial rejection", "rejected trials", "trials were rejected",
+                        "trials were excluded"],
+    "Automated rejection": ["automated rejection", "automatic rejection", "automatically reject",
+                            "automatically remov", "automated artifact", "automatic artifact"],
+    "clean_rawdata": ["clean_rawdata", "cleanrawdata"],
+    "Eye artifact removal": ["eye artifact", "eye artefact", "ocular artifact", "ocular artefact", "eye movement",
+                             "blink", "EOG"],
+    "clean_artifacts": ["clean_artifacts"],
+    "iCanClean": ["icanclean"],
+    "PCA": ["PCA", "principal component analysis"],
+    "CCA": ["CCA", "canonical correlation analysis"],
+    "Semi-automated rejection": ["semi-automat", "semiautomat"],
+    "Template correlation rejection": ["template correlation"],
+    "CAR filter": ["CAR filter", "common average reference filter"],
+    "DBSFILT toolbox": ["dbsfilt"],
+}
+
+# Outcome measures (outcome_keywords_script column)
+OUTCOME_SYNONYMS = {
+    "PSD": ["PSD", "power spectral densit", "power spectrum", "power spectra", "spectral power"],
+    "ERD/ERS": ["ERD", "ERS", "event-related desynchroniz", "event-related synchroniz", "event related desynchroniz",
+                "event related synchroniz"],
+    "ERSP": ["ERSP", "event-related spectral perturbation", "event related spectral perturbation"],
+    "CMC": ["CMC", "corticomuscular coherence", "cortico-muscular coherence"],
+}